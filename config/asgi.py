@@ -2,6 +2,8 @@
 ASGI config for video-back project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests are served by Django and WebSocket connections by the GraphQL
+subscriptions endpoint.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -11,6 +13,20 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.local')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.setting')
+# Serve the GraphQL endpoint with the async view (see GRAPHQL_ASYNC)
+os.environ.setdefault('GRAPHQL_ASYNC', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imports that touch the models must run after Django has been set up
+from testz1.schemas import schema  # noqa: E402
+from testz1.views.graphql_ws import GraphQLWebSocketApp  # noqa: E402
+
+websocket_application = GraphQLWebSocketApp(schema)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
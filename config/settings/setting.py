@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/3.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
+import os
 from pathlib import Path
 from .localConfig import *
 
@@ -46,21 +47,104 @@ INSTALLED_APPS = [
 ]
 
 GRAPHENE = {
-    'SCHEMA': 'testz1.schemas.user_schema',
+    'SCHEMA': 'testz1.schemas.schema',
     "MIDDLEWARE": [
-        "graphql_jwt.middleware.JSONWebTokenMiddleware",
+        "testz1.auth.CachedJSONWebTokenMiddleware",
+        "testz1.schemas.optimizer.QueryOptimizerMiddleware",
+        "testz1.schemas.loaders.DataLoaderMiddleware",
+        "testz1.schemas.concurrency.AsyncResolverMiddleware",
     ],
 }
 
+# Modo ASGI: el endpoint GraphQL usa la vista asíncrona (config/asgi.py activa GRAPHQL_ASYNC) y los
+# campos raíz de cada consulta se resuelven en paralelo, cada uno con su propia conexión
+GRAPHQL_ASYNC = os.environ.get('GRAPHQL_ASYNC') == '1'
+GRAPHQL_PARALLEL_ROOT_FIELDS = True
+
+# Consultas persistidas: caché con el texto de cada consulta por su hash SHA-256 y número de
+# documentos analizados y validados que se mantienen en memoria (LRU)
+PERSISTED_QUERY_CACHE = 'persisted_queries'
+GRAPHQL_DOCUMENT_CACHE_SIZE = 500
+
+# Límites de las consultas GraphQL: coste estático máximo (las listas multiplican el coste de sus
+# elementos por su tamaño de página) y niveles de anidamiento
+GRAPHQL_MAX_QUERY_COST = 10000
+GRAPHQL_MAX_QUERY_DEPTH = 10
+
 AUTHENTICATION_BACKENDS = [
-    "graphql_jwt.backends.JSONWebTokenBackend",
+    "testz1.auth.CachedJSONWebTokenBackend",
     "django.contrib.auth.backends.ModelBackend",
 ]
 
 GRAPHQL_JWT = {
     "JWT_ALLOW_ARGUMENT": True,
+    "JWT_PAYLOAD_HANDLER": "testz1.auth.jwt_payload",
 }
 
+# Tokens JWT verificados que se mantienen en memoria (LRU, cada uno hasta su caducidad) y caché y
+# caducidad en segundos de la versión de tokens de cada usuario, con la que se comprueba la revocación
+JWT_TOKEN_CACHE_SIZE = 10000
+TOKEN_VERSION_CACHE = 'default'
+TOKEN_VERSION_TIMEOUT = 60
+
+# Cachés: la del grafo de seguimiento guarda los ids de seguidos y seguidores de cada usuario,
+# con caducidad (TIMEOUT) y expulsión de las entradas menos usadas al superar MAX_ENTRIES; la de
+# consultas persistidas guarda el texto de las consultas que envían los clientes por su hash
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'follow_graph': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'follow-graph',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'persisted_queries': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'persisted-queries',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+FOLLOW_GRAPH_CACHE = 'follow_graph'
+
+# Paginación por cursor de las conexiones GraphQL
+GRAPHQL_PAGE_SIZE = 20
+GRAPHQL_MAX_PAGE_SIZE = 100
+
+# Número máximo de ids de las operaciones de seguimiento en lote (requestFollowMany...)
+FOLLOW_BATCH_MAX_SIZE = 100
+
+# Tamaño de los lotes al crear las notificaciones de una nueva idea
+NOTIFICATION_BATCH_SIZE = 1000
+
+# Filas por INSERT al añadir una idea a los timelines de los seguidores de su autor
+TIMELINE_FAN_OUT_BATCH_SIZE = 1000
+
+# Worker de notificaciones (manage.py run_notification_worker): intentos máximos por trabajo,
+# espera base entre reintentos y duración de la reserva de un trabajo, en segundos
+NOTIFICATION_JOB_MAX_ATTEMPTS = 5
+NOTIFICATION_JOB_RETRY_DELAY = 30
+NOTIFICATION_JOB_LEASE = 300
+
+# Broker pub/sub de las suscripciones GraphQL. Con None se usa LISTEN/NOTIFY si la base de datos es
+# PostgreSQL (los eventos del worker de notificaciones y de cualquier worker del servidor llegan a
+# todas las conexiones WebSocket) y el broker en memoria, limitado a un único proceso, con el resto
+PUBSUB_BROKER = None
+
+# Registro de peticiones (django-request) en segundo plano: fracción de peticiones correctas que se
+# registran (los errores siempre), tamaño máximo de la cola en memoria (al llenarse se descartan
+# registros), filas por INSERT y segundos máximos que un registro espera en la cola
+REQUEST_LOG_SAMPLE_RATE = 1.0
+REQUEST_LOG_QUEUE_SIZE = 10000
+REQUEST_LOG_BATCH_SIZE = 100
+REQUEST_LOG_FLUSH_INTERVAL = 2
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,7 +152,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'request.middleware.RequestMiddleware',
+    'testz1.request_log.RequestLogMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -93,6 +177,24 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Hashes de contraseñas: PBKDF2 calculado en un grupo de hilos dedicado (ver testz1.hashers) con
+# PASSWORD_HASH_WORKERS hilos y como máximo PASSWORD_HASH_QUEUE_SIZE cálculos pendientes
+PASSWORD_HASHERS = [
+    'testz1.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE_SIZE = 32
+
+# Límite de intentos de inicio de sesión, registro y cambio de contraseña: (intentos, segundos) por
+# cuenta y por IP, guardado en la caché RATE_LIMIT_CACHE
+AUTH_RATE_LIMIT_ACCOUNT = (10, 60)
+AUTH_RATE_LIMIT_IP = (100, 60)
+RATE_LIMIT_CACHE = 'default'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -1,4 +1,5 @@
 from .user_admin import CustomUserAdmin
 from .idea_admin import IdeaAdmin
 from .follow_admin import FollowAdmin
-from .notification_admin import NotificationAdmin
\ No newline at end of file
+from .notification_admin import NotificationAdmin
+from .notification_job_admin import NotificationJobAdmin
@@ -0,0 +1,13 @@
+from django.contrib import admin
+from ..models import NotificationJob
+
+class NotificationJobAdmin(admin.ModelAdmin):
+    # Personaliza la visualización de los campos del modelo en el panel de administración
+    list_display = ('idempotency_key', 'idea', 'status', 'attempts', 'available_at')
+    list_filter = ('status',)
+    search_fields = ('idempotency_key',)
+    ordering = ('-created_at',)
+
+
+# Registra el modelo NotificationJob con la clase NotificationJobAdmin
+admin.site.register(NotificationJob, NotificationJobAdmin)
@@ -0,0 +1,176 @@
+"""
+Autenticación JWT con caché de tokens verificados.
+
+`graphql_jwt.middleware.JSONWebTokenMiddleware` verifica la firma del token y carga el usuario de la
+base de datos en cada campo que se resuelve. `CachedJSONWebTokenMiddleware` autentica una sola vez
+por petición y guarda cada token verificado en una caché LRU del proceso (JWT_TOKEN_CACHE_SIZE
+entradas) hasta que caduca, junto con una copia de los campos de identidad del usuario
+(`SNAPSHOT_FIELDS`); el resto de campos se cargan de la base de datos al usarlos.
+
+Revocación: los tokens llevan el `token_version` que tenía el usuario al emitirlos y `revoke_tokens`
+(al cambiar la contraseña) lo incrementa, con lo que los tokens anteriores dejan de ser válidos. La
+versión vigente de cada usuario (o -1 si no existe o está desactivado) se guarda en la caché
+TOKEN_VERSION_CACHE, que se invalida al guardar el usuario; con cachés locales de cada proceso la
+revocación llega a los demás procesos al caducar la entrada (TOKEN_VERSION_TIMEOUT segundos).
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.db.models import F
+from graphql_jwt.backends import JSONWebTokenBackend
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.utils import get_credentials, get_http_authorization, get_payload, get_token_argument, get_user_by_payload
+from graphql_jwt.utils import jwt_payload as default_jwt_payload
+
+# Campos del usuario que se guardan con cada token verificado
+SNAPSHOT_FIELDS = ('id', 'email', 'username', 'is_active', 'is_staff', 'is_superuser', 'token_version')
+
+
+def jwt_payload(user, context=None):
+    """Contenido de los tokens emitidos (JWT_PAYLOAD_HANDLER): el de graphql_jwt y la versión de tokens del usuario."""
+    payload = default_jwt_payload(user, context)
+    payload['token_version'] = user.token_version
+    return payload
+
+
+def get_version_cache():
+    return caches[getattr(settings, 'TOKEN_VERSION_CACHE', 'default')]
+
+
+def token_version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Versión vigente de los tokens de `user_id`, o -1 si el usuario no existe o está desactivado."""
+    cache = get_version_cache()
+    version = cache.get(token_version_key(user_id))
+    if version is None:
+        version = get_user_model().objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).first()
+        if version is None:
+            version = -1
+        cache.set(token_version_key(user_id), version, getattr(settings, 'TOKEN_VERSION_TIMEOUT', 60))
+    return version
+
+
+def invalidate_token_version(user_id):
+    get_version_cache().delete(token_version_key(user_id))
+
+
+def revoke_tokens(user):
+    """Invalida todos los tokens emitidos hasta ahora para `user`."""
+    get_user_model().objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    invalidate_token_version(user.pk)
+
+
+VerifiedToken = namedtuple('VerifiedToken', ['values', 'expires_at'])
+
+
+class TokenCache:
+    """Caché LRU en memoria de los tokens ya verificados, cada uno hasta su caducidad."""
+
+    def __init__(self):
+        self.tokens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, token):
+        with self.lock:
+            entry = self.tokens.get(token)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self.tokens[token]
+                return None
+            self.tokens.move_to_end(token)
+            return entry
+
+    def set(self, token, entry):
+        with self.lock:
+            self.tokens[token] = entry
+            self.tokens.move_to_end(token)
+            while len(self.tokens) > getattr(settings, 'JWT_TOKEN_CACHE_SIZE', 10000):
+                self.tokens.popitem(last=False)
+
+    def delete(self, token):
+        with self.lock:
+            self.tokens.pop(token, None)
+
+    def clear(self):
+        with self.lock:
+            self.tokens.clear()
+
+
+token_cache = TokenCache()
+
+
+def authenticate_token(token, context=None):
+    """
+    Devuelve el usuario del token (None si no existe) o lanza JSONWebTokenError si el token no es
+    válido, ha caducado o ha sido revocado. Solo los tokens que no están en la caché se verifican.
+    """
+    User = get_user_model()
+    entry = token_cache.get(token)
+    if entry is not None:
+        if get_token_version(entry.values['id']) != entry.values['token_version']:
+            token_cache.delete(token)
+            raise JSONWebTokenError('El token ha sido revocado.')
+        # Cada petición recibe su propia instancia; los campos que no están en la copia se cargan al usarlos
+        return User.from_db(router.db_for_read(User), SNAPSHOT_FIELDS, [entry.values[name] for name in SNAPSHOT_FIELDS])
+
+    payload = get_payload(token, context)
+    user = get_user_by_payload(payload)
+    if user is None:
+        return None
+    if payload.get('token_version', 0) != user.token_version:
+        raise JSONWebTokenError('El token ha sido revocado.')
+
+    if payload.get('exp') is not None:
+        token_cache.set(token, VerifiedToken({name: getattr(user, name) for name in SNAPSHOT_FIELDS}, payload['exp']))
+        get_version_cache().set(token_version_key(user.pk), user.token_version, getattr(settings, 'TOKEN_VERSION_TIMEOUT', 60))
+    return user
+
+
+class CachedJSONWebTokenBackend(JSONWebTokenBackend):
+    """Backend de autenticación JWT que usa la caché de tokens verificados."""
+
+    def authenticate(self, request=None, **kwargs):
+        if request is None or getattr(request, '_jwt_token_auth', False):
+            return None
+
+        token = get_credentials(request, **kwargs)
+        if token is not None:
+            return authenticate_token(token, request)
+        return None
+
+
+class CachedJSONWebTokenMiddleware:
+    """
+    Middleware de graphene que autentica el token de la cabecera (o cookie) una vez por petición y el
+    token pasado como argumento en los campos que lo reciben.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        context = info.context
+        token = get_token_argument(context, **kwargs)
+
+        if token is not None:
+            user = authenticate_token(token, context)
+            if user is not None:
+                context.user = user
+        elif not getattr(context, 'jwt_authenticated', False):
+            user = getattr(context, 'user', None)
+            token = get_http_authorization(context)
+            if (user is None or user.is_anonymous) and token is not None and not getattr(context, '_jwt_token_auth', False):
+                user = authenticate_token(token, context)
+                if user is not None:
+                    context.user = user
+            # Se marca al terminar: los campos raíz que se resuelven en paralelo autentican cada uno
+            # (con la caché) en lugar de continuar antes de tiempo como anónimos
+            context.jwt_authenticated = True
+
+        return next(root, info, **kwargs)
@@ -0,0 +1,96 @@
+"""
+Contadores desnormalizados de los usuarios: seguidores y seguidos (solicitudes aprobadas),
+solicitudes de seguimiento pendientes recibidas e ideas por visibilidad.
+
+Las mutaciones que crean, responden o eliminan relaciones de seguimiento e ideas los actualizan en
+su misma transacción con sentencias UPDATE sobre expresiones F, sin leer el valor anterior. Los
+cambios que no pasan por las mutaciones (admin, borrado de usuarios en cascada...) no los
+actualizan: `manage.py reconcile_counters` los recalcula a partir de las tablas Follow e Idea.
+"""
+from collections import defaultdict
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from .models import Follow, Idea
+
+# Campo del contador de ideas de cada visibilidad
+IDEA_COUNT_FIELDS = {
+    'public': 'public_ideas_count',
+    'protected': 'protected_ideas_count',
+    'private': 'private_ideas_count',
+}
+
+
+def increment(user_ids, **deltas):
+    """Suma a los contadores de `user_ids` los incrementos `{campo: n}` con una única sentencia UPDATE."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return 0
+    return get_user_model().objects.filter(pk__in=user_ids).update(
+        # Un contador desviado nunca pasa a ser negativo
+        **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+    )
+
+
+def update_follow_counts(following_id, follower_ids, old_status=None, new_status=None):
+    """
+    Actualiza los contadores al pasar las relaciones de `follower_ids` con `following_id` del estado
+    `old_status` a `new_status` (None si la relación no existía o se ha eliminado).
+    """
+    follower_ids = list(follower_ids)
+    approved = (new_status == 'approved') - (old_status == 'approved')
+    pending = (new_status == 'pending') - (old_status == 'pending')
+    increment(
+        [following_id],
+        followers_count=approved * len(follower_ids),
+        pending_follow_requests_count=pending * len(follower_ids),
+    )
+    increment(follower_ids, following_count=approved)
+
+
+def update_idea_counts(author_id, old_visibility=None, new_visibility=None):
+    """Actualiza los contadores de ideas de `author_id` al crear, cambiar de visibilidad o eliminar una idea."""
+    deltas = defaultdict(int)
+    if old_visibility is not None:
+        deltas[IDEA_COUNT_FIELDS[old_visibility]] -= 1
+    if new_visibility is not None:
+        deltas[IDEA_COUNT_FIELDS[new_visibility]] += 1
+    increment([author_id], **deltas)
+
+
+def count_subquery(queryset, field):
+    """Subconsulta con el número de filas de `queryset` cuyo `field` es el usuario de la consulta exterior."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def get_counter_expressions():
+    """Valor real de cada contador calculado a partir de las tablas Follow e Idea."""
+    expressions = {
+        'followers_count': count_subquery(Follow.objects.filter(status='approved'), 'following'),
+        'following_count': count_subquery(Follow.objects.filter(status='approved'), 'follower'),
+        'pending_follow_requests_count': count_subquery(Follow.objects.filter(status='pending'), 'following'),
+    }
+    for visibility, field in IDEA_COUNT_FIELDS.items():
+        expressions[field] = count_subquery(Idea.objects.filter(visibility=visibility), 'author')
+    return expressions
+
+
+def reconcile(users=None):
+    """
+    Recalcula los contadores de `users` (por defecto todos los usuarios) y corrige los que se han
+    desviado. Devuelve el número de usuarios corregidos.
+    """
+    if users is None:
+        users = get_user_model().objects.all()
+    expressions = get_counter_expressions()
+    actual = {f'actual_{field}': expression for field, expression in expressions.items()}
+    drift = Q()
+    for field in expressions:
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+
+    drifted = list(users.annotate(**actual).filter(drift).values_list('pk', flat=True))
+    if not drifted:
+        return 0
+    return get_user_model().objects.filter(pk__in=drifted).update(**expressions)
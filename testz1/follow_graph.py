@@ -0,0 +1,70 @@
+"""
+Caché del grafo de seguimiento.
+
+Guarda para cada usuario los ids de los usuarios que sigue y de sus seguidores (solo seguimientos
+aprobados), de modo que las comprobaciones de visibilidad no consultan la tabla Follow en cada
+petición. El backend es la caché de Django configurada en FOLLOW_GRAPH_CACHE (memoria local por
+defecto, con caducidad y expulsión LRU) y las entradas se invalidan desde las señales de Follow cada
+vez que cambia una relación aprobada.
+
+Con una caché local la invalidación solo llega al proceso que ha hecho el cambio: los demás procesos
+pueden usar el grafo anterior hasta que caduca la entrada. Por eso la caché solo se usa para
+decidir qué se lee; lo que se escribe de forma permanente a partir de los seguidores (entradas de
+timeline, notificaciones) se calcula siempre con una consulta a Follow.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import Follow
+
+
+def get_cache():
+    return caches[getattr(settings, 'FOLLOW_GRAPH_CACHE', 'follow_graph')]
+
+
+def following_key(user_id):
+    return f'follow_graph:following:{user_id}'
+
+
+def followers_key(user_id):
+    return f'follow_graph:followers:{user_id}'
+
+
+def get_following_ids(user_id):
+    """Ids de los usuarios a los que sigue `user_id`."""
+    cache = get_cache()
+    ids = cache.get(following_key(user_id))
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(follower_id=user_id, status='approved').values_list('following_id', flat=True))
+        cache.set(following_key(user_id), ids)
+    return ids
+
+
+def get_follower_ids(user_id):
+    """Ids de los usuarios que siguen a `user_id`."""
+    cache = get_cache()
+    ids = cache.get(followers_key(user_id))
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(following_id=user_id, status='approved').values_list('follower_id', flat=True))
+        cache.set(followers_key(user_id), ids)
+    return ids
+
+
+def invalidate_user(user_id):
+    """Descarta las entradas cacheadas de un usuario."""
+    get_cache().delete_many([following_key(user_id), followers_key(user_id)])
+
+
+def invalidate_follow(follower_id, following_id):
+    """Descarta las entradas afectadas por un cambio en la relación entre `follower_id` y `following_id`."""
+    invalidate_followers(following_id, [follower_id])
+
+
+def invalidate_followers(following_id, follower_ids):
+    """Descarta las entradas afectadas por un cambio en las relaciones de `follower_ids` con `following_id`."""
+    keys = [following_key(follower_id) for follower_id in follower_ids] + [followers_key(following_id)]
+    get_cache().delete_many(keys)
+
+    # Se vuelve a invalidar al confirmar la transacción por si otra petición ha cacheado mientras
+    # tanto el estado anterior de la relación
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
@@ -0,0 +1,57 @@
+"""
+Cálculo de los hashes de contraseñas en un grupo acotado de hilos.
+
+PBKDF2 es deliberadamente costoso en CPU. Si cada petición lo calcula en su propio hilo, una ráfaga
+de inicios de sesión ocupa todos los núcleos y retrasa al resto de peticiones del servidor.
+`PooledPBKDF2PasswordHasher` calcula los hashes en PASSWORD_HASH_WORKERS hilos dedicados (hashlib
+libera el GIL durante el cálculo) y admite como máximo PASSWORD_HASH_QUEUE_SIZE cálculos pendientes;
+por encima se rechaza la petición en lugar de encolarla sin límite.
+
+El hasher usa el mismo algoritmo (`pbkdf2_sha256`) que el de Django, por lo que las contraseñas ya
+guardadas siguen siendo válidas.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class PasswordHashPool:
+    """Grupo de hilos para los cálculos de hashes, con un límite de cálculos pendientes."""
+
+    def __init__(self, workers=2, max_pending=32):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def run(self, func, *args):
+        """Ejecuta `func(*args)` en el grupo y espera el resultado, o lanza una excepción si está saturado."""
+        if not self.slots.acquire(blocking=False):
+            raise Exception('El servidor está ocupado, inténtalo de nuevo en unos segundos.')
+        try:
+            return self.executor.submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """Devuelve el grupo de hilos de hashes del proceso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PasswordHashPool(
+                workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 2),
+                max_pending=getattr(settings, 'PASSWORD_HASH_QUEUE_SIZE', 32),
+            )
+        return _pool
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2PasswordHasher que calcula los hashes en el grupo de hilos del proceso."""
+
+    def encode(self, password, salt, iterations=None):
+        # `verify` y `harden_runtime` también calculan el hash con `encode`
+        return get_hash_pool().run(super().encode, password, salt, iterations)
@@ -0,0 +1,76 @@
+import json
+import time
+import urllib.parse
+import urllib.request
+from http.cookies import SimpleCookie
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_QUERY = '''
+    query {
+        timeline(first: 20) { edges { node { text author { username } } } }
+        followRequestsReceived(first: 20) { edges { node { follower { username } } } }
+    }
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga del endpoint GraphQL. Lanzar contra el mismo número de workers en modo WSGI '
+        '(gunicorn config.wsgi -w N) y ASGI (uvicorn config.asgi:application --workers N) para comparar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/graphql/', help='URL del endpoint GraphQL.')
+        parser.add_argument('--token', help='Token JWT con el que autenticar las peticiones.')
+        parser.add_argument('--query', default=DEFAULT_QUERY, help='Consulta GraphQL a ejecutar.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Peticiones simultáneas.')
+        parser.add_argument('--requests', type=int, default=1000, help='Número total de peticiones.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests y --concurrency deben ser mayores que 0.')
+
+        headers = {'Content-Type': 'application/json', **self.get_csrf_headers(options['url'])}
+        if options['token']:
+            headers['Authorization'] = f"JWT {options['token']}"
+        body = json.dumps({'query': options['query']}).encode()
+
+        def send(_):
+            request = urllib.request.Request(options['url'], data=body, headers=headers, method='POST')
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    ok = 'errors' not in json.loads(response.read())
+            except Exception:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(send, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for _, latency in results)
+        failed = sum(1 for ok, _ in results if not ok)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(f"{len(results)} requests in {elapsed:.2f}s with concurrency {options['concurrency']}")
+        self.stdout.write(f'Throughput: {len(results) / elapsed:.1f} req/s')
+        self.stdout.write(f'Latency p50: {percentile(0.5):.1f} ms, p95: {percentile(0.95):.1f} ms, p99: {percentile(0.99):.1f} ms')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} requests failed.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All requests succeeded.'))
+
+    def get_csrf_headers(self, url):
+        # El endpoint exige el token CSRF en las peticiones POST: se obtiene con una petición GET previa
+        request = urllib.request.Request(url + '?' + urllib.parse.urlencode({'query': '{ __typename }'}), headers={'Accept': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            cookie = SimpleCookie(', '.join(response.headers.get_all('Set-Cookie') or []))
+        if 'csrftoken' not in cookie:
+            return {}
+        token = cookie['csrftoken'].value
+        return {'Cookie': f'csrftoken={token}', 'X-CSRFToken': token, 'Referer': url}
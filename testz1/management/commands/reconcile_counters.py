@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from ...counters import reconcile
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores desnormalizados de los usuarios (seguidores, seguidos, solicitudes e ideas) y corrige las desviaciones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Usuarios que se comprueban en cada consulta.')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        fixed = 0
+        last_pk = None
+        # Por lotes de ids para no bloquear toda la tabla de usuarios en una sola sentencia
+        while True:
+            batch = users if last_pk is None else users.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            fixed += reconcile(users.filter(pk__in=pks))
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{fixed} users reconciled.'))
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
+from django.core.management.base import BaseCommand
+from ...outbox import claim_jobs, run_job
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos pendientes de envío de notificaciones (outbox).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Número de hilos que ejecutan trabajos.')
+        parser.add_argument('--batch-size', type=int, default=20, help='Trabajos reservados en cada consulta.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Segundos de espera cuando no hay trabajos.')
+        parser.add_argument('--once', action='store_true', help='Vaciar la cola una vez y terminar.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Starting notification worker with {options['workers']} workers...")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                close_old_connections()
+                jobs = claim_jobs(options['batch_size'])
+
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                results = list(executor.map(self.run_job, jobs))
+                self.stdout.write(f'{results.count(True)} jobs done, {results.count(False)} failed.')
+
+        self.stdout.write(self.style.SUCCESS('Notification queue drained.'))
+
+    def run_job(self, job):
+        # Cada hilo usa su propia conexión a la base de datos y la cierra al terminar
+        try:
+            return run_job(job)
+        finally:
+            close_old_connections()
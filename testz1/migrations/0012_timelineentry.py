@@ -0,0 +1,54 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_timelines(apps, schema_editor):
+    """Materializa el timeline de las ideas y seguimientos ya existentes."""
+    Idea = apps.get_model('testz1', 'Idea')
+    Follow = apps.get_model('testz1', 'Follow')
+    TimelineEntry = apps.get_model('testz1', 'TimelineEntry')
+
+    entries = []
+    for idea in Idea.objects.all().iterator():
+        entries.append(TimelineEntry(user_id=idea.author_id, idea_id=idea.id, author_id=idea.author_id, created_at=idea.created_at))
+        if idea.visibility in ('public', 'protected'):
+            follower_ids = Follow.objects.filter(following_id=idea.author_id, status='approved').values_list('follower_id', flat=True)
+            for follower_id in follower_ids:
+                entries.append(TimelineEntry(user_id=follower_id, idea_id=idea.id, author_id=idea.author_id, created_at=idea.created_at))
+        if len(entries) >= 1000:
+            TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0011_alter_follow_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(help_text='Fecha de creación de la idea (copia desnormalizada).', verbose_name='Fecha de creación')),
+                ('author', models.ForeignKey(help_text='Autor de la idea (copia desnormalizada).', on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Autor')),
+                ('idea', models.ForeignKey(help_text='Idea que aparece en el timeline.', on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='testz1.idea', verbose_name='Idea')),
+                ('user', models.ForeignKey(help_text='Usuario propietario del timeline.', on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Entrada de timeline',
+                'verbose_name_plural': 'Entradas de timeline',
+                'indexes': [models.Index(fields=['user', '-created_at', '-idea'], name='timeline_user_created_idx'), models.Index(fields=['user', 'author'], name='timeline_user_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'idea'), name='timeline_entry_unique_user_idea'),
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0012_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(help_text='Identifica el trabajo para no encolarlo ni ejecutarlo más de una vez.', max_length=100, unique=True, verbose_name='Clave de idempotencia')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', help_text='Estado del trabajo.', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Número de veces que se ha intentado ejecutar el trabajo.', verbose_name='Intentos')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento a partir del cual un worker puede (re)intentar el trabajo.', verbose_name='Disponible desde')),
+                ('last_error', models.TextField(blank=True, help_text='Error producido en el último intento fallido.', verbose_name='Último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora en que se encoló el trabajo.', verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de notificación',
+                'verbose_name_plural': 'Trabajos de notificación',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('user', 'idea'), name='notification_unique_user_idea'),
+        ),
+        migrations.AddField(
+            model_name='notificationjob',
+            name='idea',
+            field=models.ForeignKey(help_text='Idea cuyas notificaciones se deben enviar.', on_delete=django.db.models.deletion.CASCADE, to='testz1.idea', verbose_name='Idea'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationjob',
+            index=models.Index(fields=['status', 'available_at'], name='notification_job_ready_idx'),
+        ),
+    ]
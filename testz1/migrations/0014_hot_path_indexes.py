@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0013_notificationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['follower', 'following'], name='follow_approved_follower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['following', 'follower'], name='follow_approved_following_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['following'], name='follow_pending_following_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='idea',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='idea_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='idea',
+            index=models.Index(fields=['author', 'visibility', '-created_at'], name='idea_author_visibility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'leida', '-created_at'], name='notification_user_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['user', '-created_at'], name='notification_unread_idx'),
+        ),
+    ]
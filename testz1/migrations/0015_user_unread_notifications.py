@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:29
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+
+def count_unread_notifications(apps, schema_editor):
+    """Inicializa el contador con las notificaciones sin leer ya existentes."""
+    User = apps.get_model('testz1', 'User')
+    Notification = apps.get_model('testz1', 'Notification')
+
+    unread = Notification.objects.filter(user=OuterRef('pk'), leida=False).values('user').annotate(total=Count('pk')).values('total')
+    User.objects.filter(Exists(Notification.objects.filter(user=OuterRef('pk'), leida=False))).update(unread_notifications=Subquery(unread))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0, help_text='Número de notificaciones sin leer del usuario (contador desnormalizado).', verbose_name='Notificaciones sin leer'),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
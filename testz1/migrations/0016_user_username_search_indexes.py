@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Las expresiones de los índices coinciden con las que genera Django para los lookups
+# `icontains` e `istartswith` en PostgreSQL: UPPER("username"::text) LIKE UPPER(%s)
+SEARCH_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS user_username_trgm_idx ON testz1_user USING gin (UPPER(username::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS user_username_prefix_idx ON testz1_user (UPPER(username::text) text_pattern_ops)',
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    """Crea los índices de búsqueda de usuarios (solo en PostgreSQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for sql in SEARCH_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS user_username_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS user_username_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0015_user_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:49
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_trigger(apps, schema_editor):
+    """
+    Crea el trigger que mantiene `search_vector` al insertar o modificar el texto de una idea, rellena
+    las ideas existentes y crea el índice GIN de la búsqueda (solo en PostgreSQL).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE TRIGGER idea_search_vector_update BEFORE INSERT OR UPDATE OF text ON testz1_idea '
+        "FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.spanish', text)"
+    )
+    schema_editor.execute("UPDATE testz1_idea SET search_vector = to_tsvector('pg_catalog.spanish', text)")
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS idea_search_vector_idx ON testz1_idea USING gin (search_vector)')
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS idea_search_vector_idx')
+    schema_editor.execute('DROP TRIGGER IF EXISTS idea_search_vector_update ON testz1_idea')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0016_user_username_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idea',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Documento de búsqueda de texto completo generado a partir del texto de la idea.', null=True, verbose_name='Vector de búsqueda'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
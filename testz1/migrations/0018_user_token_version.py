@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0017_idea_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Se incrementa para revocar todos los tokens JWT emitidos para el usuario.', verbose_name='Versión de los tokens'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.3 on 2026-10-18 15:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_user_counters(apps, schema_editor):
+    """Inicializa los contadores con las relaciones de seguimiento y las ideas ya existentes."""
+    User = apps.get_model('testz1', 'User')
+    Follow = apps.get_model('testz1', 'Follow')
+    Idea = apps.get_model('testz1', 'Idea')
+
+    def count(queryset, field):
+        counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts), 0)
+
+    User.objects.update(
+        followers_count=count(Follow.objects.filter(status='approved'), 'following'),
+        following_count=count(Follow.objects.filter(status='approved'), 'follower'),
+        pending_follow_requests_count=count(Follow.objects.filter(status='pending'), 'following'),
+        public_ideas_count=count(Idea.objects.filter(visibility='public'), 'author'),
+        protected_ideas_count=count(Idea.objects.filter(visibility='protected'), 'author'),
+        private_ideas_count=count(Idea.objects.filter(visibility='private'), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testz1', '0018_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, help_text='Número de seguidores con la solicitud aprobada (contador desnormalizado).', verbose_name='Seguidores'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, help_text='Número de usuarios que sigue con la solicitud aprobada (contador desnormalizado).', verbose_name='Seguidos'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='pending_follow_requests_count',
+            field=models.PositiveIntegerField(default=0, help_text='Número de solicitudes de seguimiento recibidas pendientes de respuesta (contador desnormalizado).', verbose_name='Solicitudes pendientes'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='private_ideas_count',
+            field=models.PositiveIntegerField(default=0, help_text='Número de ideas privadas del usuario (contador desnormalizado).', verbose_name='Ideas privadas'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='protected_ideas_count',
+            field=models.PositiveIntegerField(default=0, help_text='Número de ideas protegidas del usuario (contador desnormalizado).', verbose_name='Ideas protegidas'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='public_ideas_count',
+            field=models.PositiveIntegerField(default=0, help_text='Número de ideas públicas del usuario (contador desnormalizado).', verbose_name='Ideas públicas'),
+        ),
+        migrations.RunPython(count_user_counters, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from .user import User
 from .idea import Idea, VISIBILITY_CHOICES
 from .follow import Follow, STATUS_CHOICES
-from .notification import Notification
\ No newline at end of file
+from .notification import Notification
+from .timeline import TimelineEntry
+from .notification_job import NotificationJob, JOB_STATUS_CHOICES
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connections, models, router
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 
 # Definición de las opciones de estado para el modelo Follow
@@ -8,6 +9,82 @@ STATUS_CHOICES = (
     ('denied', 'Denegado'),
 )
 
+class FollowManager(models.Manager):
+    def request(self, follower_id, following_id):
+        """
+        Crea la solicitud de seguimiento pendiente de `follower_id` a `following_id` o, si ya existe una
+        relación entre ambos, la devuelve sin modificarla. Es una única sentencia INSERT ... ON CONFLICT,
+        por lo que las peticiones repetidas o simultáneas no chocan con la restricción de unicidad.
+
+        Devuelve `(id, status, created)`, o None si el usuario `following_id` no existe.
+        """
+        return self.request_many(follower_id, [following_id]).get(following_id)
+
+    def request_many(self, follower_id, following_ids):
+        """
+        Versión en lote de `request`: crea con una única sentencia las solicitudes de `follower_id` a
+        cada uno de `following_ids` que no existan todavía.
+
+        Devuelve `{following_id: (id, status, created)}` con los usuarios que existen; `created` solo es
+        True para las relaciones insertadas por esta llamada.
+        """
+        following_ids = sorted(set(following_ids))
+        if not following_ids:
+            return {}
+
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        following_field = opts.get_field('following')
+        user_table, user_pk = qn(following_field.related_model._meta.db_table), qn(following_field.target_field.column)
+        table, pk = qn(opts.db_table), qn(opts.pk.column)
+        follower, following, status = qn(opts.get_field('follower').column), qn(following_field.column), qn(opts.get_field('status').column)
+        # Las claves foráneas se comprueban al confirmar la transacción: la existencia de los usuarios
+        # se comprueba en la propia sentencia insertando desde sus filas
+        insert = (
+            f'INSERT INTO {table} ({follower}, {following}, {status}) '
+            f'SELECT %s, {user_pk}, %s FROM {user_table} '
+            f'WHERE {user_pk} IN ({", ".join(["%s"] * len(following_ids))}) '
+            f'ON CONFLICT ({follower}, {following})'
+        )
+        params = [follower_id, 'pending', *following_ids]
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # El UPDATE sin cambios hace que RETURNING devuelva también las filas existentes; xmax = 0
+                # solo en las filas insertadas por la sentencia
+                cursor.execute(f'{insert} DO UPDATE SET {status} = {table}.{status} RETURNING {pk}, {following}, {status}, (xmax = 0)', params)
+                return {row[1]: (row[0], row[2], row[3]) for row in cursor.fetchall()}
+
+            cursor.execute(f'{insert} DO NOTHING RETURNING {pk}, {following}, {status}', params)
+            follows = {row[1]: (row[0], row[2], True) for row in cursor.fetchall()}
+        existing = self.using(db).filter(follower_id=follower_id, following_id__in=set(following_ids) - set(follows))
+        for follow_id, following_id, follow_status in existing.values_list('id', 'following_id', 'status'):
+            follows[following_id] = (follow_id, follow_status, False)
+        return follows
+
+    def delete_ids(self, ids):
+        """
+        Borra las relaciones `ids` con una única sentencia DELETE, sin cargarlas ni enviar señales por
+        fila (ninguna tabla depende de Follow, así que no hay borrados en cascada). Quien la usa
+        actualiza los timelines, la caché del grafo y los contadores de todo el lote.
+
+        Devuelve el número de relaciones borradas.
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        connection = connections[router.db_for_write(self.model)]
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {qn(self.model._meta.db_table)} WHERE {qn(self.model._meta.pk.column)} IN ({", ".join(["%s"] * len(ids))})',
+                ids,
+            )
+            return cursor.rowcount
+
+
 class Follow(models.Model):
     
     follower = models.ForeignKey(
@@ -33,8 +110,18 @@ class Follow(models.Model):
     )
 
 
+    objects = FollowManager()
+
     class Meta:
         unique_together = ('follower', 'following')
+        indexes = [
+            # Usuarios que sigue un usuario (solo seguimientos aprobados)
+            models.Index(fields=['follower', 'following'], condition=Q(status='approved'), name='follow_approved_follower_idx'),
+            # Seguidores de un usuario (solo seguimientos aprobados)
+            models.Index(fields=['following', 'follower'], condition=Q(status='approved'), name='follow_approved_following_idx'),
+            # Solicitudes de seguimiento pendientes recibidas por un usuario
+            models.Index(fields=['following'], condition=Q(status='pending'), name='follow_pending_following_idx'),
+        ]
         verbose_name = 'Seguimiento'
         verbose_name_plural = 'Seguimientos'
 
@@ -1,6 +1,9 @@
 # Modelo para las ideas
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Exists, OuterRef, Q
 from . import User
+from .follow import Follow
 
 VISIBILITY_CHOICES = (
     ('public', 'Pública'),
@@ -8,10 +11,44 @@ VISIBILITY_CHOICES = (
     ('private', 'Privada'),
 )
 
+class IdeaQuerySet(models.QuerySet):
+    def visible_to(self, user, follows_author=None):
+        """
+        Filtra las ideas que puede ver `user` según su visibilidad, en una única consulta.
+
+        Si ya se sabe si `user` sigue al autor de las ideas (por ejemplo desde la caché del grafo de
+        seguimiento) se indica en `follows_author` y se evita la subconsulta sobre Follow.
+        """
+        if follows_author is None:
+            # Idea protegida visible para el autor y para quienes le siguen (solicitud aprobada)
+            protected_rule = Q(author=user) | Exists(
+                Follow.objects.filter(follower=user, following=OuterRef('author'), status='approved')
+            )
+        elif follows_author:
+            protected_rule = Q()
+        else:
+            protected_rule = Q(author=user)
+
+        return self.filter(
+            # Idea pública, siempre visible para todos
+            Q(visibility='public')
+            # Idea protegida, solo visible para el autor y para quienes le siguen
+            | Q(visibility='protected') & protected_rule
+            # Idea privada, solo visible para el propio usuario
+            | Q(visibility='private', author=user)
+        )
+
+
 class Idea(models.Model):
     class Meta:
         verbose_name = 'Idea'
         verbose_name_plural = 'Ideas'
+        indexes = [
+            # Ideas de un autor de más recientes a más antiguas (ideas, ideasByUser y paginación por cursor)
+            models.Index(fields=['author', '-created_at', '-id'], name='idea_author_created_idx'),
+            # Ideas de un autor con una visibilidad concreta (timeline, notificaciones)
+            models.Index(fields=['author', 'visibility', '-created_at'], name='idea_author_visibility_idx'),
+        ]
 
     text = models.CharField(max_length=200, 
                             verbose_name='Texto',
@@ -34,5 +71,15 @@ class Idea(models.Model):
         help_text='Fecha de creación'
     )
 
+    # Documento de búsqueda del texto; en PostgreSQL lo mantiene un trigger (ver migración 0017)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Vector de búsqueda',
+        help_text='Documento de búsqueda de texto completo generado a partir del texto de la idea.'
+    )
+
+    objects = IdeaQuerySet.as_manager()
+
     def __str__(self):
         return self.text
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from . import Idea
 
@@ -6,7 +7,17 @@ class Notification(models.Model):
     class Meta:
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
-        
+        constraints = [
+            # Una idea solo se notifica una vez a cada usuario
+            models.UniqueConstraint(fields=['user', 'idea'], name='notification_unique_user_idea'),
+        ]
+        indexes = [
+            # Bandeja de notificaciones de un usuario, filtrada por leídas/no leídas
+            models.Index(fields=['user', 'leida', '-created_at'], name='notification_user_leida_idx'),
+            # Notificaciones no leídas de un usuario
+            models.Index(fields=['user', '-created_at'], condition=Q(leida=False), name='notification_unread_idx'),
+        ]
+
     user = models.ForeignKey(
         get_user_model(),
         on_delete=models.CASCADE,
@@ -0,0 +1,64 @@
+from django.db import models
+from django.utils import timezone
+from . import Idea
+
+# Definición de los estados de un trabajo de envío de notificaciones
+JOB_STATUS_CHOICES = (
+    ('pending', 'Pendiente'),
+    ('processing', 'En proceso'),
+    ('done', 'Completado'),
+    ('failed', 'Fallido'),
+)
+
+class NotificationJob(models.Model):
+    """Trabajo pendiente (outbox) para notificar una nueva idea a los seguidores de su autor."""
+    class Meta:
+        verbose_name = 'Trabajo de notificación'
+        verbose_name_plural = 'Trabajos de notificación'
+        indexes = [
+            # Búsqueda de los trabajos listos para ejecutarse
+            models.Index(fields=['status', 'available_at'], name='notification_job_ready_idx'),
+        ]
+
+    idea = models.ForeignKey(
+        Idea,
+        on_delete=models.CASCADE,
+        verbose_name='Idea',
+        help_text='Idea cuyas notificaciones se deben enviar.'
+    )
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Clave de idempotencia',
+        help_text='Identifica el trabajo para no encolarlo ni ejecutarlo más de una vez.'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=JOB_STATUS_CHOICES,
+        default='pending',
+        verbose_name='Estado',
+        help_text='Estado del trabajo.'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Intentos',
+        help_text='Número de veces que se ha intentado ejecutar el trabajo.'
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Disponible desde',
+        help_text='Momento a partir del cual un worker puede (re)intentar el trabajo.'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Último error',
+        help_text='Error producido en el último intento fallido.'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación',
+        help_text='Fecha y hora en que se encoló el trabajo.'
+    )
+
+    def __str__(self):
+        return f'{self.idempotency_key} ({self.status})'
@@ -0,0 +1,142 @@
+from itertools import islice
+from django.conf import settings
+from django.db import connections, models, router
+from django.contrib.auth import get_user_model
+from . import Idea
+from .follow import Follow
+
+
+def get_fan_out_batch_size():
+    return getattr(settings, 'TIMELINE_FAN_OUT_BATCH_SIZE', 1000)
+
+
+class TimelineEntryManager(models.Manager):
+    """Mantiene el timeline materializado de cada usuario (fan-out en escritura)."""
+
+    def fan_out_idea(self, idea):
+        """Sincroniza las entradas de timeline de una idea con su visibilidad actual."""
+        # El autor siempre ve sus propias ideas, sea cual sea la visibilidad
+        self.get_or_create(user_id=idea.author_id, idea=idea,
+                           defaults={'author_id': idea.author_id, 'created_at': idea.created_at})
+
+        if idea.visibility not in ('public', 'protected'):
+            # La idea ha dejado de ser visible para los seguidores
+            self.filter(idea=idea).exclude(user_id=idea.author_id).delete()
+            return
+
+        # Los seguidores se leen de Follow y no de la caché del grafo de seguimiento: con una caché local
+        # otro proceso puede tener aún un seguidor ya eliminado y su entrada no se borraría nunca.
+        # Se recorren con un cursor y se insertan por lotes, sin cargar todos los ids en memoria ni
+        # generar un único INSERT con una fila por seguidor
+        batch_size = get_fan_out_batch_size()
+        follower_ids = (
+            Follow.objects.filter(following_id=idea.author_id, status='approved')
+            .values_list('follower_id', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+        while True:
+            batch = list(islice(follower_ids, batch_size))
+            if not batch:
+                break
+            self.bulk_create(
+                [
+                    self.model(user_id=follower_id, idea=idea, author_id=idea.author_id, created_at=idea.created_at)
+                    for follower_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+
+    def backfill(self, follower_id, following_id):
+        """Añade al timeline del seguidor las ideas visibles del usuario al que sigue."""
+        self.backfill_followers(following_id, [follower_id])
+
+    def backfill_followers(self, following_id, follower_ids):
+        """
+        Añade a los timelines de varios seguidores aprobados las ideas visibles del usuario al que siguen.
+
+        Las entradas se copian en la base de datos con una única sentencia INSERT ... SELECT, sin cargar
+        las ideas ni crear una instancia por cada par seguidor-idea; las que ya existen se descartan.
+        """
+        follower_ids = sorted(set(follower_ids))
+        if not follower_ids:
+            return
+
+        connection = connections[router.db_for_write(self.model)]
+        qn = connection.ops.quote_name
+        opts, idea_opts, follow_opts = self.model._meta, Idea._meta, Follow._meta
+
+        def column(model_opts, name):
+            return qn(model_opts.get_field(name).column)
+
+        user, idea, author, created_at = (column(opts, name) for name in ('user', 'idea', 'author', 'created_at'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {qn(opts.db_table)} ({user}, {idea}, {author}, {created_at}) '
+                f'SELECT f.{column(follow_opts, "follower")}, i.{qn(idea_opts.pk.column)}, i.{column(idea_opts, "author")}, '
+                f'i.{column(idea_opts, "created_at")} '
+                f'FROM {qn(idea_opts.db_table)} i '
+                f'INNER JOIN {qn(follow_opts.db_table)} f ON f.{column(follow_opts, "following")} = i.{column(idea_opts, "author")} '
+                f'WHERE i.{column(idea_opts, "author")} = %s AND i.{column(idea_opts, "visibility")} IN (%s, %s) '
+                f'AND f.{column(follow_opts, "status")} = %s '
+                f'AND f.{column(follow_opts, "follower")} IN ({", ".join(["%s"] * len(follower_ids))}) '
+                f'ON CONFLICT ({user}, {idea}) DO NOTHING',
+                [following_id, 'public', 'protected', 'approved', *follower_ids],
+            )
+
+    def remove_author(self, follower_id, following_id):
+        """Elimina del timeline del seguidor todas las ideas del usuario que ha dejado de seguir."""
+        self.remove_followers(following_id, [follower_id])
+
+    def remove_followers(self, following_id, follower_ids):
+        """Elimina de los timelines de varios seguidores todas las ideas del usuario que han dejado de seguir."""
+        # El autor siempre ve sus propias ideas
+        follower_ids = [follower_id for follower_id in follower_ids if follower_id != following_id]
+        if follower_ids:
+            self.filter(user_id__in=follower_ids, author_id=following_id).delete()
+
+
+class TimelineEntry(models.Model):
+    """Entrada del timeline materializado: una idea visible para un usuario concreto."""
+    class Meta:
+        verbose_name = 'Entrada de timeline'
+        verbose_name_plural = 'Entradas de timeline'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idea'], name='timeline_entry_unique_user_idea'),
+        ]
+        indexes = [
+            # Lectura del timeline: un único recorrido por rango ordenado
+            models.Index(fields=['user', '-created_at', '-idea'], name='timeline_user_created_idx'),
+            # Limpieza al dejar de seguir a un usuario
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Usuario',
+        help_text='Usuario propietario del timeline.'
+    )
+    idea = models.ForeignKey(
+        Idea,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Idea',
+        help_text='Idea que aparece en el timeline.'
+    )
+    author = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Autor',
+        help_text='Autor de la idea (copia desnormalizada).'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Fecha de creación',
+        help_text='Fecha de creación de la idea (copia desnormalizada).'
+    )
+
+    objects = TimelineEntryManager()
+
+    def __str__(self):
+        return f'{self.idea} en el timeline de {self.user}'
@@ -48,6 +48,50 @@ class User(AbstractBaseUser, PermissionsMixin):
         help_text='Indica si el usuario es parte del personal o staff.'
     )
 
+    unread_notifications = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Notificaciones sin leer',
+        help_text='Número de notificaciones sin leer del usuario (contador desnormalizado).'
+    )
+
+    # Contadores desnormalizados (ver testz1.counters); `manage.py reconcile_counters` corrige las desviaciones
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Seguidores',
+        help_text='Número de seguidores con la solicitud aprobada (contador desnormalizado).'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Seguidos',
+        help_text='Número de usuarios que sigue con la solicitud aprobada (contador desnormalizado).'
+    )
+    pending_follow_requests_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Solicitudes pendientes',
+        help_text='Número de solicitudes de seguimiento recibidas pendientes de respuesta (contador desnormalizado).'
+    )
+    public_ideas_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ideas públicas',
+        help_text='Número de ideas públicas del usuario (contador desnormalizado).'
+    )
+    protected_ideas_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ideas protegidas',
+        help_text='Número de ideas protegidas del usuario (contador desnormalizado).'
+    )
+    private_ideas_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ideas privadas',
+        help_text='Número de ideas privadas del usuario (contador desnormalizado).'
+    )
+
+    token_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Versión de los tokens',
+        help_text='Se incrementa para revocar todos los tokens JWT emitidos para el usuario.'
+    )
+
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
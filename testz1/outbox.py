@@ -0,0 +1,140 @@
+"""
+Outbox de notificaciones.
+
+Al publicar una idea solo se encola un `NotificationJob` en la misma transacción; el envío de las
+notificaciones a los seguidores lo realiza el worker (`manage.py run_notification_worker`) fuera
+de la petición, con reintentos y claves de idempotencia.
+"""
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Follow, Idea, Notification, NotificationJob
+from .pubsub import publish
+
+# Usuarios por mensaje de notificationCreated: con PostgreSQL los mensajes viajan por NOTIFY, cuyo
+# contenido no puede superar los 8000 bytes
+NOTIFICATION_EVENT_SIZE = 500
+
+
+def get_idempotency_key(idea):
+    """Clave que identifica el trabajo de notificación de una idea."""
+    return f'idea:{idea.pk}:notifications'
+
+
+def enqueue_idea_notifications(idea):
+    """Encola el envío de las notificaciones de una idea recién publicada."""
+    job, _ = NotificationJob.objects.get_or_create(
+        idempotency_key=get_idempotency_key(idea),
+        defaults={'idea': idea},
+    )
+    return job
+
+
+def deliver_idea_notifications(idea):
+    """Crea las notificaciones de una idea para los seguidores de su autor que tengan acceso a ella."""
+    # Las ideas públicas y protegidas son visibles para todos los seguidores aprobados; las privadas
+    # solo para su autor, que no se notifica a sí mismo
+    if idea.visibility not in ('public', 'protected'):
+        return
+
+    # Los seguidores se leen de la tabla Follow (no de la caché del grafo, que en otros procesos puede
+    # no estar al día: las notificaciones no se retiran después) y se recorren con un cursor.
+    # Las notificaciones se crean por lotes; las que ya existen (de un intento anterior) se descartan,
+    # de modo que reintentar un trabajo no duplica notificaciones ni descuadra los contadores
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 1000)
+    follower_ids = (
+        Follow.objects.filter(following_id=idea.author_id, status='approved')
+        .order_by('follower_id')
+        .values_list('follower_id', flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+    while True:
+        batch = list(islice(follower_ids, batch_size))
+        if not batch:
+            break
+        notified = Notification.objects.filter(idea=idea, user_id__in=batch).values_list('user_id', flat=True)
+        batch = sorted(set(batch) - set(notified))
+        Notification.objects.bulk_create([Notification(user_id=user_id, idea=idea) for user_id in batch], ignore_conflicts=True)
+
+        # Actualizar el contador de notificaciones sin leer con una única sentencia por lote
+        get_user_model().objects.filter(id__in=batch).update(unread_notifications=F('unread_notifications') + 1)
+
+        # Avisar a los suscriptores de notificationCreated cuando el lote esté confirmado
+        for start in range(0, len(batch), NOTIFICATION_EVENT_SIZE):
+            message = {'idea_id': idea.id, 'user_ids': batch[start:start + NOTIFICATION_EVENT_SIZE]}
+            transaction.on_commit(lambda message=message: publish('notifications', message))
+
+
+def claim_jobs(limit):
+    """
+    Reserva hasta `limit` trabajos listos para ejecutarse.
+
+    Los trabajos reservados quedan "en proceso" durante NOTIFICATION_JOB_LEASE segundos; si el worker
+    muere antes de terminarlos vuelven a estar disponibles para otro worker al expirar la reserva.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'NOTIFICATION_JOB_LEASE', 300))
+
+    with transaction.atomic():
+        jobs = list(
+            NotificationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'processing'], available_at__lte=now)
+            .order_by('available_at', 'id')[:limit]
+        )
+        for job in jobs:
+            job.status = 'processing'
+            job.attempts += 1
+            job.available_at = now + lease
+        NotificationJob.objects.bulk_update(jobs, ['status', 'attempts', 'available_at'])
+
+    return jobs
+
+
+def run_job(job):
+    """Ejecuta un trabajo reservado y registra su resultado. Devuelve True si se ha completado."""
+    try:
+        with transaction.atomic():
+            deliver_idea_notifications(job.idea)
+    except Idea.DoesNotExist:
+        # La idea se ha borrado después de reservar el trabajo (y el trabajo con ella, en cascada): no
+        # queda nada que notificar
+        return True
+    except Exception as error:
+        max_attempts = getattr(settings, 'NOTIFICATION_JOB_MAX_ATTEMPTS', 5)
+        retry_delay = getattr(settings, 'NOTIFICATION_JOB_RETRY_DELAY', 30)
+
+        # Reintentar más tarde con espera exponencial o marcar el trabajo como fallido
+        job.last_error = repr(error)
+        if job.attempts >= max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.available_at = timezone.now() + timedelta(seconds=retry_delay * 2 ** (job.attempts - 1))
+        save_job_result(job, 'status', 'available_at', 'last_error')
+        return False
+
+    job.status = 'done'
+    job.last_error = ''
+    save_job_result(job, 'status', 'last_error')
+    return True
+
+
+def save_job_result(job, *fields):
+    """
+    Guarda el resultado de un trabajo. Si el trabajo ya no existe (se ha borrado su idea mientras se
+    ejecutaba) el UPDATE no afecta a ninguna fila y no se considera un error.
+    """
+    NotificationJob.objects.filter(pk=job.pk).update(**{field: getattr(job, field) for field in fields})
+
+
+def process_pending_jobs(limit=100):
+    """Reserva y ejecuta los trabajos disponibles en el proceso actual. Devuelve cuántos se han ejecutado."""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
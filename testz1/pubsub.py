@@ -0,0 +1,177 @@
+"""
+Pub/sub de eventos en tiempo real para las suscripciones GraphQL.
+
+Los publicadores (señales y worker de notificaciones) son código síncrono y los suscriptores son
+corrutinas de las conexiones WebSocket servidas por ASGI, normalmente en otros procesos. Con
+PostgreSQL los mensajes se reparten entre procesos con LISTEN/NOTIFY (`PostgresBroker`); con otras
+bases de datos solo entre los suscriptores del mismo proceso (`InProcessBroker`). PUBSUB_BROKER
+permite elegir otro broker con la misma interfaz (`publish` y `subscribe`).
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessBroker:
+    """Broker pub/sub en memoria para publicadores y suscriptores de un mismo proceso."""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def publish(self, channel, message):
+        """Envía `message` a todos los suscriptores de `channel`. Se puede llamar desde cualquier hilo."""
+        with self.lock:
+            subscribers = list(self.subscribers[channel])
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self.deliver, queue, message)
+            except RuntimeError:
+                # El bucle de eventos del suscriptor ya se ha cerrado
+                pass
+
+    @staticmethod
+    def deliver(queue, message):
+        # Si un suscriptor no consume sus mensajes se descartan los nuevos en lugar de acumularlos
+        if not queue.full():
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel):
+        """Generador asíncrono con los mensajes publicados en `channel` a partir de este momento."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.max_queue_size))
+        with self.lock:
+            self.subscribers[channel].add(subscriber)
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            with self.lock:
+                self.subscribers[channel].discard(subscriber)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Broker pub/sub entre procesos con LISTEN/NOTIFY de PostgreSQL.
+
+    `publish` envía el mensaje con NOTIFY por la conexión de Django, de modo que solo se entrega si se
+    confirma la transacción en curso. Cada proceso con suscriptores abre una conexión propia en la que
+    un hilo escucha los canales suscritos y reparte los mensajes recibidos entre sus suscriptores
+    locales. Los mensajes publicados mientras esa conexión se restablece se pierden.
+    """
+
+    # Prefijo de los canales de PostgreSQL, compartidos con otras aplicaciones de la misma base de datos
+    channel_prefix = 'testz1_'
+    reconnect_delay = 1
+    # Segundos sin mensajes tras los que se comprueba que la conexión sigue viva
+    keepalive_interval = 30
+
+    def __init__(self, max_queue_size=100):
+        super().__init__(max_queue_size)
+        self.channels = set()
+        self.listener = None
+        # Tubería para despertar al hilo cuando hay un canal nuevo que escuchar
+        self.wakeup_read, self.wakeup_write = os.pipe()
+
+    def publish(self, channel, message):
+        # El contenido de NOTIFY está limitado a 8000 bytes: los publicadores envían mensajes pequeños
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel_prefix + channel, json.dumps(message)])
+
+    async def subscribe(self, channel):
+        self.listen(channel)
+        async for message in super().subscribe(channel):
+            yield message
+
+    def listen(self, channel):
+        """Escucha `channel` en la conexión del proceso, arrancando el hilo la primera vez."""
+        with self.lock:
+            if channel in self.channels:
+                return
+            self.channels.add(channel)
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.run, name='pubsub-listener', daemon=True)
+                self.listener.start()
+        os.write(self.wakeup_write, b'\0')
+
+    def connect(self):
+        # Conexión propia (psycopg2) en modo autocommit: LISTEN no surte efecto hasta confirmarse
+        listen_connection = connection.get_new_connection(connection.get_connection_params())
+        listen_connection.autocommit = True
+        return listen_connection
+
+    def run(self):
+        while True:
+            try:
+                self.listen_forever(self.connect())
+            except Exception:
+                logger.exception('Error en la conexión de LISTEN del pub/sub; reconectando')
+            time.sleep(self.reconnect_delay)
+
+    def listen_forever(self, listen_connection):
+        listening = set()
+        try:
+            while True:
+                with self.lock:
+                    channels = self.channels - listening
+                with listen_connection.cursor() as cursor:
+                    for channel in channels:
+                        cursor.execute(f'LISTEN "{self.channel_prefix}{channel}"')
+                listening |= channels
+
+                readable, _, _ = select.select([listen_connection, self.wakeup_read], [], [], self.keepalive_interval)
+                if not readable:
+                    # Una conexión caída sin aviso no se vuelve legible: la consulta falla y se reconecta
+                    with listen_connection.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                if self.wakeup_read in readable:
+                    os.read(self.wakeup_read, 1024)
+                if listen_connection in readable:
+                    listen_connection.poll()
+                    while listen_connection.notifies:
+                        self.dispatch(listen_connection.notifies.pop(0))
+        finally:
+            listen_connection.close()
+
+    def dispatch(self, notify):
+        """Reparte entre los suscriptores del proceso un mensaje recibido por LISTEN."""
+        if notify.channel.startswith(self.channel_prefix):
+            super().publish(notify.channel[len(self.channel_prefix):], json.loads(notify.payload))
+
+
+def get_default_broker():
+    """Broker por defecto según la base de datos: LISTEN/NOTIFY con PostgreSQL y en memoria con el resto."""
+    if connection.vendor == 'postgresql':
+        return 'testz1.pubsub.PostgresBroker'
+    return 'testz1.pubsub.InProcessBroker'
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Devuelve el broker configurado en PUBSUB_BROKER (uno por proceso)."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'PUBSUB_BROKER', None) or get_default_broker())()
+        return _broker
+
+
+def publish(channel, message):
+    get_broker().publish(channel, message)
+
+
+def subscribe(channel):
+    return get_broker().subscribe(channel)
@@ -0,0 +1,47 @@
+"""
+Límite de intentos de las operaciones de autenticación (inicio de sesión, registro y cambio de contraseña).
+
+Cada cuenta y cada IP tienen un cubo de fichas (token bucket): cada intento gasta una ficha y las
+fichas se reponen de forma continua hasta la capacidad del cubo. AUTH_RATE_LIMIT_ACCOUNT y
+AUTH_RATE_LIMIT_IP indican `(capacidad, segundos)`: como mucho `capacidad` intentos seguidos y
+`capacidad` intentos más cada `segundos`. El estado de los cubos se guarda en la caché
+RATE_LIMIT_CACHE; los intentos rechazados no calculan ningún hash de contraseña.
+"""
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+
+
+def take_token(key, capacity, period):
+    """Gasta una ficha del cubo `key`; devuelve 0 si se permite el intento o los segundos que faltan para la siguiente ficha."""
+    cache = get_cache()
+    rate = capacity / period
+    now = time.time()
+    with _lock:
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            cache.set(key, (tokens, now), period)
+            return (1 - tokens) / rate
+        cache.set(key, (tokens - 1, now), period)
+    return 0
+
+
+def check_auth_rate_limit(request, account=None):
+    """Comprueba el límite de intentos de la IP de `request` y, si se indica, de la cuenta `account`."""
+    buckets = [(f'ratelimit:auth:ip:{request.META.get("REMOTE_ADDR")}', getattr(settings, 'AUTH_RATE_LIMIT_IP', (100, 60)))]
+    if account:
+        buckets.append((f'ratelimit:auth:account:{account.lower()}', getattr(settings, 'AUTH_RATE_LIMIT_ACCOUNT', (10, 60))))
+
+    for key, (capacity, period) in buckets:
+        wait = take_token(key, capacity, period)
+        if wait:
+            raise Exception(f'Demasiados intentos. Inténtalo de nuevo en {math.ceil(wait)} segundos.')
@@ -0,0 +1,184 @@
+"""
+Registro de peticiones HTTP (analítica de django-request) fuera del camino de la petición.
+
+`RequestLogMiddleware` sustituye a `request.middleware.RequestMiddleware`: aplica los mismos filtros
+(REQUEST_IGNORE_PATHS, REQUEST_ONLY_ERRORS, REQUEST_IGNORE_IP...) pero, en lugar de guardar cada
+petición con un INSERT síncrono, deja el registro en una cola en memoria. Un hilo en segundo plano
+la vacía por lotes de hasta REQUEST_LOG_BATCH_SIZE filas con `bulk_create`, en cuanto hay un lote
+completo o como mucho cada REQUEST_LOG_FLUSH_INTERVAL segundos.
+
+- Muestreo: solo se registra la fracción REQUEST_LOG_SAMPLE_RATE de las peticiones correctas; las
+  respuestas con error (>= 400) se registran siempre.
+- La cola admite como máximo REQUEST_LOG_QUEUE_SIZE registros: si el hilo no da abasto los nuevos
+  registros se descartan (y se cuentan en `dropped`) en lugar de bloquear las peticiones.
+
+Con una base de datos SQLite en memoria (la de las pruebas) otra conexión no puede escribir mientras
+la petición mantiene abierta su transacción, así que los registros se guardan en la propia petición.
+"""
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, IntegrityError, close_old_connections, connections, router
+from django.utils.deprecation import MiddlewareMixin
+from request import settings as request_settings
+from request.models import Request
+from request.router import Patterns
+from request.utils import request_is_ajax
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogBuffer:
+    """Cola acotada de registros de peticiones que un hilo en segundo plano guarda por lotes."""
+
+    def __init__(self, max_queue_size=10000, batch_size=100, flush_interval=2, background=True):
+        self.background = background
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def record(self, entry):
+        """Añade un registro a la cola sin bloquear; devuelve False si se ha descartado por estar llena."""
+        if not self.background:
+            self.write([entry])
+            return True
+        self.start()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def start(self):
+        """Arranca el hilo que guarda los registros (uno por proceso, al registrar la primera petición)."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='request-log', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            # Esperar al primer registro y reunir el lote hasta completarlo o agotar el intervalo
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self.write(batch)
+            # El hilo mantiene su propia conexión: se cierra si ha caducado o ha fallado
+            close_old_connections()
+
+    def flush(self):
+        """Guarda en el hilo actual todos los registros pendientes de la cola."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+
+    def write(self, batch):
+        try:
+            try:
+                Request.objects.bulk_create(batch)
+            except IntegrityError:
+                # Algún usuario se ha borrado desde la petición: se guarda el registro sin usuario
+                user_ids = {entry.user_id for entry in batch if entry.user_id is not None}
+                existing = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+                for entry in batch:
+                    if entry.user_id not in existing:
+                        entry.user = None
+                Request.objects.bulk_create(batch)
+        except DatabaseError:
+            logger.exception('No se han podido guardar %d registros de peticiones.', len(batch))
+
+
+_request_log = None
+_request_log_lock = threading.Lock()
+
+
+def get_request_log():
+    """Devuelve la cola de registros de peticiones del proceso."""
+    global _request_log
+    with _request_log_lock:
+        if _request_log is None:
+            _request_log = RequestLogBuffer(
+                max_queue_size=getattr(settings, 'REQUEST_LOG_QUEUE_SIZE', 10000),
+                batch_size=getattr(settings, 'REQUEST_LOG_BATCH_SIZE', 100),
+                flush_interval=getattr(settings, 'REQUEST_LOG_FLUSH_INTERVAL', 2),
+                background=not getattr(connections[router.db_for_write(Request)], 'is_in_memory_db', lambda: False)(),
+            )
+            # Guardar lo pendiente al terminar el proceso
+            atexit.register(_request_log.flush)
+        return _request_log
+
+
+def should_log(request, response):
+    """Aplica los filtros de configuración de django-request y el muestreo."""
+    if request.method.lower() not in request_settings.VALID_METHOD_NAMES:
+        return False
+    if response.status_code < 400:
+        if request_settings.ONLY_ERRORS:
+            return False
+        if random.random() >= getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 1.0):
+            return False
+    if Patterns(False, *request_settings.IGNORE_PATHS).resolve(request.path[1:]):
+        return False
+    if request_is_ajax(request) and request_settings.IGNORE_AJAX:
+        return False
+    if request.META.get('REMOTE_ADDR') in request_settings.IGNORE_IP:
+        return False
+    if Patterns(False, *request_settings.IGNORE_USER_AGENTS).resolve(request.META.get('HTTP_USER_AGENT', '')):
+        return False
+    if getattr(request, 'user', False) and request.user.get_username() in request_settings.IGNORE_USERNAME:
+        return False
+    return True
+
+
+class RequestLogMiddleware(MiddlewareMixin):
+    """Registra las peticiones en el modelo Request de django-request sin escribir en la petición."""
+
+    def process_response(self, request, response):
+        if not should_log(request, response):
+            return response
+
+        entry = Request()
+        try:
+            entry.from_http_request(request, response, commit=False)
+            # El usuario viene de la propia petición: no hace falta comprobar que existe en la base de datos
+            entry.full_clean(exclude=['user'])
+        except ValidationError as exc:
+            logger.warning('Bad request: %s', str(exc), exc_info=exc, extra={'status_code': 400, 'request': request})
+            return response
+
+        # `bulk_create` no llama a Request.save(): se aplica aquí la misma anonimización
+        if not request_settings.LOG_IP:
+            entry.ip = request_settings.IP_DUMMY
+        elif request_settings.ANONYMOUS_IP:
+            entry.ip = '.'.join(entry.ip.split('.')[:-1] + ['1'])
+        if not request_settings.LOG_USER:
+            entry.user = None
+
+        get_request_log().record(entry)
+        return response
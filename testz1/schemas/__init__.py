@@ -1,3 +1,6 @@
 from .user_schema import *
 from .idea_schema import *
-from .follow_schema import *
\ No newline at end of file
+from .follow_schema import *
+from .notification_schema import *
+from .subscription_schema import *
+from .api_schema import Query, Mutation, Subscription, schema
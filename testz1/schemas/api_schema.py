@@ -0,0 +1,18 @@
+import graphene
+from . import user_schema, idea_schema, follow_schema, notification_schema, subscription_schema
+
+
+class Query(user_schema.Query, idea_schema.Query, follow_schema.Query, notification_schema.Query, graphene.ObjectType):
+    """Definición de las consultas disponibles en el API (usuarios, ideas, seguimientos y notificaciones)."""
+
+
+class Mutation(user_schema.Mutation, idea_schema.Mutation, follow_schema.Mutation, notification_schema.Mutation, graphene.ObjectType):
+    """Definición de las mutaciones disponibles en el API (usuarios, ideas, seguimientos y notificaciones)."""
+
+
+class Subscription(subscription_schema.Subscription, graphene.ObjectType):
+    """Definición de las suscripciones disponibles en el API."""
+
+
+# Esquema único del API: se construye y valida una sola vez y lo comparten todos los endpoints
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -0,0 +1,72 @@
+"""
+Ejecución de los resolvers cuando el esquema se ejecuta de forma asíncrona (`AsyncGraphQLView`).
+
+Los resolvers del API son síncronos y usan el ORM, que no puede llamarse desde el bucle de eventos.
+`AsyncResolverMiddleware` los ejecuta en hilos con `sync_to_async`:
+
+- Los campos raíz de las consultas se resuelven cada uno en su propio hilo (y su propia conexión a
+  la base de datos), de modo que campos independientes como `timeline` y `followRequestsReceived`
+  se ejecutan a la vez. Con GRAPHQL_PARALLEL_ROOT_FIELDS = False comparten el hilo de la petición.
+- Los campos raíz de las mutaciones y los resolvers anidados que pueden consultar la base de datos
+  se ejecutan en el hilo de la petición, en orden.
+- Los campos que solo leen un atributo ya cargado se resuelven directamente en el bucle de eventos,
+  sin pasar por el resto de middlewares.
+
+Con la vista síncrona no hay bucle de eventos y el middleware no hace nada.
+"""
+import asyncio
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from graphene.types.resolver import dict_or_attr_resolver
+from graphene_django.types import DjangoObjectType
+from graphql import OperationType, default_field_resolver
+
+
+def in_event_loop():
+    """Indica si el código se está ejecutando dentro de un bucle de eventos (ejecución asíncrona)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def is_attribute_resolver(resolve):
+    """Indica si un resolver solo lee un atributo del objeto padre, sin consultar la base de datos."""
+    if resolve is None or resolve is DjangoObjectType.resolve_id:
+        return True
+    if isinstance(resolve, partial) and resolve.func is dict_or_attr_resolver:
+        return True
+    # Campos de opciones (ChoiceField) de graphene-django, que envuelven el resolver por defecto
+    return getattr(resolve, '__qualname__', '').startswith('BlankValueField.')
+
+
+def resolve_with_new_connection(next, root, info, args):
+    try:
+        return next(root, info, **args)
+    finally:
+        # El hilo no pertenece a la petición: se liberan aquí las conexiones que haya abierto
+        close_old_connections()
+
+
+class AsyncResolverMiddleware:
+    """Middleware de graphene que lleva los resolvers síncronos fuera del bucle de eventos."""
+
+    def resolve(self, next, root, info, **args):
+        if not in_event_loop():
+            return next(root, info, **args)
+
+        if info.path.prev is None:
+            # Campo raíz: se ejecuta entero (autenticación, optimización y carga de filas) en un hilo
+            if info.operation.operation == OperationType.QUERY and getattr(settings, 'GRAPHQL_PARALLEL_ROOT_FIELDS', True):
+                return sync_to_async(resolve_with_new_connection, thread_sensitive=False)(next, root, info, args)
+            return sync_to_async(next)(root, info, **args)
+
+        resolve = info.parent_type.fields[info.field_name].resolve
+        if is_attribute_resolver(resolve):
+            # Se llama directamente al resolver, sin el resto de middlewares (la autenticación JWT puede
+            # consultar la base de datos en cada campo)
+            return (resolve or default_field_resolver)(root, info, **args)
+        return sync_to_async(next)(root, info, **args)
@@ -0,0 +1,140 @@
+"""
+Control del coste y la profundidad de las consultas GraphQL.
+
+El coste de una operación se calcula de forma estática a partir del documento, antes de ejecutarlo:
+
+- Los campos escalares no cuestan nada y cada campo que devuelve un objeto cuesta 1 más el coste de
+  sus subcampos.
+- Los campos que devuelven listas multiplican ese coste por el número de elementos que pueden
+  devolver: el argumento `first` de las conexiones paginadas (GRAPHQL_PAGE_SIZE si no se indica y
+  GRAPHQL_MAX_PAGE_SIZE si es una variable) y GRAPHQL_MAX_PAGE_SIZE en las listas sin paginar.
+- Los campos de introspección (`__schema`, `__type`...) no cuentan.
+
+`QueryCostRule` rechaza durante la validación las operaciones que superan GRAPHQL_MAX_QUERY_COST o
+GRAPHQL_MAX_QUERY_DEPTH niveles de anidamiento.
+"""
+from django.conf import settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, IntValueNode,
+    OperationDefinitionNode, ValidationRule, get_named_type, is_leaf_type, is_list_type, is_non_null_type,
+)
+
+
+def get_max_cost():
+    return getattr(settings, 'GRAPHQL_MAX_QUERY_COST', 10000)
+
+
+def get_max_depth():
+    return getattr(settings, 'GRAPHQL_MAX_QUERY_DEPTH', 10)
+
+
+def get_page_size_argument(field_node, field_def):
+    """Número de elementos que puede devolver un campo paginado, o None si no admite `first`."""
+    if 'first' not in field_def.args:
+        return None
+    max_page_size = getattr(settings, 'GRAPHQL_MAX_PAGE_SIZE', 100)
+    for argument in field_node.arguments:
+        if argument.name.value == 'first':
+            if isinstance(argument.value, IntValueNode):
+                return max(0, min(int(argument.value.value), max_page_size))
+            # Con una variable el valor no se conoce hasta la ejecución: se supone el máximo
+            return max_page_size
+    return min(getattr(settings, 'GRAPHQL_PAGE_SIZE', 20), max_page_size)
+
+
+def get_fragments(document):
+    return {definition.name.value: definition for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)}
+
+
+def is_list_field(field_type):
+    if is_non_null_type(field_type):
+        field_type = field_type.of_type
+    return is_list_type(field_type)
+
+
+class CostCalculator:
+    """Calcula el coste y la profundidad de las operaciones de un documento."""
+
+    def __init__(self, schema, fragments):
+        self.schema = schema
+        self.fragments = fragments
+
+    def get_operation_cost(self, operation):
+        """Devuelve `(coste, profundidad)` de una operación."""
+        root_type = self.schema.get_root_type(operation.operation)
+        if root_type is None:
+            return 0, 0
+        return self.get_selection_cost(operation.selection_set, root_type, None, set())
+
+    def get_selection_cost(self, selection_set, parent_type, list_size, visited_fragments):
+        cost = depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.get_field_cost(selection, parent_type, list_size, visited_fragments)
+            else:
+                fragment_visited = visited_fragments
+                if isinstance(selection, FragmentSpreadNode):
+                    name = selection.name.value
+                    fragment = self.fragments.get(name)
+                    # Los ciclos entre fragmentos los rechaza otra regla de validación
+                    if fragment is None or name in visited_fragments:
+                        continue
+                    fragment_visited = visited_fragments | {name}
+                elif isinstance(selection, InlineFragmentNode):
+                    fragment = selection
+                else:
+                    continue
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value) or parent_type
+                field_cost, field_depth = self.get_selection_cost(fragment.selection_set, fragment_type, list_size, fragment_visited)
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def get_field_cost(self, field_node, parent_type, list_size, visited_fragments):
+        name = field_node.name.value
+        fields = getattr(parent_type, 'fields', None)
+        if name.startswith('__') or fields is None or name not in fields:
+            return 0, 0
+
+        field_def = fields[name]
+        field_type = get_named_type(field_def.type)
+        if is_leaf_type(field_type) or field_node.selection_set is None:
+            return 0, 1
+
+        # El tamaño de página de una conexión se aplica a las listas que contiene (`edges`)
+        page_size = get_page_size_argument(field_node, field_def)
+        multiplier = 1
+        if is_list_field(field_def.type):
+            multiplier = list_size if list_size is not None else getattr(settings, 'GRAPHQL_MAX_PAGE_SIZE', 100)
+
+        children_cost, children_depth = self.get_selection_cost(field_node.selection_set, field_type, page_size, visited_fragments)
+        return multiplier * (1 + children_cost), children_depth + 1
+
+
+class QueryCostRule(ValidationRule):
+    """Regla de validación que rechaza las operaciones demasiado costosas o profundas."""
+
+    def enter_operation_definition(self, node, *_args):
+        cost, depth = CostCalculator(self.context.schema, get_fragments(self.context.document)).get_operation_cost(node)
+
+        if depth > get_max_depth():
+            self.report_error(GraphQLError(
+                f'La consulta tiene una profundidad de {depth} niveles y el máximo permitido es {get_max_depth()}.',
+                node,
+            ))
+        if cost > get_max_cost():
+            self.report_error(GraphQLError(
+                f'La consulta tiene un coste de {cost} y el máximo permitido es {get_max_cost()}.',
+                node,
+            ))
+
+
+def get_operation_costs(schema, document):
+    """Devuelve el coste de cada operación del documento, indexado por nombre de la operación."""
+    calculator = CostCalculator(schema, get_fragments(document))
+    return {
+        definition.name.value if definition.name else None: calculator.get_operation_cost(definition)[0]
+        for definition in document.definitions if isinstance(definition, OperationDefinitionNode)
+    }
@@ -0,0 +1,92 @@
+"""
+Documentos GraphQL: consultas persistidas y caché de documentos analizados y validados.
+
+- Consultas persistidas automáticas (protocolo de Apollo): el cliente envía solo el hash SHA-256 de
+  la consulta; si el servidor no la conoce responde `PersistedQueryNotFound` y el cliente repite la
+  petición con el texto completo, que se guarda en la caché PERSISTED_QUERY_CACHE.
+- Cada documento se analiza y valida una sola vez por esquema (incluido el límite de coste y
+  profundidad de `testz1.schemas.cost`): el resultado y el coste de sus operaciones se guardan en
+  una caché LRU en memoria de GRAPHQL_DOCUMENT_CACHE_SIZE entradas, indexada por esquema y hash.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.cache import caches
+from graphql import GraphQLError, get_operation_ast, parse, specified_rules, validate
+from .cost import QueryCostRule, get_operation_costs
+
+# Reglas de validación de los documentos: las del estándar GraphQL y el límite de coste
+VALIDATION_RULES = (*specified_rules, QueryCostRule)
+
+
+def get_query_hash(query):
+    """Hash SHA-256 (hexadecimal) con el que se identifica una consulta."""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def get_persisted_query_cache():
+    return caches[getattr(settings, 'PERSISTED_QUERY_CACHE', 'persisted_queries')]
+
+
+def get_persisted_query(query_hash):
+    """Devuelve el texto de la consulta persistida con hash `query_hash` o None si no se conoce."""
+    return get_persisted_query_cache().get(f'persisted_query:{query_hash}')
+
+
+def persist_query(query_hash, query):
+    """Guarda una consulta para poder ejecutarla más adelante a partir de su hash."""
+    get_persisted_query_cache().set(f'persisted_query:{query_hash}', query)
+
+
+class ValidatedDocument(namedtuple('ValidatedDocument', ['document', 'costs'])):
+    """Documento analizado y validado junto con el coste de cada una de sus operaciones."""
+
+    def get_cost(self, operation_name=None):
+        operation = get_operation_ast(self.document, operation_name)
+        if operation is None:
+            return None
+        return self.costs.get(operation.name.value if operation.name else None)
+
+
+class DocumentCache:
+    """Caché LRU de documentos GraphQL ya analizados y validados."""
+
+    def __init__(self):
+        self.documents = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, schema, query, query_hash=None):
+        """
+        Devuelve `(document, errors)` para `query`: el documento (`ValidatedDocument`) si es válido
+        para `schema` o la lista de errores de sintaxis o validación.
+        """
+        key = (schema, query_hash or get_query_hash(query))
+        with self.lock:
+            document = self.documents.get(key)
+            if document is not None:
+                self.documents.move_to_end(key)
+                return document, None
+
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return None, [error]
+        errors = validate(schema.graphql_schema, document, VALIDATION_RULES)
+        if errors:
+            # Los documentos inválidos no se guardan
+            return None, errors
+        document = ValidatedDocument(document, get_operation_costs(schema.graphql_schema, document))
+
+        with self.lock:
+            self.documents[key] = document
+            while len(self.documents) > getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 500):
+                self.documents.popitem(last=False)
+        return document, None
+
+    def clear(self):
+        with self.lock:
+            self.documents.clear()
+
+
+document_cache = DocumentCache()
@@ -1,13 +1,34 @@
 import graphene
 from graphene_django.types import DjangoObjectType
 from graphql_jwt.decorators import login_required
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from ..models import Follow, STATUS_CHOICES
-from .user_schema import UserType
+from django.db import transaction
+from ..models import Follow, STATUS_CHOICES, TimelineEntry
+from ..counters import increment, update_follow_counts
+from ..follow_graph import invalidate_followers
+from .user_schema import UserConnection
+from .loaders import load_related
+from .optimizer import optimize
+from .pagination import paginate_by_pk
 
 class FollowRequestType(DjangoObjectType):
     class Meta:
         model = Follow
+        fields = ('id', 'follower', 'following', 'status')
+
+    def resolve_follower(self, info):
+        # Los usuarios de todas las solicitudes de la lista se cargan en una única consulta
+        return load_related(self, info, 'follower')
+
+    def resolve_following(self, info):
+        return load_related(self, info, 'following')
+
+
+class FollowRequestConnection(graphene.relay.Connection):
+    """Conexión paginada por cursor (por id) de solicitudes de seguimiento."""
+    class Meta:
+        node = FollowRequestType
 
 class FollowRequestMutation(graphene.Mutation):
     class Arguments:
@@ -15,6 +36,7 @@ class FollowRequestMutation(graphene.Mutation):
 
     success = graphene.Boolean()
     follow_id = graphene.ID()
+    status = graphene.String()
 
     @login_required
     def mutate(self, info, user_id):
@@ -23,16 +45,23 @@ class FollowRequestMutation(graphene.Mutation):
             raise Exception("You must be logged in to perform this action.")
 
         try:
-            following_user = get_user_model().objects.get(pk=user_id)
-        except get_user_model().DoesNotExist:
+            following_id = int(user_id)
+        except ValueError:
             raise Exception("User does not exist.")
-        
-        if following_user == user:
+
+        if following_id == user.id:
             raise Exception("You cannot follow yourself.")
 
-        follow_request = Follow.objects.create(follower=user, following=following_user, status='pending')
+        # Si la solicitud ya existe (reintentos, peticiones duplicadas) se devuelve la existente
+        with transaction.atomic():
+            follow = Follow.objects.request(user.id, following_id)
+            if follow is None:
+                raise Exception("User does not exist.")
+            follow_id, status, created = follow
+            if created:
+                update_follow_counts(following_id, [user.id], new_status='pending')
 
-        return FollowRequestMutation(success=True, follow_id=str(follow_request.id))
+        return FollowRequestMutation(success=True, follow_id=str(follow_id), status=status)
     
 class RespondToFollowRequest(graphene.Mutation):
     success = graphene.Boolean()
@@ -43,20 +72,23 @@ class RespondToFollowRequest(graphene.Mutation):
 
     @login_required
     def mutate(self, info, follow_id, status):
-        # Verificar si la solicitud de seguimiento existe y si el usuario autenticado es el destinatario
-        try:
-            follow_request = Follow.objects.get(id=follow_id, following=info.context.user, status='pending')
-        except Follow.DoesNotExist:
-            raise Exception('La solicitud de seguimiento no existe o ya ha sido respondida.')
-
         # Verificar si el estado proporcionado es válido
         valid_status_choices = [choice[0] for choice in STATUS_CHOICES]
         if status not in valid_status_choices:
             raise Exception('El estado proporcionado no es válido.')
 
-        # Actualizar el estado de la solicitud de seguimiento y guardarla en la base de datos
-        follow_request.status = status
-        follow_request.save()
+        with transaction.atomic():
+            # Verificar si la solicitud de seguimiento existe y si el usuario autenticado es el destinatario;
+            # la fila se bloquea para que dos respuestas simultáneas no cuenten dos veces
+            try:
+                follow_request = Follow.objects.select_for_update().get(id=follow_id, following=info.context.user, status='pending')
+            except Follow.DoesNotExist:
+                raise Exception('La solicitud de seguimiento no existe o ya ha sido respondida.')
+
+            # Actualizar el estado de la solicitud de seguimiento y guardarla en la base de datos
+            follow_request.status = status
+            follow_request.save()
+            update_follow_counts(follow_request.following_id, [follow_request.follower_id], 'pending', status)
 
         return RespondToFollowRequest(success=True)
 
@@ -69,14 +101,16 @@ class UnfollowUser(graphene.Mutation):
 
     @login_required
     def mutate(self, info, user_id):
-        # Verificar si la relación de seguimiento existe y si el usuario autenticado es el seguidor
-        try:
-            follow_relationship = Follow.objects.get(follower=info.context.user, following_id=user_id, status='approved')
-        except Follow.DoesNotExist:
-            raise Exception('No estás siguiendo a este usuario.')
+        with transaction.atomic():
+            # Verificar si la relación de seguimiento existe y si el usuario autenticado es el seguidor
+            try:
+                follow_relationship = Follow.objects.select_for_update().get(follower=info.context.user, following_id=user_id, status='approved')
+            except Follow.DoesNotExist:
+                raise Exception('No estás siguiendo a este usuario.')
 
-        # Eliminar la relación de seguimiento de la base de datos
-        follow_relationship.delete()
+            # Eliminar la relación de seguimiento de la base de datos
+            follow_relationship.delete()
+            update_follow_counts(follow_relationship.following_id, [follow_relationship.follower_id], old_status='approved')
 
         return UnfollowUser(success=True)
 
@@ -89,49 +123,182 @@ class RemoveFollower(graphene.Mutation):
 
     @login_required
     def mutate(self, info, follower_id):
-        # Verificar si la relación de seguimiento existe y si el usuario autenticado es el seguido
-        try:
-            follow_relationship = Follow.objects.get(follower_id=follower_id, following=info.context.user, status='approved')
-        except Follow.DoesNotExist:
-            raise Exception('No existe una relación de seguimiento con este usuario.')
+        with transaction.atomic():
+            # Verificar si la relación de seguimiento existe y si el usuario autenticado es el seguido
+            try:
+                follow_relationship = Follow.objects.select_for_update().get(follower_id=follower_id, following=info.context.user, status='approved')
+            except Follow.DoesNotExist:
+                raise Exception('No existe una relación de seguimiento con este usuario.')
 
-        # Eliminar la relación de seguimiento de la base de datos
-        follow_relationship.delete()
+            # Eliminar la relación de seguimiento de la base de datos
+            follow_relationship.delete()
+            update_follow_counts(follow_relationship.following_id, [follow_relationship.follower_id], old_status='approved')
 
         return RemoveFollower(success=True)
 
+class FollowResult(graphene.ObjectType):
+    """Resultado de una operación de seguimiento en lote para uno de los ids recibidos."""
+    id = graphene.ID(description='Id recibido (usuario o solicitud de seguimiento).')
+    success = graphene.Boolean()
+    follow_id = graphene.ID()
+    status = graphene.String()
+    error = graphene.String()
+
+
+def parse_ids(ids):
+    """
+    Convierte los ids recibidos en enteros, comprobando el tamaño máximo del lote; los ids no
+    numéricos se convierten en None.
+
+    Devuelve una lista de pares `(valor recibido, id)` en el orden de entrada, incluidos los repetidos,
+    para que las mutaciones devuelvan un resultado por cada id recibido.
+    """
+    max_size = getattr(settings, 'FOLLOW_BATCH_MAX_SIZE', 100)
+    if len(ids) > max_size:
+        raise Exception(f'No se pueden procesar más de {max_size} ids en una misma operación.')
+    parsed = []
+    for value in ids:
+        try:
+            parsed.append((value, int(value)))
+        except (TypeError, ValueError):
+            parsed.append((value, None))
+    return parsed
+
+
+class RequestFollowMany(graphene.Mutation):
+    """Solicita seguir a varios usuarios a la vez."""
+    results = graphene.List(FollowResult)
+
+    class Arguments:
+        user_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    @login_required
+    def mutate(self, info, user_ids):
+        user = info.context.user
+        ids = parse_ids(user_ids)
+        candidates = {pk for _, pk in ids if pk is not None and pk != user.id}
+
+        # Igual que requestFollow: las solicitudes que ya existen se devuelven en lugar de fallar
+        with transaction.atomic():
+            follows = Follow.objects.request_many(user.id, candidates)
+            # Solo las solicitudes insertadas por esta llamada son pendientes nuevas
+            increment([pk for pk, (_, _, created) in follows.items() if created], pending_follow_requests_count=1)
+
+        results = []
+        for value, pk in ids:
+            if pk == user.id:
+                results.append(FollowResult(id=value, success=False, error='No puedes seguirte a ti mismo.'))
+            elif pk not in follows:
+                results.append(FollowResult(id=value, success=False, error='El usuario no existe.'))
+            else:
+                follow_id, status, _created = follows[pk]
+                results.append(FollowResult(id=value, success=True, follow_id=follow_id, status=status))
+        return RequestFollowMany(results=results)
+
+
+class RespondToFollowRequests(graphene.Mutation):
+    """Responde a la vez a varias solicitudes de seguimiento recibidas."""
+    results = graphene.List(FollowResult)
+
+    class Arguments:
+        follow_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        status = graphene.String(required=True)
+
+    @login_required
+    def mutate(self, info, follow_ids, status):
+        valid_status_choices = [choice[0] for choice in STATUS_CHOICES]
+        if status not in valid_status_choices:
+            raise Exception('El estado proporcionado no es válido.')
+
+        user = info.context.user
+        ids = parse_ids(follow_ids)
+
+        with transaction.atomic():
+            pending = Follow.objects.filter(id__in=[pk for _, pk in ids if pk is not None], following=user, status='pending')
+            followers = dict(pending.select_for_update().values_list('id', 'follower_id'))
+            Follow.objects.filter(id__in=followers).update(status=status)
+            update_follow_counts(user.id, followers.values(), 'pending', status)
+
+            # `update` no envía señales: se actualizan los timelines y el grafo de seguimiento del lote
+            if status == 'approved' and followers:
+                TimelineEntry.objects.backfill_followers(user.id, followers.values())
+                invalidate_followers(user.id, followers.values())
+
+        results = [
+            FollowResult(id=value, success=True, follow_id=value, status=status) if pk in followers
+            else FollowResult(id=value, success=False, error='La solicitud de seguimiento no existe o ya ha sido respondida.')
+            for value, pk in ids
+        ]
+        return RespondToFollowRequests(results=results)
+
+
+class RemoveFollowers(graphene.Mutation):
+    """Elimina a la vez a varios seguidores del usuario autenticado."""
+    results = graphene.List(FollowResult)
+
+    class Arguments:
+        follower_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    @login_required
+    def mutate(self, info, follower_ids):
+        user = info.context.user
+        ids = parse_ids(follower_ids)
+
+        with transaction.atomic():
+            follows = Follow.objects.filter(
+                following=user, follower_id__in=[pk for _, pk in ids if pk is not None], status='approved'
+            )
+            removed = dict(follows.select_for_update().values_list('follower_id', 'id'))
+
+            # Un único DELETE sin señales por fila: los timelines y el grafo se actualizan para todo el lote
+            Follow.objects.delete_ids(removed.values())
+            update_follow_counts(user.id, removed.keys(), old_status='approved')
+            if removed:
+                TimelineEntry.objects.remove_followers(user.id, removed.keys())
+                invalidate_followers(user.id, removed.keys())
+
+        results = [
+            FollowResult(id=value, success=True, follow_id=removed[pk]) if pk in removed
+            else FollowResult(id=value, success=False, error='No existe una relación de seguimiento con este usuario.')
+            for value, pk in ids
+        ]
+        return RemoveFollowers(results=results)
+
+
 class Mutation(graphene.ObjectType):
     """Definición de las mutaciones disponibles."""
     respond_to_follow_request = RespondToFollowRequest.Field()
     request_follow = FollowRequestMutation.Field()
     unfollow_user = UnfollowUser.Field()
     remove_follower = RemoveFollower.Field()
+    request_follow_many = RequestFollowMany.Field()
+    respond_to_follow_requests = RespondToFollowRequests.Field()
+    remove_followers = RemoveFollowers.Field()
 
  
 class Query(graphene.ObjectType):
     """Definición de las consultas disponibles."""
-    follow_requests_received = graphene.List(FollowRequestType)
-    following = graphene.List(UserType)
-    followers = graphene.List(UserType)
+    follow_requests_received = graphene.Field(FollowRequestConnection, first=graphene.Int(), after=graphene.String())
+    following = graphene.Field(UserConnection, first=graphene.Int(), after=graphene.String())
+    followers = graphene.Field(UserConnection, first=graphene.Int(), after=graphene.String())
 
     @login_required
-    def resolve_follow_requests_received(self, info):
+    def resolve_follow_requests_received(self, info, first=None, after=None):
         # Obtener las solicitudes de seguimiento recibidas por el usuario autenticado
         user = info.context.user
-        return Follow.objects.filter(following=user, status='pending')
+        requests = Follow.objects.filter(following=user, status='pending')
+        return paginate_by_pk(FollowRequestConnection, optimize(requests, info), first, after)
     
     @login_required
-    def resolve_following(self, info):
+    def resolve_following(self, info, first=None, after=None):
         # Obtener la lista de usuarios que sigue el usuario autenticado
         user = info.context.user
-        following_users = Follow.objects.filter(follower=user, status='approved')
-        return [follow.following for follow in following_users]
+        users = get_user_model().objects.filter(following__follower=user, following__status='approved')
+        return paginate_by_pk(UserConnection, optimize(users, info), first, after)
 
     @login_required
-    def resolve_followers(self, info):
+    def resolve_followers(self, info, first=None, after=None):
         # Obtener la lista de usuarios que siguen al usuario autenticado
         user = info.context.user
-        follower_users = Follow.objects.filter(following=user, status='approved')
-        return [follow.follower for follow in follower_users]
-
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+        users = get_user_model().objects.filter(follower__following=user, follower__status='approved')
+        return paginate_by_pk(UserConnection, optimize(users, info), first, after)
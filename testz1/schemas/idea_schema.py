@@ -2,13 +2,30 @@ import graphene
 from graphene_django.types import DjangoObjectType
 from graphql_jwt.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.db.models import F
-from ..models import Idea, VISIBILITY_CHOICES, Follow
+from django.db import transaction
+from ..models import Idea, VISIBILITY_CHOICES, TimelineEntry
+from ..counters import update_idea_counts
+from ..follow_graph import get_following_ids
+from ..search import IDEA_SEARCH_KEYS, search_ideas
+from .pagination import paginate, paginate_by_keys
+from .loaders import load_related
+from .optimizer import optimize
 
 # Definición del tipo GraphQL para el modelo de Idea
 class IdeaType(DjangoObjectType):
     class Meta:
         model = Idea
+        fields = ('id', 'text', 'author', 'visibility', 'created_at')
+
+    def resolve_author(self, info):
+        # Los autores de todas las ideas de la lista se cargan en una única consulta
+        return load_related(self, info, 'author')
+
+
+class IdeaConnection(graphene.relay.Connection):
+    """Conexión paginada por cursor de ideas, de más recientes a más antiguas (o por relevancia en las búsquedas)."""
+    class Meta:
+        node = IdeaType
 
 
 class CreateIdea(graphene.Mutation):
@@ -28,7 +45,9 @@ class CreateIdea(graphene.Mutation):
         if visibility not in valid_visibility_choices:
             raise Exception('La visibilidad seleccionada no es válida.')
 
-        idea = Idea.objects.create(text=text, author=user, visibility=visibility)
+        with transaction.atomic():
+            idea = Idea.objects.create(text=text, author=user, visibility=visibility)
+            update_idea_counts(user.id, new_visibility=visibility)
 
         # Devolver la idea creada en la respuesta
         return CreateIdea(idea=idea)
@@ -44,23 +63,27 @@ class SetIdeaVisibility(graphene.Mutation):
     @login_required
     def mutate(self, info, idea_id, visibility):
 
-        # Verificar si el usuario es el autor de la idea
-        try:
-            idea = Idea.objects.get(id=idea_id)
-        except Idea.DoesNotExist:
-            raise Exception('La idea no existe.')
-
-        if info.context.user != idea.author:
-            raise Exception('No tienes permisos para cambiar la visibilidad de esta idea.')
-
         # Verificar si la visibilidad es una opción válida
         valid_visibility_choices = [choice[0] for choice in VISIBILITY_CHOICES]
         if visibility not in valid_visibility_choices:
             raise Exception('La visibilidad seleccionada no es válida.')
 
-        # Actualizar la visibilidad de la idea y guardarla en la base de datos
-        idea.visibility = visibility
-        idea.save()
+        with transaction.atomic():
+            # Verificar si el usuario es el autor de la idea; la fila se bloquea para que los contadores
+            # partan de la visibilidad vigente
+            try:
+                idea = Idea.objects.select_for_update().get(id=idea_id)
+            except Idea.DoesNotExist:
+                raise Exception('La idea no existe.')
+
+            if info.context.user.id != idea.author_id:
+                raise Exception('No tienes permisos para cambiar la visibilidad de esta idea.')
+
+            # Actualizar la visibilidad de la idea y guardarla en la base de datos
+            old_visibility = idea.visibility
+            idea.visibility = visibility
+            idea.save()
+            update_idea_counts(idea.author_id, old_visibility, visibility)
 
         return SetIdeaVisibility(idea=idea)
 
@@ -72,17 +95,19 @@ class DeleteIdea(graphene.Mutation):
 
     @login_required
     def mutate(self, info, idea_id):
-        # Verificar si la idea existe y si el usuario autenticado es el autor
-        try:
-            idea = Idea.objects.get(id=idea_id)
-        except Idea.DoesNotExist:
-            raise Exception('La idea no existe.')
+        with transaction.atomic():
+            # Verificar si la idea existe y si el usuario autenticado es el autor
+            try:
+                idea = Idea.objects.select_for_update().get(id=idea_id)
+            except Idea.DoesNotExist:
+                raise Exception('La idea no existe.')
 
-        if info.context.user != idea.author:
-            raise Exception('No tienes permisos para eliminar esta idea.')
+            if info.context.user.id != idea.author_id:
+                raise Exception('No tienes permisos para eliminar esta idea.')
 
-        # Eliminar la idea de la base de datos
-        idea.delete()
+            # Eliminar la idea de la base de datos
+            idea.delete()
+            update_idea_counts(idea.author_id, old_visibility=idea.visibility)
 
         return DeleteIdea(success=True)
 
@@ -97,65 +122,49 @@ class Mutation(graphene.ObjectType):
 
 class Query(graphene.ObjectType):
     """Definición de las consultas disponibles."""
-    ideas = graphene.List(IdeaType)
-    ideas_by_user = graphene.List(IdeaType, username=graphene.String(required=True))
-    timeline = graphene.List(IdeaType)
+    ideas = graphene.Field(IdeaConnection, first=graphene.Int(), after=graphene.String())
+    ideas_by_user = graphene.Field(IdeaConnection, username=graphene.String(required=True), first=graphene.Int(), after=graphene.String())
+    timeline = graphene.Field(IdeaConnection, first=graphene.Int(), after=graphene.String())
+    search_ideas = graphene.Field(IdeaConnection, search_query=graphene.String(required=True), first=graphene.Int(), after=graphene.String())
     
     @login_required
-    def resolve_ideas(self, info):
-        # Consultar todas las ideas del usuario autenticado ordenadas de mas recientes a mas antiguas
+    def resolve_ideas(self, info, first=None, after=None):
+        # Consultar las ideas del usuario autenticado ordenadas de mas recientes a mas antiguas
         user = info.context.user
-        return Idea.objects.filter(author=user).order_by(F('created_at').desc())
+        ideas = optimize(Idea.objects.filter(author=user), info, fields=['created_at'])
+        return paginate(IdeaConnection, ideas, first, after)
     
     @login_required
-    def resolve_ideas_by_user(self, info, username):
+    def resolve_ideas_by_user(self, info, username, first=None, after=None):
         # Obtener el usuario cuyas ideas queremos ver
         try:
             user = get_user_model().objects.get(username=username)
         except get_user_model().DoesNotExist:
             raise Exception('El usuario especificado no existe.')
 
-        # Obtener todas las ideas del usuario
-        ideas = Idea.objects.filter(author=user)
-
-        following_users = []
-
-        # Obtén la lista de usuarios que sigue
-        following_users = Follow.objects.filter(follower=info.context.user, status='approved').values_list('following', flat=True)
-
-        visible_ideas = []
+        # Aplicar las reglas de visibilidad en la consulta; los usuarios seguidos se leen de la caché
+        follows_author = user.id in get_following_ids(info.context.user.id)
+        ideas = Idea.objects.filter(author=user).visible_to(info.context.user, follows_author=follows_author)
+        ideas = optimize(ideas, info, fields=['created_at'])
 
-        for idea in ideas:
-            if idea.visibility == 'public':
-                # Idea pública, siempre visible para todos
-                visible_ideas.append(idea)
-            elif idea.visibility == 'protected' and (idea.author.id in following_users or idea.author == info.context.user):
-                # Idea protegida, solo visible si el autor es seguido por el usuario autenticado
-                visible_ideas.append(idea)
-            elif idea.visibility == 'private' and idea.author == info.context.user:
-                # Idea privada, solo visible para el propio usuario
-                visible_ideas.append(idea)
-
-        return visible_ideas
+        return paginate(IdeaConnection, ideas, first, after)
 
     @login_required
-    def resolve_timeline(self, info):
+    def resolve_timeline(self, info, first=None, after=None):
         # Obtener el usuario autenticado desde el contexto
         user = info.context.user
 
-        # Obtener todas las ideas del usuario autenticado
-        user_ideas = Idea.objects.filter(author=user)
-
-        # Obtener la lista de usuarios que sigue el usuario autenticado
-        following_users = Follow.objects.filter(follower=user, status='approved').values_list('following', flat=True)
+        # El timeline está materializado (ver TimelineEntry): sus ideas y las de los usuarios que sigue
+        # con visibilidad "public" o "protected", ordenadas de más recientes a más antiguas
+        entries = optimize(TimelineEntry.objects.filter(user=user), info, fields=['created_at'], related='idea')
 
-        # Obtener todas las ideas de los usuarios seguidos por el usuario autenticado con visibilidad "public" o "protected"
-        following_ideas = Idea.objects.filter(author__in=following_users, visibility__in=['public', 'protected'])
+        return paginate(IdeaConnection, entries, first, after, keys=('created_at', 'idea_id'), node=lambda entry: entry.idea)
 
-        # Combinar y ordenar las ideas en un solo timeline
-        timeline_ideas = list(user_ideas) + list(following_ideas)
-        timeline_ideas.sort(key=lambda idea: idea.created_at, reverse=True)
-
-        return timeline_ideas
+    @login_required
+    def resolve_search_ideas(self, info, search_query, first=None, after=None):
+        # Buscar en el texto de las ideas que puede ver el usuario autenticado; la visibilidad, la
+        # relevancia y la paginación se resuelven en la misma consulta
+        ideas = search_ideas(Idea.objects.visible_to(info.context.user), search_query)
+        ideas = optimize(ideas, info)
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+        return paginate_by_keys(IdeaConnection, ideas, IDEA_SEARCH_KEYS, first, after)
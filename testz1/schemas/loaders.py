@@ -0,0 +1,88 @@
+"""
+DataLoaders con ámbito de petición para resolver relaciones sin consultas N+1.
+
+Cada vez que un resolver devuelve una lista de objetos, `DataLoaderMiddleware` encola las claves
+foráneas de esos objetos en el loader del modelo relacionado. Al resolver la primera relación
+(`IdeaType.author`, `FollowRequestType.follower`...) el loader carga de una vez todas las claves
+encoladas con una única consulta `IN`, y el resto de filas del mismo nivel se sirven desde su caché.
+"""
+from django.db import models
+
+
+class DataLoader:
+    """Carga por lotes objetos de un modelo a partir de su clave primaria, cacheándolos por petición."""
+
+    def __init__(self, model):
+        self.model = model
+        self.cache = {}
+        self.queue = set()
+
+    def prime(self, keys):
+        """Encola claves para cargarlas en el siguiente lote."""
+        self.queue.update(key for key in keys if key is not None and key not in self.cache)
+
+    def load(self, key):
+        """Devuelve el objeto con clave `key`, cargando en la misma consulta todas las claves encoladas."""
+        if key is None:
+            return None
+        if key not in self.cache:
+            keys = self.queue | {key}
+            self.queue = set()
+            objects = {obj.pk: obj for obj in self.model._default_manager.filter(pk__in=keys)}
+            for pk in keys:
+                self.cache[pk] = objects.get(pk)
+        return self.cache[key]
+
+
+def get_loader(info, model):
+    """Devuelve el loader de `model` asociado a la petición en curso."""
+    context = info.context
+    if not hasattr(context, 'dataloaders'):
+        context.dataloaders = {}
+    if model not in context.dataloaders:
+        context.dataloaders[model] = DataLoader(model)
+    return context.dataloaders[model]
+
+
+def load_related(instance, info, field_name):
+    """Resuelve la clave foránea `field_name` de `instance` a través del loader del modelo relacionado."""
+    field = instance._meta.get_field(field_name)
+
+    # Si la relación ya se cargó (por ejemplo con select_related) no hace falta consultar
+    if field.is_cached(instance):
+        return getattr(instance, field_name)
+
+    related = get_loader(info, field.related_model).load(getattr(instance, field.attname))
+    field.set_cached_value(instance, related)
+    return related
+
+
+def prime_related(info, instances):
+    """Encola las claves foráneas de `instances` en los loaders de sus modelos relacionados."""
+    for instance in instances:
+        if not isinstance(instance, models.Model):
+            continue
+        # Las columnas no cargadas (por ejemplo con only()) no se consultan: sus relaciones no se piden
+        deferred = instance.get_deferred_fields()
+        for field in instance._meta.concrete_fields:
+            if field.is_relation and field.many_to_one and field.attname not in deferred and not field.is_cached(instance):
+                get_loader(info, field.related_model).prime([getattr(instance, field.attname)])
+
+
+class DataLoaderMiddleware:
+    """Middleware de graphene que prepara los loaders con las filas de cada lista resuelta."""
+
+    def resolve(self, next, root, info, **args):
+        result = next(root, info, **args)
+
+        if isinstance(result, models.QuerySet):
+            # La lista se evalúa aquí (en lugar de al serializarla) para conocer sus claves foráneas
+            result = list(result)
+            prime_related(info, result)
+        elif isinstance(result, (list, tuple)):
+            prime_related(info, result)
+        elif hasattr(result, 'edges'):
+            # Conexiones paginadas: las filas están en los nodos de cada arista
+            prime_related(info, [edge.node for edge in result.edges])
+
+        return result
@@ -0,0 +1,86 @@
+import graphene
+from graphene_django.types import DjangoObjectType
+from graphql_jwt.decorators import login_required
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from ..models import Notification
+from .pagination import paginate, decode_cursor
+from .loaders import load_related
+from .optimizer import optimize
+
+# Definición del tipo GraphQL para el modelo de Notificación
+class NotificationType(DjangoObjectType):
+    class Meta:
+        model = Notification
+        fields = ('id', 'user', 'idea', 'created_at', 'mensaje', 'leida')
+
+    def resolve_user(self, info):
+        return load_related(self, info, 'user')
+
+    def resolve_idea(self, info):
+        # Las ideas de todas las notificaciones de la página se cargan en una única consulta
+        return load_related(self, info, 'idea')
+
+
+class NotificationConnection(graphene.relay.Connection):
+    """Conexión paginada por cursor de notificaciones, de más recientes a más antiguas."""
+    class Meta:
+        node = NotificationType
+
+
+class MarkNotificationsRead(graphene.Mutation):
+    """Mutación para marcar como leídas las notificaciones hasta un cursor (incluido) o todas."""
+    updated = graphene.Int()
+    unread_count = graphene.Int()
+
+    class Arguments:
+        up_to = graphene.String()
+
+    @login_required
+    def mutate(self, info, up_to=None):
+        user = info.context.user
+
+        notifications = Notification.objects.filter(user=user, leida=False)
+        if up_to:
+            # Notificaciones anteriores o iguales al cursor en el orden de la bandeja
+            created_at, pk = decode_cursor(up_to)
+            notifications = notifications.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk))
+
+        # Marcar el rango con una única sentencia UPDATE y descontarlo del contador
+        with transaction.atomic():
+            updated = notifications.update(leida=True)
+            if updated:
+                get_user_model().objects.filter(pk=user.pk).update(
+                    unread_notifications=Greatest(F('unread_notifications') - updated, 0)
+                )
+
+        user.refresh_from_db(fields=['unread_notifications'])
+        return MarkNotificationsRead(updated=updated, unread_count=user.unread_notifications)
+
+
+class Mutation(graphene.ObjectType):
+    """Definición de las mutaciones disponibles."""
+    mark_notifications_read = MarkNotificationsRead.Field()
+
+
+class Query(graphene.ObjectType):
+    """Definición de las consultas disponibles."""
+    notifications = graphene.Field(NotificationConnection, first=graphene.Int(), after=graphene.String(), unread_only=graphene.Boolean())
+    unread_count = graphene.Int()
+
+    @login_required
+    def resolve_notifications(self, info, first=None, after=None, unread_only=False):
+        # Bandeja de notificaciones del usuario autenticado, de más recientes a más antiguas
+        notifications = Notification.objects.filter(user=info.context.user)
+        if unread_only:
+            notifications = notifications.filter(leida=False)
+
+        notifications = optimize(notifications, info, fields=['created_at'])
+        return paginate(NotificationConnection, notifications, first, after)
+
+    @login_required
+    def resolve_unread_count(self, info):
+        # Contador desnormalizado: no requiere contar las notificaciones
+        return info.context.user.unread_notifications
@@ -0,0 +1,139 @@
+"""
+Optimizador de consultas a partir del conjunto de selección de GraphQL.
+
+Inspecciona los campos que ha pedido el cliente y ajusta el queryset del resolver con
+`only()`, `select_related()` y `prefetch_related()`, de modo que se cargan en las mismas
+consultas únicamente las columnas y relaciones que se van a devolver.
+"""
+import graphene
+from django.db import models
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.fields import DjangoListField
+from graphene_django.registry import get_global_registry
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def collect_selections(info, field_nodes=None):
+    """Devuelve el árbol {campo: subárbol} de campos seleccionados, con los nombres en snake_case."""
+    tree = {}
+    for field_node in field_nodes if field_nodes is not None else info.field_nodes:
+        if field_node.selection_set:
+            merge_selections(info, field_node.selection_set.selections, tree)
+    return tree
+
+
+def merge_selections(info, selections, tree):
+    for selection in selections:
+        if isinstance(selection, FieldNode):
+            name = to_snake_case(selection.name.value)
+            subtree = tree.setdefault(name, {})
+            if selection.selection_set:
+                merge_selections(info, selection.selection_set.selections, subtree)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments[selection.name.value]
+            merge_selections(info, fragment.selection_set.selections, tree)
+        elif isinstance(selection, InlineFragmentNode):
+            merge_selections(info, selection.selection_set.selections, tree)
+
+
+def get_node_selections(info):
+    """Devuelve los campos seleccionados de cada fila, atravesando `edges { node }` en las conexiones."""
+    tree = collect_selections(info)
+    if 'edges' in tree:
+        return tree['edges'].get('node', {})
+    return tree
+
+
+def get_model_field(model, name):
+    """Busca el campo del modelo que corresponde a un campo de GraphQL (incluidas relaciones inversas)."""
+    for field in model._meta.get_fields():
+        if field.name == name or (field.auto_created and not field.concrete and field.get_accessor_name() == name):
+            return field
+    return None
+
+
+def exposes_related_list(model, name):
+    """
+    Indica si el tipo GraphQL del modelo expone la relación `name` como la lista completa de filas
+    relacionadas. Los campos propios con el mismo nombre (por ejemplo conexiones paginadas) no se
+    precargan: sus resolvers hacen su propia consulta.
+    """
+    graphene_type = get_global_registry().get_type_for_model(model)
+    field = graphene_type._meta.fields.get(name) if graphene_type else None
+    if isinstance(field, graphene.Dynamic):
+        field = field.get_type()
+    return isinstance(field, DjangoListField)
+
+
+def plan(model, tree, prefix=''):
+    """Calcula las columnas (only), relaciones directas (select_related) y prefetches para `tree`."""
+    only = {prefix + model._meta.pk.name}
+    select_related = set()
+    prefetch = []
+
+    for name, subtree in tree.items():
+        field = get_model_field(model, name)
+        if field is None:
+            continue
+
+        if field.concrete and not field.is_relation:
+            only.add(prefix + field.name)
+        elif field.many_to_one or (field.one_to_one and field.concrete):
+            # Relación directa: se trae en la misma consulta con un JOIN
+            select_related.add(prefix + field.name)
+            related_only, related_select, related_prefetch = plan(field.related_model, subtree, prefix + field.name + '__')
+            only.add(prefix + field.name)
+            only |= related_only
+            select_related |= related_select
+            prefetch += related_prefetch
+        elif exposes_related_list(model, name):
+            # Relación inversa o many-to-many: se carga con una consulta adicional por nivel
+            related_queryset = field.related_model._default_manager.all()
+            if field.one_to_many:
+                # La clave foránea hacia el padre es necesaria para repartir las filas precargadas
+                related_queryset = optimize_queryset(related_queryset, subtree, fields=[field.field.name])
+            else:
+                related_queryset = optimize_queryset(related_queryset, subtree)
+            prefetch.append(Prefetch(prefix + get_accessor_name(field), queryset=related_queryset))
+
+    return only, select_related, prefetch
+
+
+def get_accessor_name(field):
+    return field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+
+
+def optimize_queryset(queryset, tree, fields=()):
+    """Aplica al queryset el plan de carga correspondiente al árbol de selección `tree`."""
+    only, select_related, prefetch = plan(queryset.model, tree)
+    only.update(fields)
+
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
+
+
+def optimize(queryset, info, fields=(), related=None):
+    """
+    Optimiza `queryset` para los campos pedidos en la consulta en curso.
+
+    `fields` son columnas que el resolver necesita siempre (por ejemplo las claves de paginación) y
+    `related` indica la relación del modelo del queryset que representan las filas devueltas.
+    """
+    tree = get_node_selections(info)
+    if related:
+        tree = {related: tree}
+    return optimize_queryset(queryset, tree, fields)
+
+
+class QueryOptimizerMiddleware:
+    """Middleware de graphene que optimiza los querysets devueltos por los resolvers."""
+
+    def resolve(self, next, root, info, **args):
+        result = next(root, info, **args)
+        if isinstance(result, models.QuerySet) and result._result_cache is None:
+            result = optimize(result, info)
+        return result
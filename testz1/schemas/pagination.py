@@ -0,0 +1,131 @@
+import base64
+import graphene
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+
+def get_page_size(first):
+    """Devuelve el tamaño de página solicitado, limitado al máximo configurado."""
+    if first is None:
+        return getattr(settings, 'GRAPHQL_PAGE_SIZE', 20)
+    if first < 0:
+        raise Exception('El argumento "first" no puede ser negativo.')
+    return min(first, getattr(settings, 'GRAPHQL_MAX_PAGE_SIZE', 100))
+
+
+def encode_cursor(created_at, pk):
+    """Codifica la clave (created_at, id) de una fila en un cursor opaco."""
+    value = f'{created_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor generado por `encode_cursor`."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        raise Exception('El cursor proporcionado no es válido.')
+    if created_at is None:
+        raise Exception('El cursor proporcionado no es válido.')
+    return created_at, pk
+
+
+def paginate(connection_type, queryset, first=None, after=None, keys=('created_at', 'id'), node=None):
+    """
+    Devuelve una página de `connection_type` a partir de `queryset` usando paginación por clave (keyset).
+
+    Las filas se ordenan de más recientes a más antiguas por `keys` (fecha, id) y la página se obtiene
+    buscando directamente la posición del cursor, por lo que el coste no depende de la página pedida.
+    """
+    date_key, pk_key = keys
+    page_size = get_page_size(first)
+
+    queryset = queryset.order_by(F(date_key).desc(), F(pk_key).desc())
+    if after:
+        created_at, pk = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(**{f'{date_key}__lt': created_at}) | Q(**{date_key: created_at, f'{pk_key}__lt': pk})
+        )
+
+    # Se pide una fila de más para saber si existe una página siguiente
+    rows = list(queryset[:page_size + 1])
+    return build_connection(
+        connection_type, rows, page_size, after,
+        lambda row: encode_cursor(getattr(row, date_key), getattr(row, pk_key)), node,
+    )
+
+
+def encode_keys_cursor(values):
+    """Codifica los valores enteros de la clave de una fila en un cursor opaco."""
+    value = '|'.join(str(value) for value in values)
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_keys_cursor(cursor, count):
+    """Decodifica un cursor generado por `encode_keys_cursor` con `count` valores."""
+    try:
+        values = [int(value) for value in base64.urlsafe_b64decode(cursor.encode()).decode().split('|')]
+    except (ValueError, UnicodeError):
+        raise Exception('El cursor proporcionado no es válido.')
+    if len(values) != count:
+        raise Exception('El cursor proporcionado no es válido.')
+    return values
+
+
+def paginate_by_keys(connection_type, queryset, keys, first=None, after=None, node=None):
+    """
+    Devuelve una página de `connection_type` a partir de `queryset` ordenando por `keys`, una lista de
+    campos o anotaciones enteras (con el prefijo '-' para orden descendente) cuyo último elemento
+    identifica cada fila.
+    """
+    page_size = get_page_size(first)
+    names = [key.lstrip('-') for key in keys]
+
+    queryset = queryset.order_by(*keys)
+    if after:
+        values = decode_keys_cursor(after, len(keys))
+        # Filas posteriores al cursor en el orden lexicográfico de la clave
+        condition = Q()
+        for position in reversed(range(len(keys))):
+            lookup = 'lt' if keys[position].startswith('-') else 'gt'
+            equal = {name: value for name, value in zip(names[:position], values)}
+            condition |= Q(**equal, **{f'{names[position]}__{lookup}': values[position]})
+        queryset = queryset.filter(condition)
+
+    rows = list(queryset[:page_size + 1])
+    return build_connection(
+        connection_type, rows, page_size, after,
+        lambda row: encode_keys_cursor(getattr(row, name) for name in names), node,
+    )
+
+
+def paginate_by_pk(connection_type, queryset, first=None, after=None, node=None):
+    """
+    Devuelve una página de `connection_type` a partir de `queryset` ordenando por id ascendente, para
+    los modelos que no tienen fecha de creación (usuarios, seguimientos).
+    """
+    return paginate_by_keys(connection_type, queryset, ('pk',), first, after, node)
+
+
+def build_connection(connection_type, rows, page_size, after, get_cursor, node=None):
+    """Construye la conexión a partir de las filas leídas (como máximo `page_size` + 1)."""
+    has_next_page = len(rows) > page_size
+    rows = rows[:page_size]
+
+    edges = [
+        connection_type.Edge(node=node(row) if node else row, cursor=get_cursor(row))
+        for row in rows
+    ]
+
+    return connection_type(
+        edges=edges,
+        page_info=graphene.relay.PageInfo(
+            has_next_page=has_next_page,
+            has_previous_page=bool(after),
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
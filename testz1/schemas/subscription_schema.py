@@ -0,0 +1,42 @@
+import graphene
+from asgiref.sync import sync_to_async
+from graphql_jwt.decorators import login_required
+from ..models import Idea, Notification
+from ..follow_graph import get_following_ids
+from ..pubsub import subscribe
+from .idea_schema import IdeaType
+from .notification_schema import NotificationType
+
+
+class Subscription(graphene.ObjectType):
+    """Definición de las suscripciones disponibles (servidas por WebSocket)."""
+    notification_created = graphene.Field(NotificationType)
+    timeline_updated = graphene.Field(IdeaType)
+
+    @login_required
+    async def subscribe_notification_created(root, info):
+        # Notificaciones nuevas del usuario autenticado, publicadas por el worker de notificaciones
+        user = info.context.user
+        async for message in subscribe('notifications'):
+            if user.id not in message['user_ids']:
+                continue
+            notification = await Notification.objects.select_related('user', 'idea').filter(
+                user=user, idea_id=message['idea_id']
+            ).afirst()
+            if notification is not None:
+                yield notification
+
+    @login_required
+    async def subscribe_timeline_updated(root, info):
+        # Ideas nuevas que aparecen en el timeline del usuario autenticado: las suyas y las de los
+        # usuarios que sigue con visibilidad "public" o "protected"
+        user = info.context.user
+        async for message in subscribe('ideas'):
+            if message['author_id'] != user.id:
+                if message['visibility'] not in ('public', 'protected'):
+                    continue
+                if message['author_id'] not in await sync_to_async(get_following_ids)(user.id):
+                    continue
+            idea = await Idea.objects.select_related('author').filter(pk=message['idea_id']).afirst()
+            if idea is not None:
+                yield idea
@@ -5,11 +5,65 @@ from django.contrib.auth import get_user_model
 from graphql_jwt.decorators import login_required
 from graphql_jwt import ObtainJSONWebToken
 import graphql_jwt
+from ..auth import revoke_tokens
+from ..models import Idea
+from ..ratelimit import check_auth_rate_limit
+from ..follow_graph import get_following_ids
+from ..search import USER_SEARCH_KEYS, search_users
+from .idea_schema import IdeaConnection
+from .optimizer import optimize
+from .pagination import paginate, paginate_by_keys, paginate_by_pk
 
 class UserType(DjangoObjectType):
     """Definición del tipo GraphQL para el modelo de usuario."""
     class Meta:
         model = get_user_model()
+        # Solo se exponen los campos públicos; las relaciones inversas se exponen como conexiones paginadas
+        # y sus totales como contadores desnormalizados de la propia fila
+        fields = ('id', 'email', 'username', 'followers_count', 'following_count', 'public_ideas_count')
+
+    ideas = graphene.Field(IdeaConnection, first=graphene.Int(), after=graphene.String())
+    followers = graphene.Field(lambda: UserConnection, first=graphene.Int(), after=graphene.String())
+    following = graphene.Field(lambda: UserConnection, first=graphene.Int(), after=graphene.String())
+    pending_follow_requests_count = graphene.Int(description='Solicitudes de seguimiento pendientes (solo para el propio usuario).')
+    protected_ideas_count = graphene.Int(description='Ideas protegidas (solo para el propio usuario y sus seguidores).')
+    private_ideas_count = graphene.Int(description='Ideas privadas (solo para el propio usuario).')
+
+    def resolve_ideas(self, info, first=None, after=None):
+        # Ideas del usuario que puede ver el usuario autenticado
+        viewer = info.context.user
+        ideas = Idea.objects.filter(author=self)
+        if viewer.is_authenticated:
+            ideas = ideas.visible_to(viewer, follows_author=self.id in get_following_ids(viewer.id))
+        else:
+            ideas = ideas.filter(visibility='public')
+        return paginate(IdeaConnection, optimize(ideas, info, fields=['created_at']), first, after)
+
+    def resolve_pending_follow_requests_count(self, info):
+        return self.pending_follow_requests_count if info.context.user.id == self.id else None
+
+    def resolve_protected_ideas_count(self, info):
+        viewer = info.context.user
+        if viewer.id == self.id or (viewer.is_authenticated and self.id in get_following_ids(viewer.id)):
+            return self.protected_ideas_count
+        return None
+
+    def resolve_private_ideas_count(self, info):
+        return self.private_ideas_count if info.context.user.id == self.id else None
+
+    def resolve_followers(self, info, first=None, after=None):
+        users = get_user_model().objects.filter(follower__following=self, follower__status='approved')
+        return paginate_by_pk(UserConnection, optimize(users, info), first, after)
+
+    def resolve_following(self, info, first=None, after=None):
+        users = get_user_model().objects.filter(following__follower=self, following__status='approved')
+        return paginate_by_pk(UserConnection, optimize(users, info), first, after)
+
+
+class UserConnection(graphene.relay.Connection):
+    """Conexión paginada por cursor de usuarios (por id o, en las búsquedas, por relevancia)."""
+    class Meta:
+        node = UserType
 
 
 class RegisterUser(graphene.Mutation):
@@ -22,6 +76,7 @@ class RegisterUser(graphene.Mutation):
         password = graphene.String(required=True)
 
     def mutate(self, info, email, username, password):
+        check_auth_rate_limit(info.context)
         user = get_user_model().objects.create_user(
             email=email,
             username=username,
@@ -42,16 +97,27 @@ class ChangePassword(graphene.Mutation):
 
     @login_required
     def mutate(self, info, email, old_password, new_password):
+        check_auth_rate_limit(info.context, email)
         user = get_user_model().objects.get(email=email)
         if user.check_password(old_password):
             user.set_password(new_password)
-            user.save()
+            # Solo se guarda la contraseña: los contadores de la fila pueden haber cambiado (con
+            # expresiones F) mientras se comprobaba la contraseña anterior
+            user.save(update_fields=['password'])
+            # Los tokens emitidos con la contraseña anterior dejan de ser válidos
+            revoke_tokens(user)
             return ChangePassword(user=user)
         raise Exception('Contraseña incorrecta.')
 
 class ObtainJSONWebToken(ObtainJSONWebToken):
     user = graphene.Field(UserType)
 
+    @classmethod
+    def mutate(cls, root, info, **kwargs):
+        # El límite de intentos se comprueba antes de verificar la contraseña
+        check_auth_rate_limit(info.context, kwargs.get(get_user_model().USERNAME_FIELD))
+        return super().mutate(root, info, **kwargs)
+
     @classmethod
     def resolve(cls, root, info, **kwargs):
         user = info.context.user
@@ -104,21 +170,28 @@ class Mutation(graphene.ObjectType):
 
 class Query(graphene.ObjectType):
     """Definición de las consultas disponibles."""
-    users = graphene.List(UserType)
+    users = graphene.Field(UserConnection, first=graphene.Int(), after=graphene.String())
     logged_in = graphene.List(UserType)
-    search_users = graphene.List(UserType, search_query=graphene.String(required=True))
+    search_users = graphene.Field(
+        UserConnection,
+        search_query=graphene.String(required=True),
+        mode=graphene.String(),
+        first=graphene.Int(),
+        after=graphene.String(),
+    )
 
-    def resolve_users(self, info):
-        """Consulta para obtener todos los usuarios registrados."""
-        return get_user_model().objects.all()
+    @login_required
+    def resolve_users(self, info, first=None, after=None):
+        """Consulta para obtener los usuarios registrados, por páginas ordenadas por id."""
+        return paginate_by_pk(UserConnection, optimize(get_user_model().objects.all(), info), first, after)
     
     @login_required
     def resolve_logged_in(self, info):
         return info.context.user
     
     @login_required
-    def resolve_search_users(self, info, search_query):
-        # Realizar la búsqueda de usuarios por su nombre de usuario o parte de él
-        return get_user_model().objects.filter(username__icontains=search_query)
-
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+    def resolve_search_users(self, info, search_query, mode=None, first=None, after=None):
+        # Realizar la búsqueda de usuarios por su nombre de usuario o parte de él ('contains')
+        # o por el comienzo del nombre para el autocompletado ('prefix'), ordenada por relevancia
+        users = search_users(get_user_model().objects.all(), search_query, mode or 'contains')
+        return paginate_by_keys(UserConnection, optimize(users, info), USER_SEARCH_KEYS, first, after)
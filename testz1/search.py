@@ -0,0 +1,90 @@
+"""
+Búsqueda de usuarios por nombre de usuario y de ideas por su texto.
+
+Usuarios: hay dos modos de búsqueda:
+
+- `contains`: usuarios cuyo nombre contiene el texto buscado. En PostgreSQL la condición
+  (`UPPER(username) LIKE '%texto%'`) la resuelve el índice GIN de trigramas (`pg_trgm`) creado en
+  la migración 0016, por lo que no se recorre la tabla completa. Los textos de menos de tres
+  caracteres no tienen trigramas completos y se buscan como prefijo.
+- `prefix` (autocompletado): usuarios cuyo nombre empieza por el texto buscado, resuelto con el
+  índice B-tree `text_pattern_ops` sobre `UPPER(username)`.
+
+Los resultados se ordenan por relevancia: primero la coincidencia exacta, después los nombres que
+empiezan por el texto y por último el resto; dentro de cada grupo, los nombres más cortos (más
+parecidos al texto buscado) y después por id. La ordenación se expresa con anotaciones enteras, de
+modo que la misma consulta funciona en SQLite (sin índices de trigramas) y permite paginar por clave.
+
+Ideas: en PostgreSQL se busca en la columna `Idea.search_vector` (tsvector con índice GIN, mantenida
+por un trigger al escribir) y los resultados se ordenan por `ts_rank`. En SQLite, sin búsqueda de
+texto completo, se buscan las ideas que contienen todas las palabras, de más recientes a más antiguas.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Length
+
+SEARCH_MODES = ('contains', 'prefix')
+
+# Longitud mínima del texto para buscar subcadenas con el índice de trigramas
+MIN_TRIGRAM_LENGTH = 3
+
+# Clave de ordenación (y de los cursores) de los resultados de `search_users`
+USER_SEARCH_KEYS = ('search_rank', 'search_length', 'pk')
+
+
+def search_users(queryset, search_query, mode='contains'):
+    """
+    Filtra `queryset` con los usuarios cuyo nombre coincide con `search_query` y anota las claves de
+    relevancia `USER_SEARCH_KEYS` con las que deben ordenarse.
+    """
+    if mode not in SEARCH_MODES:
+        raise Exception('El modo de búsqueda no es válido.')
+
+    search_query = search_query.strip()
+    if not search_query:
+        queryset = queryset.none()
+    elif mode == 'prefix' or len(search_query) < MIN_TRIGRAM_LENGTH:
+        queryset = queryset.filter(username__istartswith=search_query)
+    else:
+        queryset = queryset.filter(username__icontains=search_query)
+
+    return queryset.annotate(
+        search_rank=Case(
+            When(username__iexact=search_query, then=0),
+            When(username__istartswith=search_query, then=1),
+            default=2,
+            output_field=IntegerField(),
+        ),
+        search_length=Length('username'),
+    )
+
+
+# Configuración de búsqueda de texto de PostgreSQL (la misma que usa el trigger de la migración 0017)
+IDEA_SEARCH_CONFIG = 'spanish'
+
+# Clave de ordenación (y de los cursores) de los resultados de `search_ideas`: relevancia y después
+# de más recientes a más antiguas. La relevancia se guarda como entero para que los cursores sean exactos.
+IDEA_SEARCH_KEYS = ('-search_rank', '-pk')
+IDEA_SEARCH_RANK_SCALE = 1000000
+
+
+def search_ideas(queryset, search_query):
+    """
+    Filtra `queryset` con las ideas cuyo texto coincide con `search_query` y anota la relevancia
+    `search_rank` con la que deben ordenarse (`IDEA_SEARCH_KEYS`).
+    """
+    search_query = search_query.strip()
+    if not search_query:
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(search_query, config=IDEA_SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query) * IDEA_SEARCH_RANK_SCALE, IntegerField()),
+        )
+
+    words = Q()
+    for word in search_query.split():
+        words &= Q(text__icontains=word)
+    return queryset.filter(words).annotate(search_rank=Value(0, output_field=IntegerField()))
@@ -1,14 +1,77 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Follow, Idea, Notification
+from django.contrib.auth import get_user_model
+from .models import Follow, Idea, TimelineEntry
+from .outbox import enqueue_idea_notifications
+from .follow_graph import invalidate_follow, invalidate_user
+from .pubsub import publish
+from .auth import invalidate_token_version
 
 @receiver(post_save, sender=Idea)
 def create_notification(sender, instance, created, **kwargs):
     if created:
-        # Obtener los usuarios que siguen al autor de la idea
-        followers = Follow.objects.filter(following=instance.author, status='approved')
+        # Encolar el envío de las notificaciones a los seguidores del autor; lo ejecuta el worker
+        enqueue_idea_notifications(instance)
 
-        # Crear una notificación para cada seguidor que tenga acceso a la idea
-        for follower in followers:
-            if instance.visibility == 'public' or (instance.visibility == 'protected' and follower.follower == instance.author):
-                Notification.objects.create(user=follower.follower, idea=instance)
+        # Avisar a los suscriptores de timelineUpdated cuando la idea esté confirmada
+        message = {'idea_id': instance.id, 'author_id': instance.author_id, 'visibility': instance.visibility}
+        transaction.on_commit(lambda: publish('ideas', message))
+
+
+@receiver(pre_delete, sender=Idea)
+def update_unread_notifications_on_idea_delete(sender, instance, **kwargs):
+    # Las notificaciones sin leer de la idea se borran en cascada: descontarlas con una única sentencia
+    get_user_model().objects.filter(notification__idea=instance, notification__leida=False).update(
+        unread_notifications=Greatest(F('unread_notifications') - 1, 0)
+    )
+
+
+@receiver(post_save, sender=Idea)
+def update_timelines_on_idea_save(sender, instance, **kwargs):
+    # Publicar la idea (o actualizar su visibilidad) en los timelines de los seguidores
+    TimelineEntry.objects.fan_out_idea(instance)
+
+
+@receiver(post_save, sender=Follow)
+def update_timeline_on_follow_save(sender, instance, **kwargs):
+    # Al aprobar una solicitud se añaden las ideas visibles del seguido; en otro caso se retiran
+    if instance.status == 'approved':
+        TimelineEntry.objects.backfill(instance.follower_id, instance.following_id)
+    else:
+        TimelineEntry.objects.remove_author(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def update_timeline_on_follow_delete(sender, instance, **kwargs):
+    # Dejar de seguir o eliminar un seguidor retira las ideas del timeline
+    TimelineEntry.objects.remove_author(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=Follow)
+def invalidate_follow_graph_on_follow_save(sender, instance, created, **kwargs):
+    # Una solicitud nueva que no está aprobada no cambia el grafo de seguimiento
+    if created and instance.status != 'approved':
+        return
+    invalidate_follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graph_on_follow_delete(sender, instance, **kwargs):
+    invalidate_follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_follow_graph_on_user_create(sender, instance, created, **kwargs):
+    # Un usuario nuevo empieza sin relaciones aunque se reutilice el id de un usuario eliminado
+    if created:
+        invalidate_user(instance.id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_token_version_on_user_change(sender, instance, **kwargs):
+    # La versión de tokens en caché incluye si el usuario está activo: se vuelve a leer tras cada cambio
+    invalidate_token_version(instance.pk)
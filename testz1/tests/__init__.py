@@ -1,4 +1,13 @@
 from .user_tests import *
 from .idea_tests import *
 from .follow_tests import *
-from .notification_tests import *
\ No newline at end of file
+from .notification_tests import *
+from .api_tests import *
+from .index_tests import *
+from .subscription_tests import *
+from .async_tests import *
+from .persisted_query_tests import *
+from .cost_tests import *
+from .request_log_tests import *
+from .auth_tests import *
+from .counter_tests import *
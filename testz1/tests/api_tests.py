@@ -0,0 +1,52 @@
+from graphene_django.utils.testing import GraphQLTestCase
+from django.contrib.auth import get_user_model
+from ..models import Idea, Follow
+
+class ApiTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def test_single_request_across_domains(self):
+        """
+        Prueba de una única petición al endpoint unificado con datos de ideas, seguimientos y usuarios.
+        """
+        user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        Follow.objects.create(follower=follower, following=user, status='pending')
+        Idea.objects.create(text='Nueva idea', author=user, visibility='private')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='test@example.com', password='testpassword')
+
+        query = '''
+            query {
+                timeline {
+                    edges {
+                        node {
+                            text
+                        }
+                    }
+                }
+                followRequestsReceived {
+                    edges {
+                        node {
+                            follower {
+                                username
+                            }
+                        }
+                    }
+                }
+                searchUsers(searchQuery: "testuser") {
+                    edges { node { email } }
+                }
+            }
+            '''
+
+        response = self.query(query)
+
+        # Verificar que no haya errores en la respuesta
+        self.assertResponseNoErrors(response)
+
+        data = response.json()['data']
+        self.assertEqual(data['timeline']['edges'][0]['node']['text'], 'Nueva idea')
+        self.assertEqual(data['followRequestsReceived']['edges'][0]['node']['follower']['username'], 'follower')
+        self.assertEqual(data['searchUsers']['edges'][0]['node']['email'], 'test@example.com')
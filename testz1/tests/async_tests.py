@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+from asgiref.sync import async_to_sync
+from graphene_django.utils.testing import GraphQLTestCase
+from graphql_jwt.shortcuts import get_token
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from ..models import Idea, Follow
+from ..schemas import concurrency, schema
+from ..views.async_graphql import AsyncGraphQLView
+from ..views.persisted_queries import PersistedQueryGraphQLView
+
+QUERY = '''
+    query {
+        timeline { edges { node { text author { username } } } }
+        followRequestsReceived { edges { node { follower { username } } } }
+        ideasByUser(username: "follower") { edges { node { text } } }
+    }
+    '''
+
+
+def create_data():
+    user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+    follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+    Follow.objects.create(follower=follower, following=user, status='pending')
+    Follow.objects.create(follower=user, following=follower, status='approved')
+    Idea.objects.create(text='Idea propia', author=user, visibility='private')
+    Idea.objects.create(text='Idea del seguido', author=follower, visibility='protected')
+    return user
+
+
+async def wait(awaitable):
+    return await awaitable
+
+
+def post(view, user, query):
+    """Ejecuta una petición GraphQL contra `view` (síncrona o asíncrona) y devuelve la respuesta decodificada."""
+    headers = {'HTTP_AUTHORIZATION': f'JWT {get_token(user)}'} if user else {}
+    request = RequestFactory().post('/api/graphql/', json.dumps({'query': query}), content_type='application/json', **headers)
+    request.user = AnonymousUser()
+    response = view(request)
+    if asyncio.iscoroutine(response):
+        response = async_to_sync(wait)(response)
+    return json.loads(response.content)
+
+
+class AsyncViewTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    @override_settings(GRAPHQL_PARALLEL_ROOT_FIELDS=False)
+    def test_async_view_matches_sync_view(self):
+        """
+        Prueba de que la vista asíncrona devuelve lo mismo que la síncrona, incluidos los errores y las mutaciones.
+        """
+        user = create_data()
+        sync_view = PersistedQueryGraphQLView.as_view(schema=schema)
+        async_view = AsyncGraphQLView.as_view(schema=schema)
+
+        expected = post(sync_view, user, QUERY)
+        self.assertNotIn('errors', expected)
+        self.assertEqual(post(async_view, user, QUERY), expected)
+
+        # Errores de validación y de permisos
+        self.assertEqual(post(async_view, user, 'query { noExiste }'), post(sync_view, user, 'query { noExiste }'))
+        anonymous_query = 'query { followRequestsReceived { edges { node { id } } } }'
+        self.assertEqual(post(async_view, None, anonymous_query), post(sync_view, None, anonymous_query))
+
+        # Las mutaciones se ejecutan en orden en la vista asíncrona
+        response = post(async_view, user, 'mutation { createIdea(text: "Idea asíncrona", visibility: "public") { idea { text } } }')
+        self.assertEqual(response['data']['createIdea']['idea']['text'], 'Idea asíncrona')
+
+
+class AsyncConcurrencyTest(TransactionTestCase):
+
+    def test_root_fields_run_concurrently(self):
+        """
+        Prueba de que los campos raíz independientes se resuelven a la vez en la vista asíncrona.
+        """
+        user = create_data()
+        view = AsyncGraphQLView.as_view(schema=schema)
+
+        # Cada campo raíz espera a que los demás hayan empezado: si se ejecutasen en serie la barrera caducaría
+        barrier = threading.Barrier(3, timeout=5)
+        original = concurrency.resolve_with_new_connection
+
+        def resolve(next, root, info, args):
+            barrier.wait()
+            return original(next, root, info, args)
+
+        with mock.patch.object(concurrency, 'resolve_with_new_connection', resolve):
+            response = post(view, user, QUERY)
+
+        self.assertNotIn('errors', response)
+        self.assertEqual([edge['node']['text'] for edge in response['data']['timeline']['edges']], ['Idea del seguido', 'Idea propia'])
+        self.assertEqual(response['data']['followRequestsReceived']['edges'], [{'node': {'follower': {'username': 'follower'}}}])
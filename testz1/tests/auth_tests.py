@@ -0,0 +1,127 @@
+import threading
+from unittest import mock
+from graphene_django.utils.testing import GraphQLTestCase
+from graphql_jwt.shortcuts import get_token
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from .. import auth, hashers
+from ..auth import token_cache
+from ..hashers import PasswordHashPool
+
+
+class JWTAuthenticationTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+
+    def headers(self, user=None):
+        return {'HTTP_AUTHORIZATION': f'JWT {get_token(user or self.user)}'}
+
+    def test_token_verified_once(self):
+        """
+        Prueba de que el token se verifica una vez y las peticiones siguientes usan la caché de tokens.
+        """
+        query = 'query { unreadCount ideas { edges { node { text } } } notifications { edges { cursor } } }'
+        headers = self.headers()
+
+        with mock.patch.object(auth, 'get_payload', wraps=auth.get_payload) as get_payload:
+            self.assertResponseNoErrors(self.query(query, headers=headers))
+            self.assertEqual(get_payload.call_count, 1)
+
+            get_user_model().objects.filter(pk=self.user.pk).update(unread_notifications=5)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.query(query, headers=headers)
+            self.assertResponseNoErrors(response)
+            self.assertEqual(get_payload.call_count, 1)
+
+        # Solo se lee el contador, que no forma parte de la copia del usuario y por eso está actualizado
+        self.assertEqual(response.json()['data']['unreadCount'], 5)
+        self.assertEqual(len([q for q in queries.captured_queries if 'FROM "testz1_user"' in q['sql']]), 1)
+
+    def test_revoked_tokens_are_rejected(self):
+        """
+        Prueba de que cambiar la contraseña o desactivar el usuario invalida los tokens ya verificados.
+        """
+        headers = self.headers()
+        self.assertResponseNoErrors(self.query('query { unreadCount }', headers=headers))
+
+        response = self.query(
+            '''
+            mutation {
+                changePassword(email: "test@example.com", oldPassword: "testpassword", newPassword: "newpassword") {
+                    user { id }
+                }
+            }
+            ''',
+            headers=headers,
+        )
+        self.assertResponseNoErrors(response)
+
+        response = self.query('query { unreadCount }', headers=headers)
+        self.assertResponseHasErrors(response)
+        self.assertEqual(response.json()['errors'][0]['message'], 'El token ha sido revocado.')
+
+        # Los tokens nuevos sí son válidos
+        self.user.refresh_from_db()
+        headers = self.headers()
+        self.assertResponseNoErrors(self.query('query { unreadCount }', headers=headers))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertResponseHasErrors(self.query('query { unreadCount }', headers=headers))
+
+
+class AuthRateLimitTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    LOGIN = '''
+        mutation ($email: String!, $password: String!) {
+            tokenAuth(email: $email, password: $password) { token }
+        }
+        '''
+
+    def setUp(self):
+        caches['default'].clear()
+        get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        get_user_model().objects.create_user(email='other@example.com', username='other', password='testpassword')
+
+    @override_settings(AUTH_RATE_LIMIT_ACCOUNT=(3, 60))
+    def test_login_attempts_are_limited_per_account(self):
+        """
+        Prueba de que los intentos de inicio de sesión por encima del límite se rechazan sin comprobar la contraseña.
+        """
+        for _ in range(3):
+            response = self.query(self.LOGIN, variables={'email': 'test@example.com', 'password': 'wrong'})
+            self.assertNotIn('Demasiados intentos', response.json()['errors'][0]['message'])
+
+        with mock.patch('django.contrib.auth.backends.ModelBackend.authenticate') as authenticate:
+            response = self.query(self.LOGIN, variables={'email': 'test@example.com', 'password': 'testpassword'})
+        self.assertIn('Demasiados intentos', response.json()['errors'][0]['message'])
+        authenticate.assert_not_called()
+
+        # Las demás cuentas no se ven afectadas
+        response = self.query(self.LOGIN, variables={'email': 'other@example.com', 'password': 'testpassword'})
+        self.assertResponseNoErrors(response)
+
+    def test_password_hash_pool_is_bounded(self):
+        """
+        Prueba de que los hashes se calculan en el grupo de hilos y se rechazan al superar los pendientes.
+        """
+        pool = PasswordHashPool(workers=1, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+        worker = threading.Thread(target=pool.run, args=(lambda: started.set() or release.wait(),))
+        worker.start()
+        started.wait()
+
+        with mock.patch.object(hashers, 'get_hash_pool', return_value=pool):
+            with self.assertRaisesMessage(Exception, 'El servidor está ocupado'):
+                make_password('testpassword')
+            release.set()
+            worker.join()
+            self.assertTrue(make_password('testpassword').startswith('pbkdf2_sha256$'))
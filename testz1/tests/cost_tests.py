@@ -0,0 +1,69 @@
+from graphene_django.utils.testing import GraphQLTestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from ..models import Idea
+from ..schemas.documents import document_cache
+
+
+class QueryCostTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def setUp(self):
+        # Los documentos validados se guardan en caché con los límites vigentes al validarlos
+        document_cache.clear()
+        user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        Idea.objects.create(text='Idea pública', author=user, visibility='public')
+        self.client.login(email='test@example.com', password='testpassword')
+
+    def test_cost_in_response_extensions(self):
+        """
+        Prueba de que la respuesta incluye el coste calculado a partir de los argumentos de paginación.
+        """
+        response = self.query('''
+            query {
+                timeline(first: 5) { edges { node { text author { username } } } }
+            }
+            ''')
+        self.assertResponseNoErrors(response)
+        # timeline (1) + 5 aristas x (arista 1 + nodo 1 + autor 1)
+        self.assertEqual(response.json()['extensions']['cost'], {'requestedQueryCost': 16, 'maximumAvailable': 10000})
+
+        # Con fragmentos y un tamaño de página variable se supone el máximo (GRAPHQL_MAX_PAGE_SIZE)
+        response = self.query('''
+            query ($first: Int) {
+                timeline(first: $first) { ...IdeaConnectionFields }
+            }
+            fragment IdeaConnectionFields on IdeaConnection { edges { node { text author { username } } } }
+            ''', variables={'first': 5})
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['extensions']['cost']['requestedQueryCost'], 301)
+
+    def test_expensive_query_rejected_before_execution(self):
+        """
+        Prueba de que una consulta con listas anidadas que supera el presupuesto se rechaza sin consultar la base de datos.
+        """
+        query = '''
+            query {
+                ideas(first: 100) { edges { node { author { ideas(first: 100) { edges { node { text } } } } } } }
+            }
+            '''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(query)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('coste', response.json()['errors'][0]['message'])
+        self.assertNotIn('data', response.json())
+        self.assertEqual([q for q in queries.captured_queries if 'testz1_idea' in q['sql']], [])
+
+    @override_settings(GRAPHQL_MAX_QUERY_DEPTH=3)
+    def test_deep_query_rejected(self):
+        """
+        Prueba del límite de profundidad de las consultas.
+        """
+        response = self.query('query { timeline { edges { node { author { username } } } } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('profundidad de 5 niveles', response.json()['errors'][0]['message'])
+
+        response = self.query('query { timeline { edges { cursor } } }')
+        self.assertResponseNoErrors(response)
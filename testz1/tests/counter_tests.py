@@ -0,0 +1,151 @@
+from io import StringIO
+from unittest import mock
+from graphene_django.utils.testing import GraphQLTestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..counters import increment
+from ..models import Follow, Idea
+
+COUNTER_FIELDS = (
+    'followers_count', 'following_count', 'pending_follow_requests_count',
+    'public_ideas_count', 'protected_ideas_count', 'private_ideas_count',
+)
+
+
+class UserCountersTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def setUp(self):
+        self.alice = get_user_model().objects.create_user(email='alice@example.com', username='alice', password='testpassword')
+        self.bob = get_user_model().objects.create_user(email='bob@example.com', username='bob', password='testpassword')
+        self.carol = get_user_model().objects.create_user(email='carol@example.com', username='carol', password='testpassword')
+
+    def counters(self, user):
+        user.refresh_from_db(fields=COUNTER_FIELDS)
+        return {field: getattr(user, field) for field in COUNTER_FIELDS if getattr(user, field)}
+
+    def mutate(self, query, **variables):
+        response = self.query(query, variables=variables)
+        self.assertResponseNoErrors(response)
+        return response.json()['data']
+
+    def test_follow_counters(self):
+        """
+        Prueba de que las mutaciones de seguimiento (individuales y en lote) actualizan los contadores.
+        """
+        self.client.login(email='bob@example.com', password='testpassword')
+        request = 'mutation ($userId: ID!) { requestFollow(userId: $userId) { followId } }'
+        follow_id = self.mutate(request, userId=self.alice.id)['requestFollow']['followId']
+        # Repetir la solicitud no vuelve a contarla
+        self.mutate(request, userId=self.alice.id)
+        self.assertEqual(self.counters(self.alice), {'pending_follow_requests_count': 1})
+
+        self.client.login(email='carol@example.com', password='testpassword')
+        self.mutate('mutation ($userIds: [ID!]!) { requestFollowMany(userIds: $userIds) { results { success } } }', userIds=[self.alice.id, self.bob.id])
+        self.assertEqual(self.counters(self.alice), {'pending_follow_requests_count': 2})
+        self.assertEqual(self.counters(self.bob), {'pending_follow_requests_count': 1})
+
+        self.client.login(email='alice@example.com', password='testpassword')
+        self.mutate('mutation ($id: ID!) { respondToFollowRequest(followId: $id, status: "approved") { success } }', id=follow_id)
+        carol_request = Follow.objects.get(follower=self.carol, following=self.alice)
+        self.mutate('mutation ($ids: [ID!]!) { respondToFollowRequests(followIds: $ids, status: "approved") { results { success } } }', ids=[carol_request.id])
+        self.assertEqual(self.counters(self.alice), {'followers_count': 2})
+        self.assertEqual(self.counters(self.bob), {'following_count': 1, 'pending_follow_requests_count': 1})
+        self.assertEqual(self.counters(self.carol), {'following_count': 1})
+
+        self.mutate('mutation ($id: ID!) { removeFollower(followerId: $id) { success } }', id=self.bob.id)
+        self.mutate('mutation ($ids: [ID!]!) { removeFollowers(followerIds: $ids) { results { success } } }', ids=[self.carol.id])
+        self.assertEqual(self.counters(self.alice), {})
+        self.assertEqual(self.counters(self.bob), {'pending_follow_requests_count': 1})
+        self.assertEqual(self.counters(self.carol), {})
+
+    def test_idea_counters(self):
+        """
+        Prueba de que crear, cambiar de visibilidad y eliminar ideas actualiza los contadores del autor.
+        """
+        self.client.login(email='alice@example.com', password='testpassword')
+        create = 'mutation ($visibility: String!) { createIdea(text: "Idea", visibility: $visibility) { idea { id } } }'
+        idea_id = self.mutate(create, visibility='public')['createIdea']['idea']['id']
+        self.mutate(create, visibility='private')
+        self.assertEqual(self.counters(self.alice), {'public_ideas_count': 1, 'private_ideas_count': 1})
+
+        self.mutate('mutation ($id: ID!) { setIdeaVisibility(ideaId: $id, visibility: "protected") { idea { id } } }', id=idea_id)
+        self.assertEqual(self.counters(self.alice), {'protected_ideas_count': 1, 'private_ideas_count': 1})
+
+        self.mutate('mutation ($id: ID!) { deleteIdea(ideaId: $id) { success } }', id=idea_id)
+        self.assertEqual(self.counters(self.alice), {'private_ideas_count': 1})
+
+    def test_counters_exposed_without_extra_queries(self):
+        """
+        Prueba de que los contadores se leen de la fila del usuario y de que los privados solo los ve quien corresponde.
+        """
+        get_user_model().objects.filter(pk=self.alice.pk).update(
+            followers_count=1, pending_follow_requests_count=2, public_ideas_count=3, protected_ideas_count=4, private_ideas_count=5
+        )
+        Follow.objects.create(follower=self.bob, following=self.alice, status='approved')
+        self.client.login(email='bob@example.com', password='testpassword')
+
+        query = '''
+            query {
+                users(first: 10) {
+                    edges { node { username followersCount followingCount publicIdeasCount protectedIdeasCount privateIdeasCount pendingFollowRequestsCount } }
+                }
+            }
+            '''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(query)
+        self.assertResponseNoErrors(response)
+        nodes = {edge['node']['username']: edge['node'] for edge in response.json()['data']['users']['edges']}
+        self.assertEqual(nodes['alice'], {
+            'username': 'alice', 'followersCount': 1, 'followingCount': 0, 'publicIdeasCount': 3,
+            # Bob sigue a Alice: ve sus ideas protegidas, pero no las privadas ni sus solicitudes
+            'protectedIdeasCount': 4, 'privateIdeasCount': None, 'pendingFollowRequestsCount': None,
+        })
+        self.assertIsNone(nodes['carol']['protectedIdeasCount'])
+        # Sin consultas sobre las ideas; el grafo de seguimiento del usuario autenticado se carga una vez para toda la lista
+        self.assertEqual([q for q in queries.captured_queries if 'testz1_idea' in q['sql']], [])
+        self.assertLessEqual(len([q for q in queries.captured_queries if 'testz1_follow' in q['sql']]), 1)
+
+    def test_change_password_keeps_concurrent_counter_updates(self):
+        """
+        Prueba de que cambiar la contraseña no sobrescribe los contadores actualizados mientras tanto.
+        """
+        self.client.login(email='alice@example.com', password='testpassword')
+        check_password = get_user_model().check_password
+
+        def slow_check_password(user, password):
+            # Otra petición aprueba un seguidor mientras se calcula el hash de la contraseña
+            increment([user.pk], followers_count=1)
+            return check_password(user, password)
+
+        with mock.patch.object(get_user_model(), 'check_password', slow_check_password):
+            self.mutate('''
+                mutation {
+                    changePassword(email: "alice@example.com", oldPassword: "testpassword", newPassword: "newpassword") { user { id } }
+                }
+                ''')
+        self.assertEqual(self.counters(self.alice), {'followers_count': 1})
+        self.alice.refresh_from_db()
+        self.assertTrue(self.alice.check_password('newpassword'))
+
+    def test_reconcile_counters_command(self):
+        """
+        Prueba del comando que recalcula los contadores desviados.
+        """
+        Follow.objects.create(follower=self.bob, following=self.alice, status='approved')
+        Follow.objects.create(follower=self.carol, following=self.alice, status='pending')
+        Idea.objects.create(text='Idea', author=self.alice, visibility='protected')
+        get_user_model().objects.filter(pk=self.carol.pk).update(followers_count=7)
+
+        out = StringIO()
+        call_command('reconcile_counters', batch_size=2, stdout=out)
+        self.assertIn('3 users reconciled', out.getvalue())
+        self.assertEqual(self.counters(self.alice), {'followers_count': 1, 'pending_follow_requests_count': 1, 'protected_ideas_count': 1})
+        self.assertEqual(self.counters(self.bob), {'following_count': 1})
+        self.assertEqual(self.counters(self.carol), {})
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('0 users reconciled', out.getvalue())
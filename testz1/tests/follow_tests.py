@@ -1,6 +1,11 @@
 from graphene_django.utils.testing import GraphQLTestCase
 from django.contrib.auth import get_user_model
-from ..models import Follow
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from ..models import Follow, Idea, Notification, TimelineEntry
+from ..follow_graph import get_following_ids, get_follower_ids
+from ..outbox import process_pending_jobs
 
 class FollowTest(GraphQLTestCase):
     GRAPHQL_URL = '/api/follow/graphql/'
@@ -35,6 +40,44 @@ class FollowTest(GraphQLTestCase):
         follow_request = Follow.objects.filter(follower=follower, following=following, status='pending').first()
         self.assertIsNotNone(follow_request)
 
+    def test_follow_request_is_idempotent(self):
+        """
+        Prueba de que repetir la solicitud devuelve la relación existente con una sola sentencia y sin errores.
+        """
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        following = get_user_model().objects.create_user(email='following@example.com', username='following', password='testpassword')
+        self.client.login(email='follower@example.com', password='testpassword')
+
+        query = '''
+            mutation ($userId: ID!) {
+                requestFollow(userId: $userId) { success followId status }
+            }
+        '''
+        response = self.query(query, variables={'userId': following.id})
+        self.assertResponseNoErrors(response)
+        first = response.json()['data']['requestFollow']
+        self.assertEqual(first['status'], 'pending')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(query, variables={'userId': following.id})
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['data']['requestFollow'], first)
+        self.assertEqual(Follow.objects.filter(follower=follower, following=following).count(), 1)
+        # Con PostgreSQL el INSERT ... ON CONFLICT devuelve la fila existente; SQLite necesita además un SELECT
+        follow_queries = [q for q in queries.captured_queries if 'testz1_follow' in q['sql']]
+        self.assertLessEqual(len(follow_queries), 1 if connection.vendor == 'postgresql' else 2)
+
+        # Una relación ya aprobada se devuelve sin volver a pendiente
+        Follow.objects.filter(pk=first['followId']).update(status='approved')
+        response = self.query(query, variables={'userId': following.id})
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['data']['requestFollow']['status'], 'approved')
+
+        response = self.query(query, variables={'userId': follower.id})
+        self.assertIn('cannot follow yourself', response.json()['errors'][0]['message'])
+        response = self.query(query, variables={'userId': following.id + 100})
+        self.assertIn('User does not exist', response.json()['errors'][0]['message'])
+
 
     def test_respond_to_follow_request(self):
         # Crea una solicitud de seguimiento de un usuario de prueba a otro
@@ -78,10 +121,14 @@ class FollowTest(GraphQLTestCase):
         query = '''
             query {
                 followRequestsReceived {
-                    id
-                    follower {
-                        id
-                        username
+                    edges {
+                        node {
+                            id
+                            follower {
+                                id
+                                username
+                            }
+                        }
                     }
                 }
             }
@@ -93,9 +140,10 @@ class FollowTest(GraphQLTestCase):
         self.assertResponseNoErrors(response)
 
         # Verifica que la solicitud de seguimiento recibida está en la respuesta
-        self.assertEqual(response.json()['data']['followRequestsReceived'][0]['id'], str(follow_request.id))
-        self.assertEqual(response.json()['data']['followRequestsReceived'][0]['follower']['id'], str(follower.id))
-        self.assertEqual(response.json()['data']['followRequestsReceived'][0]['follower']['username'], follower.username)
+        node = response.json()['data']['followRequestsReceived']['edges'][0]['node']
+        self.assertEqual(node['id'], str(follow_request.id))
+        self.assertEqual(node['follower']['id'], str(follower.id))
+        self.assertEqual(node['follower']['username'], follower.username)
     
 
     def test_following(self):
@@ -111,8 +159,12 @@ class FollowTest(GraphQLTestCase):
         query = '''
             query {
                 following {
-                    id
-                    username
+                    edges {
+                        node {
+                            id
+                            username
+                        }
+                    }
                 }
             }
         '''
@@ -123,9 +175,10 @@ class FollowTest(GraphQLTestCase):
         self.assertResponseNoErrors(response)
 
         # Verifica que el usuario seguido está en la respuesta
-        self.assertEqual(len(response.json()['data']['following']), 1)
-        self.assertEqual(response.json()['data']['following'][0]['id'], str(following.id))
-        self.assertEqual(response.json()['data']['following'][0]['username'], following.username)
+        edges = response.json()['data']['following']['edges']
+        self.assertEqual(len(edges), 1)
+        self.assertEqual(edges[0]['node']['id'], str(following.id))
+        self.assertEqual(edges[0]['node']['username'], following.username)
 
 
     def test_followers(self):
@@ -141,8 +194,12 @@ class FollowTest(GraphQLTestCase):
         query = '''
             query {
                 followers {
-                    id
-                    username
+                    edges {
+                        node {
+                            id
+                            username
+                        }
+                    }
                 }
             }
         '''
@@ -153,9 +210,47 @@ class FollowTest(GraphQLTestCase):
         self.assertResponseNoErrors(response)
 
         # Verifica que el usuario seguido está en la respuesta
-        self.assertEqual(len(response.json()['data']['followers']), 1)
-        self.assertEqual(response.json()['data']['followers'][0]['id'], str(follower.id))
-        self.assertEqual(response.json()['data']['followers'][0]['username'], follower.username)
+        edges = response.json()['data']['followers']['edges']
+        self.assertEqual(len(edges), 1)
+        self.assertEqual(edges[0]['node']['id'], str(follower.id))
+        self.assertEqual(edges[0]['node']['username'], follower.username)
+
+    @override_settings(GRAPHQL_MAX_PAGE_SIZE=2)
+    def test_root_follow_lists_are_paginated(self):
+        # Las listas del usuario autenticado se devuelven por páginas limitadas a GRAPHQL_MAX_PAGE_SIZE
+        user = get_user_model().objects.create_user(email='user@example.com', username='user', password='testpassword')
+        others = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'other{i}@example.com', username=f'other{i}') for i in range(3)
+        ])
+        Follow.objects.bulk_create([Follow(follower=other, following=user, status='approved') for other in others])
+        Follow.objects.bulk_create([Follow(follower=user, following=other, status='approved') for other in others])
+        Follow.objects.bulk_create([Follow(follower=other, following=others[0]) for other in others[1:]])
+        self.client.login(email='user@example.com', password='testpassword')
+
+        query = '''
+            query ($after: String) {
+                followers(first: 100, after: $after) { edges { node { username } } pageInfo { hasNextPage endCursor } }
+                following(first: 100, after: $after) { edges { node { username } } pageInfo { hasNextPage endCursor } }
+            }
+        '''
+        for field in ('followers', 'following'):
+            response = self.query(query)
+            self.assertResponseNoErrors(response)
+            page = response.json()['data'][field]
+            self.assertEqual([edge['node']['username'] for edge in page['edges']], ['other0', 'other1'])
+            self.assertTrue(page['pageInfo']['hasNextPage'])
+
+            response = self.query(query, variables={'after': page['pageInfo']['endCursor']})
+            page = response.json()['data'][field]
+            self.assertEqual([edge['node']['username'] for edge in page['edges']], ['other2'])
+            self.assertFalse(page['pageInfo']['hasNextPage'])
+
+        self.client.force_login(others[0])
+        response = self.query('query { followRequestsReceived(first: 1) { edges { node { follower { username } } } pageInfo { hasNextPage } } }')
+        self.assertResponseNoErrors(response)
+        page = response.json()['data']['followRequestsReceived']
+        self.assertEqual([edge['node']['follower']['username'] for edge in page['edges']], ['other1'])
+        self.assertTrue(page['pageInfo']['hasNextPage'])
     
 
     def test_unfollow_user(self):
@@ -218,3 +313,246 @@ class FollowTest(GraphQLTestCase):
 
         # Verifica que la relación de seguimiento haya sido eliminada de la base de datos
         self.assertFalse(Follow.objects.filter(follower=follower, following=following).exists())
+
+
+    def test_timeline_backfill_in_one_statement(self):
+        """
+        Prueba de que al aprobar varias solicitudes las ideas visibles se copian con un único INSERT.
+        """
+        author = get_user_model().objects.create_user(email='author@example.com', username='author', password='testpassword')
+        ideas = [Idea.objects.create(text=f'Idea {visibility}', author=author, visibility=visibility) for visibility in ('public', 'protected', 'private')]
+        followers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'follower{i}@example.com', username=f'follower{i}') for i in range(3)
+        ])
+        Follow.objects.bulk_create([Follow(follower=follower, following=author) for follower in followers])
+        # Una entrada ya existente no impide copiar el resto
+        TimelineEntry.objects.create(user=followers[0], idea=ideas[0], author=author, created_at=ideas[0].created_at)
+
+        self.client.login(email='author@example.com', password='testpassword')
+        follow_ids = list(Follow.objects.filter(following=author).values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(
+                'mutation ($ids: [ID!]!) { respondToFollowRequests(followIds: $ids, status: "approved") { results { success } } }',
+                variables={'ids': follow_ids},
+            )
+        self.assertResponseNoErrors(response)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT') and 'INTO "testz1_timelineentry"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        for follower in followers:
+            self.assertSetEqual(
+                set(TimelineEntry.objects.filter(user=follower).values_list('idea__text', flat=True)),
+                {'Idea public', 'Idea protected'},
+            )
+
+
+    def test_follow_requests_received_query_count(self):
+        following = get_user_model().objects.create_user(email='following@example.com', username='following', password='testpassword')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='following@example.com', password='testpassword')
+
+        query = '''
+            query {
+                followRequestsReceived(first: 100) {
+                    edges {
+                        node {
+                            follower {
+                                username
+                            }
+                            following {
+                                username
+                            }
+                        }
+                    }
+                }
+            }
+        '''
+
+        def count_queries(requests):
+            # Crear `requests` solicitudes de seguimiento pendientes y contar las consultas de la petición
+            Follow.objects.filter(following=following).delete()
+            followers = get_user_model().objects.bulk_create([
+                get_user_model()(email=f'follower{requests}_{i}@example.com', username=f'follower{requests}_{i}')
+                for i in range(requests)
+            ])
+            Follow.objects.bulk_create([Follow(follower=follower, following=following) for follower in followers])
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.query(query)
+            self.assertResponseNoErrors(response)
+            self.assertEqual(len(response.json()['data']['followRequestsReceived']['edges']), min(requests, 100))
+            return len(queries)
+
+        # Los usuarios relacionados se cargan por lotes: el número de consultas no depende del número de filas
+        self.assertEqual(count_queries(1), count_queries(1000))
+
+    def test_following_query_count(self):
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='follower@example.com', password='testpassword')
+
+        query = '''
+            query {
+                following(first: 100) {
+                    edges { node { username } }
+                }
+                followers(first: 100) {
+                    edges { node { username } }
+                }
+            }
+        '''
+
+        def count_queries(users):
+            # Seguir a `users` usuarios y contar las consultas de la petición
+            followed = get_user_model().objects.bulk_create([
+                get_user_model()(email=f'following{users}_{i}@example.com', username=f'following{users}_{i}')
+                for i in range(users)
+            ])
+            Follow.objects.bulk_create([Follow(follower=follower, following=user, status='approved') for user in followed])
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.query(query)
+            self.assertResponseNoErrors(response)
+            return len(queries), len(response.json()['data']['following']['edges'])
+
+        # Las listas se obtienen con una consulta cada una, sin importar el número de usuarios
+        queries, following = count_queries(1)
+        self.assertEqual(following, 1)
+        self.assertEqual(count_queries(50), (queries, 51))
+
+    def test_follow_graph_cache_invalidation(self):
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        following = get_user_model().objects.create_user(email='following@example.com', username='following', password='testpassword')
+        follow_request = Follow.objects.create(follower=follower, following=following, status='pending')
+
+        # Las relaciones aprobadas se leen de la base de datos una sola vez
+        self.assertEqual(get_following_ids(follower.id), frozenset())
+        self.assertEqual(get_follower_ids(following.id), frozenset())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_following_ids(follower.id), frozenset())
+            self.assertEqual(get_follower_ids(following.id), frozenset())
+
+        # Al aprobar la solicitud se invalida la caché de ambos usuarios
+        self.client.login(email='following@example.com', password='testpassword')
+        response = self.query('''
+            mutation {
+                respondToFollowRequest(followId: "%s", status: "approved") {
+                    success
+                }
+            }
+        ''' % follow_request.id)
+        self.assertResponseNoErrors(response)
+        self.assertEqual(get_following_ids(follower.id), frozenset([following.id]))
+        self.assertEqual(get_follower_ids(following.id), frozenset([follower.id]))
+
+        # Al eliminar al seguidor la relación desaparece de la caché
+        response = self.query('''
+            mutation {
+                removeFollower(followerId: "%s") {
+                    success
+                }
+            }
+        ''' % follower.id)
+        self.assertResponseNoErrors(response)
+        self.assertEqual(get_following_ids(follower.id), frozenset())
+        self.assertEqual(get_follower_ids(following.id), frozenset())
+
+    def test_fan_out_ignores_stale_follow_graph_cache(self):
+        """
+        Prueba de que las entradas de timeline y las notificaciones no se crean a partir de un grafo en
+        caché desactualizado (por ejemplo el de otro proceso que no ha recibido la invalidación).
+        """
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        following = get_user_model().objects.create_user(email='following@example.com', username='following', password='testpassword')
+        Follow.objects.create(follower=follower, following=following, status='approved')
+        self.assertEqual(get_follower_ids(following.id), frozenset([follower.id]))
+
+        # El seguidor se elimina sin pasar por las señales: la caché sigue incluyéndolo
+        Follow.objects.delete_ids(Follow.objects.filter(follower=follower, following=following).values_list('id', flat=True))
+        self.assertEqual(get_follower_ids(following.id), frozenset([follower.id]))
+
+        idea = Idea.objects.create(text='Idea protegida', author=following, visibility='protected')
+        process_pending_jobs()
+        self.assertFalse(TimelineEntry.objects.filter(user=follower, idea=idea).exists())
+        self.assertFalse(Notification.objects.filter(user=follower, idea=idea).exists())
+
+    def test_bulk_follow_operations(self):
+        """
+        Prueba de las operaciones de seguimiento en lote, con un resultado por id y un número de consultas constante.
+        """
+        user = get_user_model().objects.create_user(email='user@example.com', username='user', password='testpassword')
+        others = [
+            get_user_model().objects.create_user(email=f'user{i}@example.com', username=f'user{i}', password='testpassword')
+            for i in range(4)
+        ]
+        existing = Follow.objects.create(follower=user, following=others[0], status='pending')
+        idea = Idea.objects.create(text='Idea pública', author=user, visibility='public')
+
+        # Solicitar seguir a varios usuarios: se informa del resultado de cada id
+        self.client.login(email='user@example.com', password='testpassword')
+        user_ids = [str(other.id) for other in others] + [str(user.id), '999999']
+        response = self.query('''
+            mutation ($userIds: [ID!]!) {
+                requestFollowMany(userIds: $userIds) { results { id success followId status error } }
+            }
+            ''', variables={'userIds': user_ids})
+        self.assertResponseNoErrors(response)
+        results = response.json()['data']['requestFollowMany']['results']
+        self.assertEqual([result['id'] for result in results], user_ids)
+        self.assertEqual([result['success'] for result in results], [True, True, True, True, False, False])
+        # La solicitud que ya existía se devuelve, como en requestFollow
+        self.assertEqual((results[0]['followId'], results[0]['status']), (str(existing.id), 'pending'))
+        self.assertEqual(results[4]['error'], 'No puedes seguirte a ti mismo.')
+        self.assertEqual(results[5]['error'], 'El usuario no existe.')
+        self.assertEqual(Follow.objects.filter(follower=user, status='pending').count(), 4)
+        # Solo las solicitudes nuevas cuentan como pendientes; repetir la llamada no cambia nada y los
+        # ids repetidos reciben cada uno su resultado
+        response = self.query('''
+            mutation ($userIds: [ID!]!) {
+                requestFollowMany(userIds: $userIds) { results { followId } }
+            }
+            ''', variables={'userIds': user_ids + [user_ids[1]]})
+        repeated = response.json()['data']['requestFollowMany']['results']
+        self.assertEqual(len(repeated), len(user_ids) + 1)
+        self.assertEqual(repeated[:4] + repeated[-1:], [{'followId': result['followId']} for result in results[:4] + results[1:2]])
+        self.assertEqual(
+            list(get_user_model().objects.filter(pk__in=[other.id for other in others]).order_by('pk').values_list('pending_follow_requests_count', flat=True)),
+            [0, 1, 1, 1],
+        )
+
+        # Aprobar varias solicitudes recibidas: el número de consultas no depende del tamaño del lote
+        for other in others:
+            Follow.objects.create(follower=other, following=user, status='pending')
+        follow_ids = [str(follow.id) for follow in Follow.objects.filter(following=user).order_by('id')]
+        query = '''
+            mutation ($followIds: [ID!]!) {
+                respondToFollowRequests(followIds: $followIds, status: "approved") { results { id success error } }
+            }
+            '''
+        with CaptureQueriesContext(connection) as small_batch:
+            response = self.query(query, variables={'followIds': follow_ids[:1]})
+        self.assertResponseNoErrors(response)
+        with CaptureQueriesContext(connection) as large_batch:
+            response = self.query(query, variables={'followIds': follow_ids})
+        self.assertResponseNoErrors(response)
+        self.assertEqual(len(small_batch), len(large_batch))
+
+        # La solicitud ya aprobada en el primer lote se informa como error
+        results = response.json()['data']['respondToFollowRequests']['results']
+        self.assertEqual([result['success'] for result in results], [False, True, True, True])
+        self.assertEqual(get_follower_ids(user.id), frozenset(other.id for other in others))
+        self.assertEqual(TimelineEntry.objects.filter(idea=idea).exclude(user=user).count(), 4)
+
+        # Eliminar varios seguidores: se retiran sus relaciones, la caché y las ideas de sus timelines
+        response = self.query('''
+            mutation ($followerIds: [ID!]!) {
+                removeFollowers(followerIds: $followerIds) { results { id success error } }
+            }
+            ''', variables={'followerIds': [str(others[0].id), str(others[1].id), 'abc', str(others[0].id)]})
+        self.assertResponseNoErrors(response)
+        results = response.json()['data']['removeFollowers']['results']
+        self.assertEqual([result['id'] for result in results], [str(others[0].id), str(others[1].id), 'abc', str(others[0].id)])
+        self.assertEqual([result['success'] for result in results], [True, True, False, True])
+        self.assertEqual(get_follower_ids(user.id), frozenset([others[2].id, others[3].id]))
+        self.assertEqual(set(TimelineEntry.objects.filter(idea=idea).exclude(user=user).values_list('user_id', flat=True)), {others[2].id, others[3].id})
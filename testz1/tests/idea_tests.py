@@ -1,7 +1,16 @@
 from graphene_django.utils.testing import GraphQLTestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from ..models import Idea, Follow
 
+
+def nodes(connection):
+    # Extraer los nodos de una conexión paginada
+    return [edge['node'] for edge in connection['edges']]
+
+
 class IdeaTest(GraphQLTestCase):
     GRAPHQL_URL = '/api/idea/graphql/'
 
@@ -126,10 +135,14 @@ class IdeaTest(GraphQLTestCase):
         query = '''
             query {
                 ideas {
-                    id
-                    text
-                    visibility
-                    createdAt
+                    edges {
+                        node {
+                            id
+                            text
+                            visibility
+                            createdAt
+                        }
+                    }
                 }
             }
         '''
@@ -141,7 +154,7 @@ class IdeaTest(GraphQLTestCase):
         self.assertEqual(response.status_code, 200)
 
         # Obtén las ideas del resultado de la consulta
-        ideas = response.json()['data']['ideas']
+        ideas = nodes(response.json()['data']['ideas'])
 
         # Verifica que las ideas estén ordenadas por fecha de creación (de más recientes a más antiguas)
         for i in range(len(ideas) - 1):
@@ -196,8 +209,12 @@ class IdeaTest(GraphQLTestCase):
         query = '''
             query {
                 ideasByUser(username: "user1") {
-                    text
-                    visibility
+                    edges {
+                        node {
+                            text
+                            visibility
+                        }
+                    }
                 }
             }
             '''
@@ -208,7 +225,7 @@ class IdeaTest(GraphQLTestCase):
         self.assertResponseNoErrors(response)
 
         # Verificar que la visibilidad es la correcta
-        self.assertEqual(response.json()['data']['ideasByUser'][0]['visibility'], 'PUBLIC')
+        self.assertEqual(nodes(response.json()['data']['ideasByUser'])[0]['visibility'], 'PUBLIC')
 
         Follow.objects.create(follower=user1, following=user3, status='approved')
         Follow.objects.create(follower=user3, following=user1, status='approved')
@@ -217,8 +234,12 @@ class IdeaTest(GraphQLTestCase):
         query = '''
             query {
                 ideasByUser(username: "user1") {
-                    text
-                    visibility
+                    edges {
+                        node {
+                            text
+                            visibility
+                        }
+                    }
                 }
             }
             '''
@@ -228,8 +249,8 @@ class IdeaTest(GraphQLTestCase):
         # Verificar que no haya errores en la respuesta
         self.assertResponseNoErrors(response)
 
-        self.assertEqual(len(response.json()['data']['ideasByUser']), 2)
-        visibilities = {idea['visibility'] for idea in response.json()['data']['ideasByUser']}
+        self.assertEqual(len(nodes(response.json()['data']['ideasByUser'])), 2)
+        visibilities = {idea['visibility'] for idea in nodes(response.json()['data']['ideasByUser'])}
         self.assertSetEqual(visibilities, {'PUBLIC', 'PROTECTED'})
 
     def test_timeline(self):
@@ -255,11 +276,15 @@ class IdeaTest(GraphQLTestCase):
         query = '''
             query {
                 timeline {
-                    text
-                    visibility
-                    createdAt
-                    author {
-                        username
+                    edges {
+                        node {
+                            text
+                            visibility
+                            createdAt
+                            author {
+                                username
+                            }
+                        }
                     }
                 }
             }
@@ -270,10 +295,10 @@ class IdeaTest(GraphQLTestCase):
         # Verificar que no haya errores en la respuesta
         self.assertResponseNoErrors(response)
 
-        self.assertEqual(len(response.json()['data']['timeline']), 3)
+        self.assertEqual(len(nodes(response.json()['data']['timeline'])), 3)
 
         # Verificar que las ideas estén ordenadas por fecha de creación
-        timeline_ideas = response.json()['data']['timeline']
+        timeline_ideas = nodes(response.json()['data']['timeline'])
         for i in range(len(timeline_ideas) - 1):
             self.assertGreaterEqual(timeline_ideas[i]['createdAt'], timeline_ideas[i + 1]['createdAt'])
         
@@ -284,11 +309,15 @@ class IdeaTest(GraphQLTestCase):
         query = '''
             query {
                 timeline {
-                    text
-                    visibility
-                    createdAt
-                    author {
-                        username
+                    edges {
+                        node {
+                            text
+                            visibility
+                            createdAt
+                            author {
+                                username
+                            }
+                        }
                     }
                 }
             }
@@ -299,10 +328,10 @@ class IdeaTest(GraphQLTestCase):
         # Verificar que no haya errores en la respuesta
         self.assertResponseNoErrors(response)
 
-        self.assertEqual(len(response.json()['data']['timeline']), 2)
+        self.assertEqual(len(nodes(response.json()['data']['timeline'])), 2)
 
         # Verificar que las ideas estén ordenadas por fecha de creación
-        timeline_ideas = response.json()['data']['timeline']
+        timeline_ideas = nodes(response.json()['data']['timeline'])
         for i in range(len(timeline_ideas) - 1):
             self.assertGreaterEqual(timeline_ideas[i]['createdAt'], timeline_ideas[i + 1]['createdAt'])
         
@@ -310,3 +339,187 @@ class IdeaTest(GraphQLTestCase):
 
 
 
+
+    def test_timeline_is_kept_up_to_date(self):
+        # Crea algunos usuarios de prueba
+        user1 = get_user_model().objects.create_user(email='user1@example.com', username='user1', password='testpassword')
+        user2 = get_user_model().objects.create_user(email='user2@example.com', username='user2', password='testpassword')
+
+        idea = Idea.objects.create(text='Idea protegida del usuario 2', author=user2, visibility='protected')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='user1@example.com', password='testpassword')
+
+        query = '''
+            query {
+                timeline {
+                    edges {
+                        node {
+                            text
+                        }
+                    }
+                }
+            }
+            '''
+
+        # Sin seguimiento aprobado la idea no aparece en el timeline
+        follow = Follow.objects.create(follower=user1, following=user2, status='pending')
+        response = self.query(query)
+        self.assertResponseNoErrors(response)
+        self.assertEqual(len(nodes(response.json()['data']['timeline'])), 0)
+
+        # Al aprobar la solicitud se incorporan las ideas visibles del usuario seguido
+        follow.status = 'approved'
+        follow.save()
+        response = self.query(query)
+        self.assertEqual([i['text'] for i in nodes(response.json()['data']['timeline'])], ['Idea protegida del usuario 2'])
+
+        # Si la idea pasa a ser privada desaparece del timeline del seguidor
+        idea.visibility = 'private'
+        idea.save()
+        response = self.query(query)
+        self.assertEqual(len(nodes(response.json()['data']['timeline'])), 0)
+
+        # Al dejar de seguir al usuario sus ideas desaparecen del timeline
+        idea.visibility = 'public'
+        idea.save()
+        follow.delete()
+        response = self.query(query)
+        self.assertEqual(len(nodes(response.json()['data']['timeline'])), 0)
+
+    @override_settings(TIMELINE_FAN_OUT_BATCH_SIZE=2)
+    def test_timeline_fan_out_in_batches(self):
+        """
+        Prueba de que la idea se añade a los timelines de los seguidores con un INSERT por lote.
+        """
+        author = get_user_model().objects.create(email='author@example.com', username='author')
+        followers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'follower{i}@example.com', username=f'follower{i}') for i in range(5)
+        ])
+        Follow.objects.bulk_create([Follow(follower=follower, following=author, status='approved') for follower in followers])
+
+        with CaptureQueriesContext(connection) as queries:
+            idea = Idea.objects.create(text='Idea pública', author=author, visibility='public')
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT') and 'INTO "testz1_timelineentry"' in q['sql']]
+        # La entrada del autor y tres lotes de como mucho dos seguidores
+        self.assertEqual(len(inserts), 4)
+        self.assertEqual(idea.timeline_entries.count(), 6)
+
+    def test_ideas_cursor_pagination(self):
+        user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        for i in range(5):
+            Idea.objects.create(text=f'Idea {i}', author=user, visibility='public')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='test@example.com', password='testpassword')
+
+        query = '''
+            query($after: String) {
+                ideas(first: 2, after: $after) {
+                    edges {
+                        node {
+                            text
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
+                }
+            }
+            '''
+
+        # Recorrer todas las páginas siguiendo el cursor de la última idea recibida
+        texts = []
+        after = None
+        while True:
+            response = self.query(query, variables={'after': after})
+            self.assertResponseNoErrors(response)
+            connection = response.json()['data']['ideas']
+            self.assertLessEqual(len(connection['edges']), 2)
+            texts += [idea['text'] for idea in nodes(connection)]
+            if not connection['pageInfo']['hasNextPage']:
+                break
+            after = connection['pageInfo']['endCursor']
+
+        # Las ideas se reciben una sola vez y de más recientes a más antiguas
+        self.assertEqual(texts, [f'Idea {i}' for i in reversed(range(5))])
+
+    def test_ideas_by_user_query_count(self):
+        author = get_user_model().objects.create_user(email='author@example.com', username='author', password='testpassword')
+        get_user_model().objects.create_user(email='reader@example.com', username='reader', password='testpassword')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='reader@example.com', password='testpassword')
+
+        query = '''
+            query {
+                ideasByUser(username: "author") {
+                    edges {
+                        node {
+                            text
+                        }
+                    }
+                }
+            }
+            '''
+
+        # El número de consultas no depende del número de ideas del autor (la primera petición
+        # carga en la caché los usuarios seguidos por el lector)
+        query_counts = []
+        self.query(query)
+        for visibility in ['public', 'protected', 'private', 'public']:
+            Idea.objects.create(text=f'Idea {visibility}', author=author, visibility=visibility)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.query(query)
+            self.assertResponseNoErrors(response)
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(set(query_counts)), 1)
+        self.assertEqual(len(nodes(response.json()['data']['ideasByUser'])), 2)
+
+    def test_search_ideas(self):
+        """
+        Prueba de la búsqueda de ideas por texto respetando la visibilidad y paginando los resultados.
+        """
+        author = get_user_model().objects.create_user(email='author@example.com', username='author', password='testpassword')
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        get_user_model().objects.create_user(email='reader@example.com', username='reader', password='testpassword')
+        Follow.objects.create(follower=follower, following=author, status='approved')
+
+        Idea.objects.create(text='Receta de tortilla pública', author=author, visibility='public')
+        Idea.objects.create(text='Receta de tortilla protegida', author=author, visibility='protected')
+        Idea.objects.create(text='Receta de tortilla privada', author=author, visibility='private')
+        Idea.objects.create(text='Otra receta pública', author=author, visibility='public')
+
+        query = '''
+            query ($searchQuery: String!, $after: String) {
+                searchIdeas(searchQuery: $searchQuery, first: 1, after: $after) {
+                    edges { node { text } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }
+            '''
+
+        def search(search_query):
+            texts, after = [], None
+            while True:
+                response = self.query(query, variables={'searchQuery': search_query, 'after': after})
+                self.assertResponseNoErrors(response)
+                page = response.json()['data']['searchIdeas']
+                texts += [node['text'] for node in nodes(page)]
+                if not page['pageInfo']['hasNextPage']:
+                    return texts
+                after = page['pageInfo']['endCursor']
+
+        # Cada usuario solo encuentra las ideas que puede ver
+        self.client.login(email='reader@example.com', password='testpassword')
+        self.assertEqual(search('receta tortilla'), ['Receta de tortilla pública'])
+
+        self.client.login(email='follower@example.com', password='testpassword')
+        self.assertEqual(search('receta tortilla'), ['Receta de tortilla protegida', 'Receta de tortilla pública'])
+
+        self.client.login(email='author@example.com', password='testpassword')
+        self.assertEqual(len(search('receta')), 4)
+        self.assertEqual(search('tortilla privada'), ['Receta de tortilla privada'])
+        self.assertEqual(search('   '), [])
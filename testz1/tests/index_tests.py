@@ -0,0 +1,67 @@
+import re
+from graphene_django.utils.testing import GraphQLTestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..models import Idea, Follow
+
+
+def explain(sql):
+    """Devuelve el plan de ejecución de una consulta como una lista de líneas."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # En tablas pequeñas PostgreSQL siempre prefiere un Seq Scan; se desactiva para ver si hay índice
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def is_sequential_scan(line):
+    """Indica si una línea del plan recorre una tabla entera en lugar de buscar en un índice."""
+    if connection.vendor == 'postgresql':
+        return 'Seq Scan' in line
+    return re.match(r'^SCAN \w+$', line.strip()) is not None
+
+
+class IndexTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def test_hot_resolvers_use_indexes(self):
+        """
+        Prueba de que las consultas de los resolvers más utilizados no recorren tablas enteras.
+        """
+        user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        other = get_user_model().objects.create_user(email='other@example.com', username='other', password='testpassword')
+        Follow.objects.create(follower=user, following=other, status='approved')
+        Follow.objects.create(follower=other, following=user, status='pending')
+        Idea.objects.create(text='Idea pública', author=other, visibility='public')
+        Idea.objects.create(text='Idea privada', author=user, visibility='private')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='test@example.com', password='testpassword')
+
+        query = '''
+            query {
+                timeline { edges { node { text author { username } } } }
+                ideas { edges { node { text } } }
+                ideasByUser(username: "other") { edges { node { text } } }
+                followRequestsReceived { edges { node { follower { username } } } }
+                following { edges { node { username } } }
+                followers { edges { node { username } } }
+                users(first: 10, after: "MQ==") { edges { node { username } } }
+            }
+            '''
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(query)
+        self.assertResponseNoErrors(response)
+
+        # Revisar el plan de cada consulta de lectura sobre las tablas de la aplicación
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'testz1_' not in sql:
+                continue
+            for line in explain(sql):
+                self.assertFalse(is_sequential_scan(line), f'Recorrido secuencial en "{line}" para: {sql}')
@@ -1,8 +1,15 @@
 from graphene_django.utils.testing import GraphQLTestCase
 from django.contrib.auth import get_user_model
-from ..models import Notification, Follow, Idea
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+from ..models import Notification, NotificationJob, Follow, Idea
+from ..outbox import claim_jobs, deliver_idea_notifications, process_pending_jobs, run_job
  
 class NotificationTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
     def test_notification_created_for_follower(self):
 
         # Crear dos usuarios para simular la relación de seguimiento
@@ -16,6 +23,144 @@ class NotificationTest(GraphQLTestCase):
         idea_text = 'Una nueva idea publicada por el usuario seguido'
         idea = Idea.objects.create(text=idea_text, author=following, visibility='public')
 
+        # Ejecutar el worker de notificaciones
+        process_pending_jobs()
+
         # Verificar si se ha creado una notificación para el seguidor (follower)
         notifications = Notification.objects.filter(user=follower, idea=idea)
-        self.assertEqual(notifications.count(), 1)
\ No newline at end of file
+        self.assertEqual(notifications.count(), 1)
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_notifications_created_in_batches(self):
+        # Crear un autor con varios seguidores aprobados y uno pendiente
+        author = get_user_model().objects.create(email='author@example.com', username='author')
+        followers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'follower{i}@example.com', username=f'follower{i}') for i in range(6)
+        ])
+        Follow.objects.bulk_create([
+            Follow(follower=follower, following=author, status='approved' if i < 5 else 'pending')
+            for i, follower in enumerate(followers)
+        ])
+
+        # Crear una idea pública: solo se notifica a los seguidores aprobados
+        idea = Idea.objects.create(text='Idea pública', author=author, visibility='public')
+        with CaptureQueriesContext(connection) as queries:
+            process_pending_jobs()
+        # Los seguidores se recorren por lotes de NOTIFICATION_BATCH_SIZE: un INSERT por lote
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT') and 'INTO "testz1_notification"' in q['sql']]
+        self.assertEqual(len(inserts), 3)
+        self.assertSetEqual(
+            set(Notification.objects.filter(idea=idea).values_list('user__username', flat=True)),
+            {f'follower{i}' for i in range(5)},
+        )
+
+        # Las ideas protegidas también se notifican a los seguidores aprobados
+        idea = Idea.objects.create(text='Idea protegida', author=author, visibility='protected')
+        process_pending_jobs()
+        self.assertEqual(Notification.objects.filter(idea=idea).count(), 5)
+
+        # Las ideas privadas no generan notificaciones
+        idea = Idea.objects.create(text='Idea privada', author=author, visibility='private')
+        with CaptureQueriesContext(connection) as queries:
+            deliver_idea_notifications(idea)
+        self.assertFalse(Notification.objects.filter(idea=idea).exists())
+        # Sin consultar los seguidores
+        self.assertEqual([q for q in queries.captured_queries if 'testz1_follow' in q['sql']], [])
+
+    def test_notification_job_retries_are_idempotent(self):
+        follower = get_user_model().objects.create(email='follower@example.com', username='follower')
+        following = get_user_model().objects.create(email='following@example.com', username='following')
+        Follow.objects.create(follower=follower, following=following, status='approved')
+
+        # Publicar la idea solo encola el trabajo, sin crear notificaciones
+        idea = Idea.objects.create(text='Idea pública', author=following, visibility='public')
+        job = NotificationJob.objects.get(idea=idea)
+        self.assertEqual(job.status, 'pending')
+        self.assertFalse(Notification.objects.filter(idea=idea).exists())
+
+        # Si el envío falla el trabajo se reprograma para más tarde
+        with mock.patch('testz1.outbox.deliver_idea_notifications', side_effect=RuntimeError('db down')):
+            self.assertEqual(process_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('db down', job.last_error)
+        self.assertEqual(process_pending_jobs(), 0)
+
+        # Al reintentar (incluso dos veces) se crea una única notificación
+        NotificationJob.objects.filter(pk=job.pk).update(available_at=job.created_at)
+        self.assertEqual(process_pending_jobs(), 1)
+        NotificationJob.objects.filter(pk=job.pk).update(status='pending', available_at=job.created_at)
+        self.assertEqual(process_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 3))
+        self.assertEqual(Notification.objects.filter(user=follower, idea=idea).count(), 1)
+
+    def test_notification_job_for_deleted_idea(self):
+        """
+        Prueba de que un trabajo cuya idea se borra después de reservarlo termina sin errores.
+        """
+        follower = get_user_model().objects.create(email='follower@example.com', username='follower')
+        following = get_user_model().objects.create(email='following@example.com', username='following')
+        Follow.objects.create(follower=follower, following=following, status='approved')
+        idea = Idea.objects.create(text='Idea pública', author=following, visibility='public')
+
+        jobs = claim_jobs(10)
+        idea.delete()
+        self.assertTrue(run_job(jobs[0]))
+        self.assertFalse(NotificationJob.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_notification_inbox(self):
+        follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        following = get_user_model().objects.create(email='following@example.com', username='following')
+        Follow.objects.create(follower=follower, following=following, status='approved')
+
+        # Publicar tres ideas públicas y enviar sus notificaciones
+        for i in range(3):
+            Idea.objects.create(text=f'Idea {i}', author=following, visibility='public')
+        process_pending_jobs()
+        follower.refresh_from_db()
+        self.assertEqual(follower.unread_notifications, 3)
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='follower@example.com', password='testpassword')
+
+        query = '''
+            query {
+                unreadCount
+                notifications(first: 2) {
+                    edges {
+                        cursor
+                        node {
+                            leida
+                            idea {
+                                text
+                            }
+                        }
+                    }
+                }
+            }
+        '''
+        response = self.query(query)
+        self.assertResponseNoErrors(response)
+        data = response.json()['data']
+        self.assertEqual(data['unreadCount'], 3)
+        self.assertEqual([edge['node']['idea']['text'] for edge in data['notifications']['edges']], ['Idea 2', 'Idea 1'])
+
+        # Marcar como leídas la segunda notificación de la bandeja y todas las anteriores a ella
+        response = self.query('''
+            mutation($upTo: String) {
+                markNotificationsRead(upTo: $upTo) {
+                    updated
+                    unreadCount
+                }
+            }
+        ''', variables={'upTo': data['notifications']['edges'][1]['cursor']})
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['data']['markNotificationsRead'], {'updated': 2, 'unreadCount': 1})
+        self.assertEqual(Notification.objects.get(user=follower, leida=False).idea.text, 'Idea 2')
+
+        # Al eliminar una idea con la notificación sin leer se descuenta del contador
+        Idea.objects.get(text='Idea 2').delete()
+        follower.refresh_from_db()
+        self.assertEqual(follower.unread_notifications, 0)
@@ -0,0 +1,74 @@
+import json
+from unittest import mock
+from graphene_django.utils.testing import GraphQLTestCase
+from django.contrib.auth import get_user_model
+from ..models import Idea
+from ..schemas import documents
+from ..schemas.documents import document_cache, get_persisted_query_cache, get_query_hash
+
+
+class PersistedQueryTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    QUERY = 'query { ideas { edges { node { text } } } }'
+
+    def setUp(self):
+        document_cache.clear()
+        get_persisted_query_cache().clear()
+        user = get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        Idea.objects.create(text='Idea pública', author=user, visibility='public')
+        self.client.login(email='test@example.com', password='testpassword')
+
+    def post(self, query_hash, query=None):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': query_hash}}}
+        if query:
+            body['query'] = query
+        return self.client.post(self.GRAPHQL_URL, json.dumps(body), content_type='application/json')
+
+    def test_persisted_query_flow(self):
+        """
+        Prueba del protocolo de consultas persistidas: hash desconocido, registro con el texto y ejecución por hash.
+        """
+        query_hash = get_query_hash(self.QUERY)
+
+        # El servidor no conoce la consulta: el cliente debe repetirla con el texto
+        response = self.post(query_hash)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'errors': [{'message': 'PersistedQueryNotFound'}]})
+
+        # Con el texto y el hash la consulta se ejecuta y se guarda
+        response = self.post(query_hash, self.QUERY)
+        self.assertResponseNoErrors(response)
+        expected = response.json()
+
+        # A partir de ahora basta con el hash
+        response = self.post(query_hash)
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(expected['data']['ideas']['edges'], [{'node': {'text': 'Idea pública'}}])
+
+    def test_persisted_query_hash_mismatch(self):
+        """
+        Prueba de que no se guarda una consulta cuyo hash no corresponde con su texto.
+        """
+        response = self.post(get_query_hash('query { loggedIn { id } }'), self.QUERY)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post(get_query_hash('query { loggedIn { id } }')).json()['errors'][0]['message'], 'PersistedQueryNotFound')
+
+    def test_documents_are_parsed_and_validated_once(self):
+        """
+        Prueba de que las peticiones repetidas reutilizan el documento analizado y validado.
+        """
+        with mock.patch.object(documents, 'parse', wraps=documents.parse) as parse, \
+                mock.patch.object(documents, 'validate', wraps=documents.validate) as validate:
+            for _ in range(3):
+                self.assertResponseNoErrors(self.query(self.QUERY))
+            self.assertResponseNoErrors(self.post(get_query_hash(self.QUERY), self.QUERY))
+
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(validate.call_count, 1)
+
+        # Los documentos inválidos no se guardan y devuelven sus errores en cada petición
+        response = self.query('query { noExiste }')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('noExiste', response.json()['errors'][0]['message'])
@@ -0,0 +1,59 @@
+from unittest import mock
+from graphene_django.utils.testing import GraphQLTestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from request.models import Request
+from .. import request_log
+from ..request_log import RequestLogBuffer
+
+
+class RequestLogTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def setUp(self):
+        get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        self.client.login(email='test@example.com', password='testpassword')
+
+    def use_buffer(self, buffer):
+        # Cola propia de la prueba, sin hilo en segundo plano: los registros se guardan con flush()
+        for patcher in (mock.patch.object(request_log, 'get_request_log', return_value=buffer), mock.patch.object(buffer, 'start')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return buffer
+
+    def test_requests_are_logged_off_request_path(self):
+        """
+        Prueba de que las peticiones no escriben en la tabla de registros y se guardan después por lotes.
+        """
+        buffer = self.use_buffer(RequestLogBuffer(batch_size=2))
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.assertResponseNoErrors(self.query('query { ideas { edges { node { text } } } }'))
+        self.assertEqual([q for q in queries.captured_queries if 'request_request' in q['sql']], [])
+        self.assertEqual(Request.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            buffer.flush()
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('INSERT')]), 2)
+        self.assertEqual(Request.objects.filter(path=self.GRAPHQL_URL, user__username='testuser').count(), 3)
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATE=0)
+    def test_sampling_and_bounded_queue(self):
+        """
+        Prueba del muestreo (los errores se registran siempre) y del descarte con la cola llena.
+        """
+        buffer = self.use_buffer(RequestLogBuffer(max_queue_size=1))
+
+        self.assertResponseNoErrors(self.query('query { ideas { edges { node { text } } } }'))
+        self.assertEqual(buffer.queue.qsize(), 0)
+
+        self.assertEqual(self.client.get('/no-existe/').status_code, 404)
+        self.assertEqual(self.client.get('/no-existe/').status_code, 404)
+        self.assertEqual(buffer.queue.qsize(), 1)
+        self.assertEqual(buffer.dropped, 1)
+
+        buffer.flush()
+        self.assertEqual(list(Request.objects.values_list('path', 'response')), [('/no-existe/', 404)])
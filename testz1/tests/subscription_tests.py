@@ -0,0 +1,157 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from graphene_django.utils.testing import GraphQLTestCase
+from graphql_jwt.shortcuts import get_token
+from django.contrib.auth import get_user_model
+from django.db import connection
+from .. import outbox
+from ..models import Follow, Idea
+from ..outbox import process_pending_jobs
+from ..pubsub import PostgresBroker, get_default_broker
+from ..schemas import schema
+from ..views.graphql_ws import GraphQLWebSocketApp, PROTOCOL
+
+
+class SubscriptionTest(GraphQLTestCase):
+    GRAPHQL_URL = '/api/graphql/'
+
+    def setUp(self):
+        self.follower = get_user_model().objects.create_user(email='follower@example.com', username='follower', password='testpassword')
+        self.author = get_user_model().objects.create_user(email='author@example.com', username='author', password='testpassword')
+        Follow.objects.create(follower=self.follower, following=self.author, status='approved')
+
+    def publish_idea(self, text, visibility):
+        # Las señales publican los eventos al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            Idea.objects.create(text=text, author=self.author, visibility=visibility)
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_jobs()
+
+    async def connect(self, token=None):
+        communicator = ApplicationCommunicator(GraphQLWebSocketApp(schema), {
+            'type': 'websocket', 'path': '/api/graphql/', 'subprotocols': [PROTOCOL],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output())['type'], 'websocket.accept')
+        await self.send(communicator, {'type': 'connection_init', 'payload': {'token': token} if token else {}})
+        self.assertEqual(await self.receive(communicator), {'type': 'connection_ack'})
+        return communicator
+
+    async def send(self, communicator, message):
+        await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+    async def receive(self, communicator):
+        return json.loads((await communicator.receive_output(timeout=5))['text'])
+
+    def test_subscriptions_receive_new_ideas_and_notifications(self):
+        """
+        Prueba de que un seguidor recibe por WebSocket las ideas de su timeline y sus notificaciones.
+        """
+        token = get_token(self.follower)
+
+        async def run():
+            communicator = await self.connect(token)
+            await self.send(communicator, {'id': '1', 'type': 'subscribe', 'payload': {
+                'query': 'subscription { timelineUpdated { text author { username } } }',
+            }})
+            await self.send(communicator, {'id': '2', 'type': 'subscribe', 'payload': {
+                'query': 'subscription { notificationCreated { idea { text author { username } } leida } }',
+            }})
+            await self.send(communicator, {'type': 'ping'})
+            self.assertEqual(await self.receive(communicator), {'type': 'pong'})
+
+            # Las ideas privadas no llegan a los seguidores; las públicas sí
+            await sync_to_async(self.publish_idea)('Idea privada', 'private')
+            await sync_to_async(self.publish_idea)('Idea pública', 'public')
+            messages = {}
+            for _ in range(2):
+                message = await self.receive(communicator)
+                messages[message['id']] = message
+            self.assertEqual(messages['1']['payload'], {
+                'data': {'timelineUpdated': {'text': 'Idea pública', 'author': {'username': 'author'}}},
+            })
+            self.assertEqual(messages['2']['payload'], {
+                'data': {'notificationCreated': {'idea': {'text': 'Idea pública', 'author': {'username': 'author'}}, 'leida': False}},
+            })
+
+            # Al cerrar la suscripción dejan de llegar eventos
+            await self.send(communicator, {'id': '1', 'type': 'complete'})
+            await self.send(communicator, {'id': '2', 'type': 'complete'})
+            await self.send(communicator, {'type': 'ping'})
+            self.assertEqual(await self.receive(communicator), {'type': 'pong'})
+            await sync_to_async(self.publish_idea)('Otra idea pública', 'public')
+            self.assertTrue(await communicator.receive_nothing())
+
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+
+        async_to_sync(run)()
+
+    def test_subscription_requires_authentication(self):
+        """
+        Prueba de que las suscripciones sin token se rechazan.
+        """
+        async def run():
+            communicator = await self.connect()
+            await self.send(communicator, {'id': '1', 'type': 'subscribe', 'payload': {
+                'query': 'subscription { notificationCreated { leida } }',
+            }})
+            message = await self.receive(communicator)
+            self.assertEqual(message['type'], 'error')
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+
+        async_to_sync(run)()
+
+
+class BrokerTest(GraphQLTestCase):
+
+    def test_default_broker_depends_on_database(self):
+        """
+        Prueba de que con PostgreSQL se reparten los eventos entre procesos y con el resto en memoria.
+        """
+        self.assertEqual(get_default_broker(), 'testz1.pubsub.InProcessBroker')
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(get_default_broker(), 'testz1.pubsub.PostgresBroker')
+
+    def test_postgres_broker_dispatches_notifies_to_local_subscribers(self):
+        """
+        Prueba de que los mensajes recibidos por LISTEN llegan a los suscriptores del proceso.
+        """
+        broker = PostgresBroker()
+
+        async def run():
+            with mock.patch.object(broker, 'listen') as listen:
+                messages = broker.subscribe('ideas')
+                received = asyncio.ensure_future(messages.__anext__())
+                await asyncio.sleep(0)
+                listen.assert_called_once_with('ideas')
+
+                # Los canales de otras aplicaciones se ignoran
+                broker.dispatch(SimpleNamespace(channel='ideas', payload='{"idea_id": 1}'))
+                broker.dispatch(SimpleNamespace(channel='testz1_ideas', payload='{"idea_id": 2}'))
+                self.assertEqual(await asyncio.wait_for(received, 5), {'idea_id': 2})
+                await messages.aclose()
+
+        async_to_sync(run)()
+
+    def test_notification_events_fit_in_notify(self):
+        """
+        Prueba de que los avisos de notificaciones se dividen para no superar el tamaño máximo de NOTIFY.
+        """
+        author = get_user_model().objects.create_user(email='author@example.com', username='author', password='testpassword')
+        followers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'follower{i}@example.com', username=f'follower{i}') for i in range(5)
+        ])
+        Follow.objects.bulk_create([Follow(follower=follower, following=author, status='approved') for follower in followers])
+        with self.captureOnCommitCallbacks(execute=True):
+            Idea.objects.create(text='Idea pública', author=author, visibility='public')
+
+        with mock.patch.object(outbox, 'NOTIFICATION_EVENT_SIZE', 2), mock.patch.object(outbox, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox.process_pending_jobs()
+        self.assertEqual([len(call.args[1]['user_ids']) for call in publish.call_args_list], [2, 2, 1])
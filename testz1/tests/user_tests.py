@@ -1,5 +1,8 @@
 from graphene_django.utils.testing import GraphQLTestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..models import Follow, Idea
 
 class UserTest(GraphQLTestCase):
 
@@ -89,9 +92,7 @@ class UserTest(GraphQLTestCase):
         query = '''
             query {
                 searchUsers(searchQuery: "user") {
-                    id
-                    username
-                    email
+                    edges { node { id username email } }
                 }
             }
             '''
@@ -101,17 +102,14 @@ class UserTest(GraphQLTestCase):
         # Verificar que no haya errores en la respuesta
         self.assertResponseNoErrors(response)
 
-        self.assertEqual(len(response.json()['data']['searchUsers']), 2)
-        usernames = {user['username'] for user in response.json()['data']['searchUsers']}
-        self.assertSetEqual(usernames, {'user1', 'user2'})
+        usernames = [edge['node']['username'] for edge in response.json()['data']['searchUsers']['edges']]
+        self.assertEqual(usernames, ['user1', 'user2'])
 
         # Realiza una búsqueda por nombre de usuario completo
         query = '''
             query {
                 searchUsers(searchQuery: "user1") {
-                    id
-                    username
-                    email
+                    edges { node { id username email } }
                 }
             }
             '''
@@ -121,5 +119,139 @@ class UserTest(GraphQLTestCase):
         # Verificar que no haya errores en la respuesta
         self.assertResponseNoErrors(response)
 
-        self.assertEqual(len(response.json()['data']['searchUsers']), 1)
-        self.assertEqual(response.json()['data']['searchUsers'][0]['username'], 'user1')
+        edges = response.json()['data']['searchUsers']['edges']
+        self.assertEqual([edge['node']['username'] for edge in edges], ['user1'])
+
+    def test_user_search_ranking_and_pagination(self):
+        """
+        Prueba de que la búsqueda ordena por relevancia, pagina por cursor y admite el modo de autocompletado.
+        """
+        for username in ('superanna', 'annabel', 'anna', 'joanna', 'annie', 'other'):
+            get_user_model().objects.create_user(email=f'{username}@example.com', username=username, password='testpassword')
+        self.client.login(email='other@example.com', password='testpassword')
+
+        query = '''
+            query ($searchQuery: String!, $mode: String, $after: String) {
+                searchUsers(searchQuery: $searchQuery, mode: $mode, first: 2, after: $after) {
+                    edges { node { username } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }
+            '''
+
+        def search(search_query, mode=None):
+            usernames, after = [], None
+            while True:
+                response = self.query(query, variables={'searchQuery': search_query, 'mode': mode, 'after': after})
+                self.assertResponseNoErrors(response)
+                page = response.json()['data']['searchUsers']
+                usernames += [edge['node']['username'] for edge in page['edges']]
+                if not page['pageInfo']['hasNextPage']:
+                    return usernames
+                after = page['pageInfo']['endCursor']
+
+        # Coincidencia exacta, después los que empiezan por el texto y por último el resto (más cortos primero)
+        self.assertEqual(search('ANNA'), ['anna', 'annabel', 'joanna', 'superanna'])
+
+        # Autocompletado: solo los nombres que empiezan por el texto
+        self.assertEqual(search('ann', mode='prefix'), ['anna', 'annie', 'annabel'])
+
+        # Los textos de menos de tres caracteres se buscan como prefijo
+        self.assertEqual(search('an'), ['anna', 'annie', 'annabel'])
+        self.assertEqual(search('   '), [])
+
+        response = self.query(query, variables={'searchQuery': 'anna', 'mode': 'fuzzy'})
+        self.assertResponseHasErrors(response)
+
+    def test_user_relations_are_paginated(self):
+        """
+        Prueba de que el tipo de usuario solo expone campos públicos y sus relaciones como conexiones paginadas.
+        """
+        user = get_user_model().objects.create_user(email='user1@example.com', username='user1', password='testpassword')
+        get_user_model().objects.create_user(email='other@example.com', username='other', password='testpassword')
+        followers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'follower{i}@example.com', username=f'follower{i}') for i in range(3)
+        ])
+        Follow.objects.bulk_create([Follow(follower=follower, following=user, status='approved') for follower in followers])
+        Idea.objects.create(text='Idea pública', author=user, visibility='public')
+        Idea.objects.create(text='Idea privada', author=user, visibility='private')
+
+        # Autenticar el usuario antes de ejecutar la consulta
+        self.client.login(email='other@example.com', password='testpassword')
+
+        # Los campos internos del modelo (contraseña, permisos...) y las relaciones completas no existen en el esquema
+        for field in ('password', 'isSuperuser', 'ideaSet', 'notificationSet'):
+            response = self.query(f'query {{ searchUsers(searchQuery: "user1") {{ edges {{ node {{ {field} }} }} }} }}')
+            self.assertEqual(response.status_code, 400)
+
+        query = '''
+            query {
+                searchUsers(searchQuery: "user1") {
+                    edges { node {
+                        ideas { edges { node { text } } }
+                        followers(first: 2) { edges { node { username } } pageInfo { hasNextPage endCursor } }
+                    } }
+                }
+            }
+            '''
+        response = self.query(query)
+        self.assertResponseNoErrors(response)
+        found = response.json()['data']['searchUsers']['edges'][0]['node']
+
+        # Solo las ideas que puede ver el usuario autenticado
+        self.assertEqual([edge['node']['text'] for edge in found['ideas']['edges']], ['Idea pública'])
+
+        # Los seguidores se devuelven por páginas
+        self.assertEqual([edge['node']['username'] for edge in found['followers']['edges']], ['follower0', 'follower1'])
+        self.assertTrue(found['followers']['pageInfo']['hasNextPage'])
+
+        query = '''
+            query ($after: String) {
+                searchUsers(searchQuery: "user1") {
+                    edges { node { followers(first: 2, after: $after) { edges { node { username } } pageInfo { hasNextPage } } } }
+                }
+            }
+            '''
+        response = self.query(query, variables={'after': found['followers']['pageInfo']['endCursor']})
+        self.assertResponseNoErrors(response)
+        followers = response.json()['data']['searchUsers']['edges'][0]['node']['followers']
+        self.assertEqual([edge['node']['username'] for edge in followers['edges']], ['follower2'])
+        self.assertFalse(followers['pageInfo']['hasNextPage'])
+
+    def test_users_pagination(self):
+        """
+        Prueba del listado paginado de usuarios: requiere autenticación y solo lee las columnas pedidas.
+        """
+        get_user_model().objects.bulk_create([
+            get_user_model()(email=f'user{i}@example.com', username=f'user{i}') for i in range(5)
+        ])
+        get_user_model().objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+
+        query = '''
+            query ($after: String) {
+                users(first: 4, after: $after) { edges { node { username } } pageInfo { hasNextPage endCursor } }
+            }
+            '''
+
+        # Sin autenticar no se puede listar usuarios
+        response = self.query(query)
+        self.assertResponseHasErrors(response)
+
+        self.client.login(email='test@example.com', password='testpassword')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(query)
+        self.assertResponseNoErrors(response)
+        users = response.json()['data']['users']
+        self.assertEqual([edge['node']['username'] for edge in users['edges']], ['user0', 'user1', 'user2', 'user3'])
+        self.assertTrue(users['pageInfo']['hasNextPage'])
+
+        # La consulta de la página solo lee el id y el nombre de usuario y está limitada al tamaño de página
+        sql = next(q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql'] and 'testz1_user' in q['sql'])
+        self.assertNotIn('"password"', sql)
+        self.assertIn('LIMIT 5', sql)
+
+        response = self.query(query, variables={'after': users['pageInfo']['endCursor']})
+        self.assertResponseNoErrors(response)
+        users = response.json()['data']['users']
+        self.assertEqual([edge['node']['username'] for edge in users['edges']], ['user4', 'testuser'])
+        self.assertFalse(users['pageInfo']['hasNextPage'])
@@ -1,14 +1,20 @@
-from graphene_django.views import GraphQLView
+from django.conf import settings
 from django.urls import path
 
-from .schemas.user_schema import schema as UserSchema
-from .schemas.idea_schema import schema as IdeaSchema
-from .schemas.follow_schema import schema as FollowSchema
+from .schemas import schema
+from .views.async_graphql import AsyncGraphQLView
+from .views.persisted_queries import PersistedQueryGraphQLView
 
 app_name = 'api'
 
+# En los despliegues ASGI el endpoint se sirve con la vista asíncrona
+view_class = AsyncGraphQLView if settings.GRAPHQL_ASYNC else PersistedQueryGraphQLView
+graphql_view = view_class.as_view(graphiql=True, schema=schema)
+
 urlpatterns = [
-    path('user/graphql/', GraphQLView.as_view(graphiql=True, schema=UserSchema)),
-    path('idea/graphql/', GraphQLView.as_view(graphiql=True, schema=IdeaSchema)),
-    path('follow/graphql/', GraphQLView.as_view(graphiql=True, schema=FollowSchema)),
-]
\ No newline at end of file
+    path('graphql/', graphql_view, name='graphql'),
+    # Rutas anteriores por dominio, mantenidas como alias del endpoint único
+    path('user/graphql/', graphql_view),
+    path('idea/graphql/', graphql_view),
+    path('follow/graphql/', graphql_view),
+]
@@ -0,0 +1,79 @@
+"""
+Vista GraphQL asíncrona para los despliegues ASGI.
+
+`AsyncGraphQLView` ejecuta las consultas de forma asíncrona, de modo que el hilo del
+servidor no queda bloqueado mientras los resolvers esperan a la base de datos (ver
+`testz1.schemas.concurrency`). Las mutaciones se siguen ejecutando en un hilo dentro de una
+transacción, igual que con la vista síncrona, y GraphiQL y las peticiones por lotes se delegan en
+la implementación síncrona de `GraphQLView`.
+"""
+from inspect import isawaitable
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.middleware.csrf import get_token
+from graphene_django.views import HttpError
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast
+from .persisted_queries import PersistedQueryGraphQLView
+
+
+class AsyncGraphQLView(PersistedQueryGraphQLView):
+    """GraphQLView que resuelve las consultas de forma asíncrona."""
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        data = None
+        try:
+            if request.method.lower() in ('get', 'post'):
+                data = self.parse_body(request)
+        except HttpError:
+            pass
+        if data is None or self.batch or (self.graphiql and self.can_display_graphiql(request, data)):
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+        # Equivalente a ensure_csrf_cookie de la vista síncrona
+        get_token(request)
+
+        try:
+            result, status_code = await self.get_response_async(request, data)
+            return HttpResponse(status=status_code, content=result, content_type='application/json')
+        except HttpError as e:
+            response = e.response
+            response['Content-Type'] = 'application/json'
+            response.content = self.json_encode(request, {'errors': [self.format_error(e)]})
+            return response
+
+    async def get_response_async(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        if not query:
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        document, errors = self.get_document(query)
+        if errors:
+            execution_result = ExecutionResult(errors=errors)
+        else:
+            operation_ast = get_operation_ast(document.document, operation_name)
+            if operation_ast and operation_ast.operation != OperationType.QUERY:
+                if request.method.lower() == 'get':
+                    raise HttpError(HttpResponseNotAllowed(
+                        ['POST'], f'Can only perform a {operation_ast.operation.value} operation from a POST request.'
+                    ))
+                # Las mutaciones se ejecutan en orden y dentro de una transacción: se usa la vista síncrona
+                return await sync_to_async(self.get_response)(request, data)
+            execution_result = await self.execute_graphql_request_async(request, document.document, variables, operation_name)
+            execution_result.extensions = self.get_cost_extensions(document, operation_name)
+
+        response, status_code = self.format_execution_result(execution_result)
+        return self.json_encode(request, response), status_code
+
+    async def execute_graphql_request_async(self, request, document, variables, operation_name):
+        # El usuario de la sesión se carga de forma perezosa y consulta la base de datos: se carga antes
+        # de entrar en el bucle de eventos
+        await sync_to_async(lambda: request.user.is_authenticated)()
+        try:
+            result = execute(**self.get_execute_options(request, document, variables, operation_name))
+            if isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
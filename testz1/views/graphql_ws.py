@@ -0,0 +1,166 @@
+"""
+Endpoint WebSocket de las suscripciones GraphQL.
+
+Implementa el protocolo `graphql-transport-ws` como aplicación ASGI: el cliente se autentica con
+el token JWT en el mensaje `connection_init` y cada mensaje `subscribe` abre una suscripción cuyos
+resultados se envían con mensajes `next` hasta que el cliente la cierra con `complete`.
+
+Cada evento se ejecuta con los middlewares del esquema (salvo la autenticación JWT, que ya se hizo
+en `connection_init`): así los resolvers anidados que consultan la base de datos, como
+`notificationCreated { idea { author { username } } }`, se ejecutan fuera del bucle de eventos.
+"""
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from graphql import ExecutionResult, GraphQLError, execute
+from graphql.execution import MapAsyncIterator, create_source_event_stream
+from graphql.pyutils import is_awaitable
+from graphql_jwt.exceptions import JSONWebTokenError
+from ..auth import authenticate_token
+from ..schemas.concurrency import AsyncResolverMiddleware
+from ..schemas.documents import document_cache
+from ..schemas.loaders import DataLoaderMiddleware
+from ..schemas.optimizer import QueryOptimizerMiddleware
+
+PROTOCOL = 'graphql-transport-ws'
+
+
+class SubscriptionContext:
+    """Contexto de las suscripciones, equivalente a la petición HTTP en las consultas."""
+
+    def __init__(self, user):
+        self.user = user
+
+
+class GraphQLWebSocketConsumer:
+    """Conexión WebSocket de un cliente con las suscripciones que tiene abiertas."""
+
+    def __init__(self, schema, send):
+        self.schema = schema
+        self.send = send
+        self.context = None
+        self.subscriptions = {}
+
+    async def send_message(self, message):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def close(self, code, reason=''):
+        await self.send({'type': 'websocket.close', 'code': code, 'reason': reason})
+
+    async def receive(self, text):
+        try:
+            message = json.loads(text)
+            message_type = message['type']
+        except (TypeError, ValueError, KeyError):
+            return await self.close(4400, 'Mensaje no válido')
+
+        if message_type == 'connection_init':
+            if self.context is not None:
+                return await self.close(4429, 'Conexión ya inicializada')
+            payload = message.get('payload') or {}
+            user = AnonymousUser()
+            if payload.get('token'):
+                try:
+                    user = await sync_to_async(authenticate_token)(payload['token'])
+                except JSONWebTokenError:
+                    return await self.close(4403, 'Token no válido')
+            self.context = SubscriptionContext(user)
+            await self.send_message({'type': 'connection_ack'})
+        elif message_type == 'ping':
+            await self.send_message({'type': 'pong'})
+        elif message_type == 'pong':
+            pass
+        elif self.context is None:
+            await self.close(4401, 'No autorizado')
+        elif message_type == 'subscribe':
+            await self.start(message.get('id'), message.get('payload') or {})
+        elif message_type == 'complete':
+            self.stop(message.get('id'))
+        else:
+            await self.close(4400, 'Mensaje no válido')
+
+    async def start(self, operation_id, payload):
+        if operation_id in self.subscriptions:
+            return await self.close(4409, f'Ya existe una suscripción con id {operation_id}')
+
+        # Las suscripciones pasan por la misma validación (y límite de coste) que las consultas HTTP
+        document, errors = document_cache.get(self.schema, payload.get('query') or '')
+        if errors:
+            result = ExecutionResult(errors=errors)
+        else:
+            result = await self.subscribe(document.document, payload.get('variables'), payload.get('operationName'))
+        if isinstance(result, ExecutionResult):
+            # La suscripción no se ha podido iniciar (consulta inválida, falta de permisos...)
+            errors = [error.formatted for error in result.errors or [GraphQLError('Suscripción no válida')]]
+            return await self.send_message({'id': operation_id, 'type': 'error', 'payload': errors})
+
+        self.subscriptions[operation_id] = asyncio.ensure_future(self.listen(operation_id, result))
+
+    async def subscribe(self, document, variables, operation_name):
+        """
+        Equivalente a `graphql.subscribe`, que no admite middlewares: cada evento se ejecuta con su
+        propio contexto (y sus propios DataLoaders) y con los resolvers síncronos en hilos.
+        """
+        schema = self.schema.graphql_schema
+        stream = await create_source_event_stream(
+            schema, document, variable_values=variables, operation_name=operation_name, context_value=self.context,
+        )
+        if isinstance(stream, ExecutionResult):
+            return stream
+
+        async def map_event(event):
+            result = execute(
+                schema,
+                document,
+                root_value=event,
+                context_value=SubscriptionContext(self.context.user),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=[QueryOptimizerMiddleware(), DataLoaderMiddleware(), AsyncResolverMiddleware()],
+            )
+            return await result if is_awaitable(result) else result
+
+        return MapAsyncIterator(stream, map_event)
+
+    async def listen(self, operation_id, results):
+        try:
+            async for result in results:
+                await self.send_message({'id': operation_id, 'type': 'next', 'payload': result.formatted})
+            await self.send_message({'id': operation_id, 'type': 'complete'})
+        finally:
+            await results.aclose()
+            self.subscriptions.pop(operation_id, None)
+
+    def stop(self, operation_id):
+        task = self.subscriptions.pop(operation_id, None)
+        if task is not None:
+            task.cancel()
+
+    def stop_all(self):
+        for operation_id in list(self.subscriptions):
+            self.stop(operation_id)
+
+
+class GraphQLWebSocketApp:
+    """Aplicación ASGI que atiende las conexiones WebSocket de las suscripciones."""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    async def __call__(self, scope, receive, send):
+        consumer = GraphQLWebSocketConsumer(self.schema, send)
+        try:
+            while True:
+                event = await receive()
+                if event['type'] == 'websocket.connect':
+                    if PROTOCOL not in scope.get('subprotocols', []):
+                        await send({'type': 'websocket.close', 'code': 4406})
+                        return
+                    await send({'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+                elif event['type'] == 'websocket.receive':
+                    await consumer.receive(event.get('text'))
+                elif event['type'] == 'websocket.disconnect':
+                    return
+        finally:
+            consumer.stop_all()
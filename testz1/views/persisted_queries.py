@@ -0,0 +1,146 @@
+"""
+GraphQLView con consultas persistidas, caché de documentos (ver `testz1.schemas.documents`) y el
+coste de cada consulta en las extensiones de la respuesta (ver `testz1.schemas.cost`).
+"""
+import json
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError, set_rollback
+from graphql import ExecutionResult, OperationType, execute_sync, get_operation_ast
+from ..schemas.cost import get_max_cost
+from ..schemas.documents import document_cache, get_persisted_query, get_query_hash, persist_query
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """
+    GraphQLView que admite consultas persistidas automáticas y reutiliza los documentos ya analizados
+    y validados en lugar de procesar el texto de la consulta en cada petición.
+    """
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        self.query_hash = None
+
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        persisted_query = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+        if not persisted_query:
+            return query, variables, operation_name, id
+
+        query_hash = persisted_query.get('sha256Hash')
+        if persisted_query.get('version') != 1 or not isinstance(query_hash, str):
+            raise HttpError(HttpResponseBadRequest('Unsupported persisted query version or hash.'))
+
+        if query:
+            # Primera petición con el texto completo: se comprueba el hash y se guarda la consulta
+            if get_query_hash(query) != query_hash:
+                raise HttpError(HttpResponseBadRequest('Provided sha256Hash does not match query.'))
+            persist_query(query_hash, query)
+        else:
+            query = get_persisted_query(query_hash)
+            if query is None:
+                # El cliente repetirá la petición con el texto de la consulta
+                raise HttpError(HttpResponse(status=200), 'PersistedQueryNotFound')
+
+        self.query_hash = query_hash
+        return query, variables, operation_name, id
+
+    def get_document(self, query):
+        """Devuelve `(document, errors)` para la consulta, usando la caché de documentos validados."""
+        return document_cache.get(self.schema, query, getattr(self, 'query_hash', None))
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+        if not execution_result:
+            return None, 200
+        if execution_result.errors:
+            set_rollback()
+
+        response, status_code = self.format_execution_result(execution_result)
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def format_execution_result(self, execution_result):
+        """Devuelve el cuerpo de la respuesta (errores, datos y extensiones) y su código de estado."""
+        response = {}
+        status_code = 200
+        if execution_result.errors:
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.errors and any(not getattr(e, 'path', None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        if execution_result.extensions:
+            response['extensions'] = execution_result.extensions
+        return response, status_code
+
+    def get_cost_extensions(self, document, operation_name):
+        """Extensiones de la respuesta con el coste calculado de la operación y el máximo permitido."""
+        return {'cost': {'requestedQueryCost': document.get_cost(operation_name), 'maximumAvailable': get_max_cost()}}
+
+    def get_execute_options(self, request, document, variables, operation_name):
+        options = {
+            'schema': self.schema.graphql_schema,
+            'document': document,
+            'root_value': self.get_root_value(request),
+            'variable_values': variables,
+            'operation_name': operation_name,
+            'context_value': self.get_context(request),
+            'middleware': self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            options['execution_context_class'] = self.execution_context_class
+        return options
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        document, errors = self.get_document(query)
+        if errors:
+            return ExecutionResult(errors=errors)
+
+        extensions = self.get_cost_extensions(document, operation_name)
+        document = document.document
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if request.method.lower() == 'get' and operation_ast and operation_ast.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f'Can only perform a {operation_ast.operation.value} operation from a POST request.'
+            ))
+
+        try:
+            options = self.get_execute_options(request, document, variables, operation_name)
+            if (
+                operation_ast
+                and operation_ast.operation == OperationType.MUTATION
+                and (graphene_settings.ATOMIC_MUTATIONS is True or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True)
+            ):
+                with transaction.atomic():
+                    result = execute_sync(**options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+            else:
+                result = execute_sync(**options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        result.extensions = extensions
+        return result